@@ -0,0 +1,128 @@
+"""
+Shared fixtures for the benchmark suite.
+
+The benchmarks are run against seeded datasets - by default a single dataset
+of 1,000 rows per table. Set ONFIDO_BENCHMARK_SIZES to a comma-separated list
+to run against larger datasets, e.g. ONFIDO_BENCHMARK_SIZES=1000,100000,1000000
+
+Run with:
+
+    $ pytest benchmarks --benchmark-json=bench_output.json
+
+"""
+
+import copy
+import os
+import uuid
+from unittest import mock
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils.timezone import now as tz_now
+
+from onfido.decorators import WebhookKeys
+from onfido.models import Applicant, Check, Event, Report
+from tests.conftest import TEST_APPLICANT, TEST_CHECK, TEST_EVENT, TEST_REPORT_DOCUMENT
+
+pytest.importorskip("pytest_benchmark")
+
+SIZES = [int(size) for size in os.getenv("ONFIDO_BENCHMARK_SIZES", "1000").split(",")]
+
+# rows inserted per bulk_create statement when seeding
+SEED_BATCH_SIZE = 10000
+
+WEBHOOK_TOKEN = b"benchmark-webhook-token"
+
+
+def _raw(template, onfido_id, **kwargs):
+    raw = copy.deepcopy(template)
+    raw.update(id=onfido_id, href=f"/v3/{onfido_id}", **kwargs)
+    return raw
+
+
+def _seed_batch(offset, count):
+    User = get_user_model()
+    users = User.objects.bulk_create(
+        [
+            User(
+                username=f"user-{offset + i}",
+                first_name=f"First{(offset + i) % 997}",
+                last_name=f"Last{(offset + i) % 991}",
+                email=f"user-{offset + i}@example.com",
+            )
+            for i in range(count)
+        ]
+    )
+    users = list(User.objects.filter(username__in=[u.username for u in users]))
+    applicants = Applicant.objects.bulk_create(
+        [
+            Applicant(user=user).parse(_raw(TEST_APPLICANT, str(uuid.uuid4())))
+            for user in users
+        ]
+    )
+    applicants = Applicant.objects.filter(
+        onfido_id__in=[a.onfido_id for a in applicants]
+    ).select_related("user")
+    checks = Check.objects.bulk_create(
+        [
+            Check(user=a.user, applicant=a).parse(
+                _raw(TEST_CHECK, str(uuid.uuid4()), applicant_id=a.onfido_id)
+            )
+            for a in applicants
+        ]
+    )
+    checks = Check.objects.filter(onfido_id__in=[c.onfido_id for c in checks])
+    Report.objects.bulk_create(
+        [
+            Report(user_id=c.user_id, onfido_check=c).parse(
+                _raw(TEST_REPORT_DOCUMENT, str(uuid.uuid4()), check_id=c.onfido_id)
+            )
+            for c in checks
+        ]
+    )
+    received_at = tz_now()
+    Event.objects.bulk_create(
+        [Event(received_at=received_at).parse(_event(c.onfido_id)) for c in checks]
+    )
+
+
+def _event(onfido_id, action="check.completed", status="complete"):
+    event = copy.deepcopy(TEST_EVENT)
+    event["payload"]["action"] = action
+    event["payload"]["object"].update(id=onfido_id, status=status)
+    return event
+
+
+@pytest.fixture(scope="module", params=SIZES, ids=lambda size: f"rows={size}")
+def dataset(request, django_db_setup, django_db_blocker):
+    """Seed `size` users / applicants / checks / reports / events."""
+    size = request.param
+    with django_db_blocker.unblock():
+        for offset in range(0, size, SEED_BATCH_SIZE):
+            _seed_batch(offset, min(SEED_BATCH_SIZE, size - offset))
+        yield size
+        Event.objects.all().delete()
+        Report.objects.all().delete()
+        Check.objects.all().delete()
+        Applicant.objects.all().delete()
+        get_user_model().objects.all().delete()
+
+
+@pytest.fixture
+def mock_api():
+    """Patch the API GET function to return the JSON for the requested href."""
+
+    def get(href):
+        resource, onfido_id = href.split("/")
+        template = {"checks": TEST_CHECK, "reports": TEST_REPORT_DOCUMENT}[resource]
+        return _raw(template, onfido_id, status="complete", result="clear")
+
+    with mock.patch("onfido.models.base.get", side_effect=get) as mock_get:
+        yield mock_get
+
+
+@pytest.fixture
+def webhook_token():
+    keys = WebhookKeys(lambda: [WEBHOOK_TOKEN])
+    with mock.patch("onfido.decorators.webhook_keys", keys):
+        yield WEBHOOK_TOKEN
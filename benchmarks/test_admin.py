@@ -0,0 +1,39 @@
+"""Benchmarks for the admin changelist views."""
+
+import pytest
+from django.urls import reverse
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("model", ["applicant", "check", "report", "event"])
+def test_changelist(benchmark, dataset, admin_client, model):
+    url = reverse(f"admin:onfido_{model}_changelist")
+    response = benchmark(admin_client.get, url)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "model,query",
+    [
+        ("check", "status__exact=complete"),
+        ("check", "result__exact=clear"),
+        ("check", "created_at__gte=2020-01-01"),
+        ("report", "report_type__exact=document"),
+        ("event", "action__exact=check.completed"),
+        ("event", "completed_at__gte=2020-01-01"),
+    ],
+)
+def test_changelist__filtered(benchmark, dataset, admin_client, model, query):
+    url = reverse(f"admin:onfido_{model}_changelist") + "?" + query
+    response = benchmark(admin_client.get, url)
+    assert response.status_code == 200
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("model", ["check", "event"])
+def test_changelist__search(benchmark, dataset, admin_client, model):
+    # a partial onfido_id - uses the trigram index on PostgreSQL
+    url = reverse(f"admin:onfido_{model}_changelist") + "?q=abc1"
+    response = benchmark(admin_client.get, url)
+    assert response.status_code == 200
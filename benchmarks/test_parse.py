@@ -0,0 +1,45 @@
+"""Benchmarks for parsing API JSON and verifying webhook signatures."""
+
+import copy
+import json
+
+import pytest
+
+from onfido.decorators import WebhookKeys, _hmac
+from onfido.models import Check, Event, Report
+from tests.conftest import TEST_CHECK, TEST_EVENT, TEST_REPORT_DOCUMENT
+
+from .conftest import WEBHOOK_TOKEN
+
+
+def test_report_parse(benchmark):
+    # parse() scrubs the raw data first, so it must be given a fresh copy
+    benchmark.pedantic(
+        lambda raw: Report().parse(raw),
+        setup=lambda: ((copy.deepcopy(TEST_REPORT_DOCUMENT),), {}),
+        rounds=1000,
+    )
+
+
+def test_check_parse(benchmark):
+    benchmark(Check().parse, TEST_CHECK)
+
+
+def test_event_parse(benchmark):
+    benchmark(Event().parse, TEST_EVENT)
+
+
+@pytest.mark.parametrize("size", [1_000, 100_000], ids=lambda size: f"bytes={size}")
+def test_hmac(benchmark, size):
+    body = json.dumps({"payload": {"padding": "x" * size}}).encode()
+    benchmark(_hmac, WEBHOOK_TOKEN, body)
+
+
+@pytest.mark.parametrize("tokens", [1, 5], ids=lambda tokens: f"tokens={tokens}")
+def test_webhook_keys_match(benchmark, tokens):
+    # worst case - the matching token is the last one tried
+    keys = WebhookKeys(
+        lambda: [b"token-%i" % i for i in range(tokens - 1)] + [WEBHOOK_TOKEN]
+    )
+    body = json.dumps({"payload": {"padding": "x" * 1_000}}).encode()
+    assert benchmark(keys.match, body, _hmac(WEBHOOK_TOKEN, body))
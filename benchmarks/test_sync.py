@@ -0,0 +1,27 @@
+"""Benchmarks for syncing objects with the API (BaseQuerySet.pull)."""
+
+from unittest import mock
+
+import pytest
+
+from onfido.api import get
+from onfido.models import Check, Report
+from onfido.stub import StubServer
+
+# number of objects pulled in each round
+PULL_COUNT = 100
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("model", [Check, Report])
+def test_queryset_pull(benchmark, dataset, mock_api, model):
+    ids = list(model.objects.values_list("id", flat=True)[:PULL_COUNT])
+    benchmark(lambda: model.objects.filter(id__in=ids).pull())
+    assert mock_api.call_count >= len(ids)
+
+
+def test_api_get__stub(benchmark):
+    with StubServer() as stub, mock.patch("onfido.api.API_ROOT", stub.url):
+        applicant = stub.create_applicant({"first_name": "Fred"})
+        data = benchmark(get, f"applicants/{applicant['id']}")
+    assert data == applicant
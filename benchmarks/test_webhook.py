@@ -0,0 +1,67 @@
+"""Benchmarks for the webhook view (views.status_update)."""
+
+import json
+import logging
+import time
+
+import pytest
+from django.test import RequestFactory
+
+from onfido.decorators import _hmac
+from onfido.models import Check, Report
+from onfido.views import status_update
+
+from .conftest import _event
+
+
+def _request(token, payload):
+    body = json.dumps(payload).encode()
+    return RequestFactory().post(
+        "/",
+        body,
+        content_type="application/json",
+        HTTP_X_SHA2_SIGNATURE=_hmac(token, body),
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("model", [Check, Report])
+def test_status_update(benchmark, dataset, mock_api, webhook_token, model):
+    obj = model.objects.order_by("?").first()
+    payload = _event(obj.onfido_id)
+    payload["payload"]["resource_type"] = model._meta.model_name
+    request = _request(webhook_token, payload)
+    response = benchmark(status_update, request)
+    assert response.content == b"Update processed."
+
+
+@pytest.mark.django_db
+def test_status_update__not_found(benchmark, dataset, webhook_token):
+    request = _request(webhook_token, _event("does-not-exist"))
+    response = benchmark(status_update, request)
+    assert response.content == b"Check not found."
+
+
+@pytest.fixture
+def debug_logging_off():
+    logger = logging.getLogger("onfido")
+    level = logger.level
+    logger.setLevel(logging.INFO)
+    yield
+    logger.setLevel(level)
+
+
+@pytest.mark.django_db
+@pytest.mark.benchmark(timer=time.process_time)
+@pytest.mark.parametrize("payload_size", [0, 10_000, 1_000_000])
+def test_status_update__cpu(
+    benchmark, dataset, mock_api, webhook_token, debug_logging_off, payload_size
+):
+    # CPU time (not wall time) of the webhook view with debug logging disabled
+    # - large payloads should cost no more than the JSON parse and the HMAC.
+    obj = Check.objects.order_by("?").first()
+    payload = _event(obj.onfido_id)
+    payload["payload"]["object"]["padding"] = "x" * payload_size
+    request = _request(webhook_token, payload)
+    response = benchmark(status_update, request)
+    assert response.content == b"Update processed."
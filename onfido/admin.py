@@ -1,47 +1,247 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+import logging
+import threading
+from typing import TYPE_CHECKING, Any
 
 import simplejson as json  # simplejson supports Decimal
 from django.contrib import admin
-from django.db import models
-from django.http import HttpRequest
+from django.contrib.admin.models import CHANGE, LogEntry
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import connections, models, router
+from django.http import Http404, HttpRequest, HttpResponse
+from django.urls import NoReverseMatch, path, reverse
+from django.utils.html import escape, format_html, format_html_join
+from django.utils.http import urlencode
 from django.utils.safestring import mark_safe
 from django.utils.translation import gettext_lazy as _
 
-from .models import Applicant, Check, Event, Report
+from .models import Applicant, Check, Event, OutboxMessage, Report
+from .models.base import raw_cache_key
+from .paginator import ApproximateCountPaginator
+from .settings import (
+    ADMIN_EVENTS_PAGE_SIZE,
+    ADMIN_FAST_CHANGELIST,
+    ADMIN_RAW_CACHE_TIMEOUT,
+    ADMIN_RAW_PREVIEW_LENGTH,
+    OUTBOX_MAX_ATTEMPTS,
+    PULL_BACKGROUND_THRESHOLD,
+    PULL_MAX_WORKERS,
+    PULL_RATE_LIMIT,
+)
 
 if TYPE_CHECKING:
     from .models.base import BaseModel
 
+logger = logging.getLogger(__name__)
+
+# number of objects between progress log messages for background pulls
+PULL_PROGRESS_INTERVAL = 100
+
+
+def _pull_summary(stats: dict[str, int]) -> str:
+    """Format the stats returned by BaseQuerySet.pull for display."""
+    return ", ".join(f"{count} {outcome}" for outcome, count in stats.items())
+
+
+def _pull_in_background(model: type[BaseModel], pks: list, user_id: int) -> None:
+    """
+    Pull objects from a background thread, and log the outcome.
+
+    The outcome is logged, and recorded as an admin LogEntry for the user
+    who ran the action (so that it appears in their "Recent actions").
+
+    """
+
+    def progress(stats: dict[str, int]) -> None:
+        done = sum(stats.values())
+        if done % PULL_PROGRESS_INTERVAL == 0:
+            logger.info("Pulled %s of %s Onfido objects", done, len(pks))
+
+    try:
+        stats = model.objects.filter(pk__in=pks).pull(
+            max_workers=PULL_MAX_WORKERS, rate=PULL_RATE_LIMIT, progress=progress
+        )
+        message = f"Pulled {len(pks)} item(s) from Onfido: {_pull_summary(stats)}"
+        logger.info(message)
+        LogEntry.objects.log_action(
+            user_id=user_id,
+            content_type_id=ContentType.objects.get_for_model(model).pk,
+            object_id=None,
+            object_repr=model._meta.verbose_name_plural,
+            action_flag=CHANGE,
+            change_message=message,
+        )
+    except Exception:  # noqa: B902
+        logger.exception("Background pull from Onfido failed.")
+    finally:
+        # this thread's connection is not closed by the request cycle
+        connections.close_all()
+
 
 class ResultMixin(object):
     """Adds custom action for overriding is_clear."""
 
     def mark_as_clear(self, request: HttpRequest, queryset: models.QuerySet) -> None:
-        """Call mark_as_clear on all objects in the queryset."""
-        for obj in queryset:
-            obj.mark_as_clear(request.user)
+        """Call mark_as_clear on the queryset (in bulk)."""
+        count = queryset.mark_as_clear(request.user)
+        self.message_user(  # type: ignore[attr-defined]
+            request, _("%d item(s) marked as clear.") % count
+        )
 
     mark_as_clear.short_description = _("Mark selected items as clear")  # type: ignore
 
 
-class EventsMixin(object):
-    """Pretty print Events relating to an object."""
+class PullMixin(object):
+    """Adds custom action for pulling the latest state from the API."""
+
+    def pull_from_onfido(self, request: HttpRequest, queryset: models.QuerySet) -> None:
+        """
+        Pull the selected objects from the API.
+
+        Objects are fetched concurrently (see BaseQuerySet.pull). Selections
+        of more than PULL_BACKGROUND_THRESHOLD objects are pulled in a
+        background thread, and the outcome is recorded in the admin log. NB
+        the thread is killed (silently) if the worker process is recycled.
 
-    def _events(self, obj: Event) -> str:
+        """
+        pks = list(queryset.values_list("pk", flat=True))
+        if len(pks) > PULL_BACKGROUND_THRESHOLD:
+            threading.Thread(
+                target=_pull_in_background,
+                args=(queryset.model, pks, request.user.pk),
+                daemon=True,
+            ).start()
+            self.message_user(  # type: ignore[attr-defined]
+                request,
+                _(
+                    "Pulling %d item(s) from Onfido in the background - "
+                    "the outcome will be recorded in your recent actions."
+                )
+                % len(pks),
+            )
+            return
+        stats = queryset.pull(max_workers=PULL_MAX_WORKERS, rate=PULL_RATE_LIMIT)
+        self.message_user(  # type: ignore[attr-defined]
+            request,
+            _("Pulled %(count)d item(s) from Onfido: %(summary)s")
+            % {"count": len(pks), "summary": _pull_summary(stats)},
+        )
+
+    pull_from_onfido.short_description = _("Pull from Onfido")  # type: ignore
+
+
+class EventsMixin(object):
+    """
+    Pretty print Events relating to an object.
+
+    Only the most recent ONFIDO_ADMIN_EVENTS_PAGE_SIZE events are shown, with
+    a link to the (paginated) Event changelist, filtered to the object, if
+    there are more. Only the columns that are displayed are fetched.
+
+    """
+
+    def _events_url(self, obj: BaseModel) -> str | None:
+        """Return the URL of the Event changelist filtered to obj."""
+        if not hasattr(self, "admin_site"):
+            return None
+        try:
+            url = reverse("%s:onfido_event_changelist" % self.admin_site.name)
+        except NoReverseMatch:
+            return None
+        query = {"onfido_id": obj.onfido_id, "resource_type": obj._meta.model_name}
+        return "{}?{}".format(url, urlencode(query))
+
+    def _events(self, obj: BaseModel) -> str:
         """Pretty print object events."""
-        events = obj.events()
-        html = "".join(
-            ["<li>{}: {}</li>".format(e.completed_at.date(), e.action) for e in events]
+        events = list(
+            obj.events()
+            .only("completed_at", "action", "status")
+            .order_by("-completed_at", "-id")[: ADMIN_EVENTS_PAGE_SIZE + 1]
         )
-        return mark_safe("<ul>{}</ul>".format(html))  # noqa: S703, S308
+        more = events[ADMIN_EVENTS_PAGE_SIZE:]
+        html = format_html_join(
+            "",
+            "<li>{}: {} ({})</li>",
+            (
+                (e.completed_at.date(), e.action, e.status)
+                for e in reversed(events[:ADMIN_EVENTS_PAGE_SIZE])
+            ),
+        )
+        html = format_html("<ul>{}</ul>", html)
+        url = self._events_url(obj)
+        if more and url:
+            html += format_html('<p><a href="{}">{}</a></p>', url, _("All events"))
+        return html
 
     _events.short_description = _("Related events")  # type: ignore
 
 
+def _pretty(raw: dict) -> str:
+    """Return raw JSON indented, and with the keys in order."""
+    return json.dumps(raw, sort_keys=True, indent=4, separators=(",", ": "))
+
+
+def _raw_cache_key(obj: BaseModel, suffix: str) -> str | None:
+    """
+    Return the cache key for the rendered raw JSON of an object.
+
+    The cached value is removed whenever the object is saved (see
+    BaseModel.save) - Event.raw is not changed once it has been saved.
+    Unsaved objects are not cached.
+
+    """
+    return None if obj.pk is None else raw_cache_key(obj, suffix)
+
+
 class RawMixin(object):
-    """Admin mixin used to pprint raw JSON fields."""
+    """
+    Admin mixin used to pprint raw JSON fields.
+
+    The detail view shows a preview of the JSON (the first
+    ONFIDO_ADMIN_RAW_PREVIEW_LENGTH characters), with a link to the full
+    JSON, which is served by the "<pk>/raw/" admin view. Both are cached.
+
+    """
+
+    def get_urls(self) -> list:
+        info = self.model._meta.app_label, self.model._meta.model_name  # type: ignore
+        urls = [
+            path(
+                "<path:object_id>/raw/",
+                self.admin_site.admin_view(self.raw_view),  # type: ignore
+                name="%s_%s_raw" % info,
+            )
+        ]
+        return urls + super().get_urls()  # type: ignore[misc]
+
+    def raw_view(self, request: HttpRequest, object_id: str) -> HttpResponse:
+        """Return the full pretty-printed raw JSON of an object."""
+        obj = self.get_object(request, object_id)  # type: ignore[attr-defined]
+        if obj is None:
+            raise Http404
+        if not self.has_view_permission(request, obj):  # type: ignore[attr-defined]
+            raise PermissionDenied
+        key = _raw_cache_key(obj, "full")
+        pretty = cache.get(key) if key else None
+        if pretty is None:
+            pretty = _pretty(obj.raw)
+            if key:
+                cache.set(key, pretty, ADMIN_RAW_CACHE_TIMEOUT)
+        return HttpResponse(pretty, content_type="application/json")
+
+    def _raw_url(self, obj: BaseModel) -> str | None:
+        """Return the URL of the raw_view for obj (if it is registered)."""
+        if obj.pk is None or not hasattr(self, "admin_site"):
+            return None
+        info = self.admin_site.name, obj._meta.app_label, obj._meta.model_name
+        try:
+            return reverse("%s:%s_%s_raw" % info, args=[obj.pk])
+        except NoReverseMatch:
+            return None
 
     def _raw(self, obj: BaseModel) -> str:
         """
@@ -49,15 +249,36 @@ class RawMixin(object):
 
         Take the event_payload JSON, indent it, order the keys and then
         present it as a <code> block. That's about as good as we can get
-        until someone builds a custom syntax function.
+        until someone builds a custom syntax function. Long payloads are
+        truncated, with a link to the full JSON.
 
         """
-        pretty = json.dumps(obj.raw, sort_keys=True, indent=4, separators=(",", ": "))
-        html = pretty.replace(" ", "&nbsp;").replace("\n", "<br>")
-        return mark_safe("<code>{}</code>".format(html))  # noqa: S703, S308
+        key = _raw_cache_key(obj, "preview")
+        html = cache.get(key) if key else None
+        if html is None:
+            html = self._render_raw(obj)
+            if key:
+                cache.set(key, html, ADMIN_RAW_CACHE_TIMEOUT)
+        return mark_safe(html)  # noqa: S703, S308
 
     _raw.short_description = _("Raw (from API)")  # type: ignore
 
+    def _render_raw(self, obj: BaseModel) -> str:
+        pretty = _pretty(obj.raw)
+        preview = pretty[:ADMIN_RAW_PREVIEW_LENGTH]
+        # raw is third-party data, so must be escaped before it is marked safe
+        html = escape(preview).replace(" ", "&nbsp;").replace("\n", "<br>")
+        html = "<code>{}</code>".format(html)
+        if len(pretty) > len(preview):
+            url = self._raw_url(obj)
+            more = _("%(count)d more characters") % {
+                "count": len(pretty) - len(preview)
+            }
+            if url:
+                more = format_html('<a href="{}">{}</a>', url, more)
+            html += "<p>&hellip; ({})</p>".format(more)
+        return html
+
 
 class UserMixin(object):
     """Admin mixin used to add _user function."""
@@ -76,7 +297,50 @@ class UserMixin(object):
     _user.short_description = "User"  # type: ignore
 
 
-class ApplicantAdmin(RawMixin, UserMixin, admin.ModelAdmin):
+class FastChangelistMixin(object):
+    """
+    Make changelists cheaper on very large tables (ONFIDO_ADMIN_FAST_CHANGELIST).
+
+    When enabled, the changelist is ordered by primary key (which is indexed,
+    and doesn't need a join to the user table), the total count of the
+    unfiltered table is not shown, and the ApproximateCountPaginator is used.
+    On databases other than PostgreSQL (which has a trigram index for it),
+    onfido_id searches match the start of the id rather than any part of it.
+
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        if ADMIN_FAST_CHANGELIST:
+            self.show_full_result_count = False
+
+    def get_ordering(self, request: HttpRequest) -> tuple | list:
+        if ADMIN_FAST_CHANGELIST:
+            return ("-pk",)
+        return super().get_ordering(request)  # type: ignore[misc]
+
+    def get_paginator(
+        self, request: HttpRequest, queryset: models.QuerySet, *args: Any, **kwargs: Any
+    ) -> Paginator:
+        if ADMIN_FAST_CHANGELIST:
+            return ApproximateCountPaginator(queryset, *args, **kwargs)
+        return super().get_paginator(  # type: ignore[misc]
+            request, queryset, *args, **kwargs
+        )
+
+    def get_search_fields(self, request: HttpRequest) -> tuple | list:
+        search_fields = super().get_search_fields(request)  # type: ignore[misc]
+        db = router.db_for_read(self.model)  # type: ignore[attr-defined]
+        if not ADMIN_FAST_CHANGELIST or connections[db].vendor == "postgresql":
+            return search_fields
+        # without a trigram index (PostgreSQL only) a "contains" search is a
+        # full table scan - so match the start of the onfido_id instead.
+        return tuple(f"^{f}" if f.endswith("onfido_id") else f for f in search_fields)
+
+
+class ApplicantAdmin(
+    FastChangelistMixin, PullMixin, RawMixin, UserMixin, admin.ModelAdmin
+):
     """Admin model for Applicant objects."""
 
     list_display = ("onfido_id", "_user", "created_at")
@@ -86,12 +350,21 @@ class ApplicantAdmin(RawMixin, UserMixin, admin.ModelAdmin):
     search_fields = ("onfido_id", "user__first_name", "user__last_name")
     raw_id_fields = ("user",)
     exclude = ("raw",)
+    actions = ("pull_from_onfido",)
 
 
 admin.site.register(Applicant, ApplicantAdmin)
 
 
-class CheckAdmin(ResultMixin, EventsMixin, RawMixin, UserMixin, admin.ModelAdmin):
+class CheckAdmin(
+    FastChangelistMixin,
+    ResultMixin,
+    PullMixin,
+    EventsMixin,
+    RawMixin,
+    UserMixin,
+    admin.ModelAdmin,
+):
     """Admin model for Check objects."""
 
     list_display = (
@@ -119,13 +392,21 @@ class CheckAdmin(ResultMixin, EventsMixin, RawMixin, UserMixin, admin.ModelAdmin
     ordering = ("user__first_name", "user__last_name")
     raw_id_fields = ("applicant", "user")
     exclude = ("raw",)
-    actions = ("mark_as_clear",)
+    actions = ("mark_as_clear", "pull_from_onfido")
 
 
 admin.site.register(Check, CheckAdmin)
 
 
-class ReportAdmin(ResultMixin, EventsMixin, RawMixin, UserMixin, admin.ModelAdmin):
+class ReportAdmin(
+    FastChangelistMixin,
+    ResultMixin,
+    PullMixin,
+    EventsMixin,
+    RawMixin,
+    UserMixin,
+    admin.ModelAdmin,
+):
     """Admin model for Report objects."""
 
     list_display = (
@@ -159,13 +440,13 @@ class ReportAdmin(ResultMixin, EventsMixin, RawMixin, UserMixin, admin.ModelAdmi
     list_filter = ("created_at", "updated_at", "report_type", "status", "result")
     raw_id_fields = ("onfido_check", "user")
     exclude = ("raw",)
-    actions = ("mark_as_clear",)
+    actions = ("mark_as_clear", "pull_from_onfido")
 
 
 admin.site.register(Report, ReportAdmin)
 
 
-class EventAdmin(RawMixin, UserMixin, admin.ModelAdmin):
+class EventAdmin(FastChangelistMixin, RawMixin, UserMixin, admin.ModelAdmin):
     """Admin model for Event objects."""
 
     list_display = (
@@ -191,3 +472,71 @@ class EventAdmin(RawMixin, UserMixin, admin.ModelAdmin):
 
 
 admin.site.register(Event, EventAdmin)
+
+
+class OutboxStateFilter(admin.SimpleListFilter):
+    """Filter outbox messages by delivery state."""
+
+    title = _("delivery state")
+    parameter_name = "state"
+
+    def lookups(self, request: HttpRequest, model_admin: admin.ModelAdmin) -> list:
+        return [
+            ("pending", _("Pending")),
+            ("retrying", _("Retrying")),
+            ("abandoned", _("Abandoned")),
+        ]
+
+    def queryset(
+        self, request: HttpRequest, queryset: models.QuerySet
+    ) -> models.QuerySet:
+        if self.value() == "pending":
+            return queryset.filter(attempts=0)
+        if self.value() == "retrying":
+            return queryset.filter(attempts__gt=0, attempts__lt=OUTBOX_MAX_ATTEMPTS)
+        if self.value() == "abandoned":
+            return queryset.abandoned(OUTBOX_MAX_ATTEMPTS)
+        return queryset
+
+
+class OutboxMessageAdmin(admin.ModelAdmin):
+    """
+    Admin model for OutboxMessage objects.
+
+    Messages that have failed ONFIDO_OUTBOX_MAX_ATTEMPTS times are no longer
+    retried by onfido_dispatch_signals - they are shown here as "abandoned",
+    and can be queued for redelivery using the "retry" action.
+
+    """
+
+    list_display = (
+        "signal",
+        "resource_type",
+        "onfido_id",
+        "attempts",
+        "next_attempt_at",
+        "created_at",
+    )
+    list_filter = (OutboxStateFilter, "signal", "resource_type")
+    readonly_fields = (
+        "signal",
+        "resource_type",
+        "onfido_id",
+        "kwargs",
+        "created_at",
+        "attempts",
+        "next_attempt_at",
+        "last_error",
+    )
+    search_fields = ("onfido_id",)
+    actions = ("retry",)
+
+    def retry(self, request: HttpRequest, queryset: models.QuerySet) -> None:
+        """Queue the selected messages for immediate redelivery."""
+        count = queryset.retry()
+        self.message_user(request, _("%d message(s) queued for retry.") % count)
+
+    retry.short_description = _("Retry selected messages")  # type: ignore
+
+
+admin.site.register(OutboxMessage, OutboxMessageAdmin)
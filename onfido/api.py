@@ -1,23 +1,32 @@
 """
-Basic wire operations with the API - GET/POST/PUT.
+Basic wire operations with the API - GET/POST/PUT, and file uploads / downloads.
 
 This is a simple wrapper around requests.
 
 """
+
 from __future__ import annotations
 
 import logging
+import mimetypes
+import os
+import uuid
+from typing import Any, Iterator
 from urllib import parse as urlparse
 
 import requests
+from django.core.files import File
+from django.core.files.storage import Storage
 from django.http import HttpResponse
 
-from .settings import API_KEY
+from . import metrics, tracing
+from .logs import log_payload
+from .settings import API_KEY, API_ROOT
 
 logger = logging.getLogger(__name__)
 
-# the API HTTP root url
-API_ROOT = "https://api.onfido.com/v3/"
+# size of the chunks in which files are streamed to / from the API
+CHUNK_SIZE = 64 * 1024
 
 
 class ApiError(Exception):
@@ -26,7 +35,7 @@ class ApiError(Exception):
     def __init__(self, response: HttpResponse) -> None:
         """Initialise error from response object."""
         data = response.json()
-        logger.debug("Onfido API error: {}".format(data))
+        log_payload(logger, "Onfido API error: %s", payload=data)
         super().__init__(data["error"]["message"])
         self.status_code = response.status_code
         self.error_type = data["error"]["type"]
@@ -37,6 +46,11 @@ def _url(path: str) -> str:
     return urlparse.urljoin(API_ROOT, path)
 
 
+def _endpoint(href: str) -> str:
+    """Return the resource part of an href (used to tag metrics)."""
+    return href.split("?")[0].strip("/").split("/")[0]
+
+
 def _headers(api_key: str = API_KEY) -> dict[str, str]:
     """Format request headers."""
     return {
@@ -50,17 +64,164 @@ def _respond(response: HttpResponse) -> dict:
     if not str(response.status_code).startswith("2"):
         raise ApiError(response)
     data = response.json()
-    logger.debug("Onfido API response: %s", data)
+    log_payload(logger, "Onfido API response: %s", payload=data)
     return data
 
 
 def get(href: str) -> dict:
     """Make a GET request and return the response as JSON."""
     logger.debug("Onfido API GET request: %s", href)
-    return _respond(requests.get(_url(href), headers=_headers()))
+    endpoint = _endpoint(href)
+    with metrics.timer(
+        "api_request", method="get", endpoint=endpoint, status="error"
+    ) as tags, tracing.span(
+        "onfido.api.get", resource_type=endpoint, href=href
+    ) as current:
+        response = requests.get(_url(href), headers=_headers())
+        tags["status"] = str(response.status_code)
+        current.set_attribute("http.status_code", response.status_code)
+    return _respond(response)
 
 
 def post(href: str, data: dict) -> dict:
     """Make a POST request and return the response as JSON."""
-    logger.debug("Onfido API POST request: %s: %s", href, data)
-    return _respond(requests.post(_url(href), headers=_headers(), json=data))
+    log_payload(logger, "Onfido API POST request: %s: %s", href, payload=data)
+    endpoint = _endpoint(href)
+    with metrics.timer(
+        "api_request", method="post", endpoint=endpoint, status="error"
+    ) as tags, tracing.span(
+        "onfido.api.post", resource_type=endpoint, href=href
+    ) as current:
+        response = requests.post(_url(href), headers=_headers(), json=data)
+        tags["status"] = str(response.status_code)
+        current.set_attribute("http.status_code", response.status_code)
+    return _respond(response)
+
+
+def _quote(value: str) -> str:
+    """Escape a multipart header parameter value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+class MultipartStream:
+    """
+    A multipart/form-data request body that streams its file from disk.
+
+    requests builds multipart bodies (files=...) in memory, which means
+    holding the whole file (and a copy of it) in memory. This is iterated
+    over by requests instead, yielding the file in CHUNK_SIZE chunks, and
+    has a length (so that a Content-Length header is sent rather than using
+    chunked transfer encoding).
+
+    """
+
+    def __init__(self, fields: dict[str, Any], name: str, file: File) -> None:
+        self.boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={self.boundary}"
+        self.file = file
+        self.head = b"".join(self._field(k, v) for k, v in fields.items())
+        filename = os.path.basename(file.name or name)
+        file_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        self.head += self._part(
+            f'name="{name}"; filename="{_quote(filename)}"',
+            f"Content-Type: {file_type}\r\n",
+        )
+        self.tail = f"\r\n--{self.boundary}--\r\n".encode()
+
+    def _part(self, disposition: str, headers: str = "") -> bytes:
+        return (
+            f"--{self.boundary}\r\n"
+            f"Content-Disposition: form-data; {disposition}\r\n"
+            f"{headers}\r\n"
+        ).encode()
+
+    def _field(self, name: str, value: Any) -> bytes:
+        if isinstance(value, bool):
+            value = str(value).lower()
+        return self._part(f'name="{_quote(name)}"') + f"{value}\r\n".encode()
+
+    def __len__(self) -> int:
+        return len(self.head) + self.file.size + len(self.tail)
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield self.head
+        yield from self.file.chunks(CHUNK_SIZE)
+        yield self.tail
+
+
+def upload(href: str, data: dict, file: File, name: str = "file") -> dict:
+    """
+    Make a multipart POST request that uploads a file, and return the JSON.
+
+    The file (a Django File, e.g. an UploadedFile, or one opened from a
+    storage backend) is streamed to the API in chunks, so that it is never
+    held in memory. data is sent as the other form fields.
+
+    """
+    log_payload(logger, "Onfido API upload request: %s: %s", href, payload=data)
+    body = MultipartStream(data, name, file)
+    headers = dict(_headers(), **{"Content-Type": body.content_type})
+    endpoint = _endpoint(href)
+    with metrics.timer(
+        "api_request", method="post", endpoint=endpoint, status="error"
+    ) as tags, tracing.span(
+        "onfido.api.upload", resource_type=endpoint, href=href, size=file.size
+    ) as current:
+        response = requests.post(_url(href), headers=headers, data=body)
+        tags["status"] = str(response.status_code)
+        current.set_attribute("http.status_code", response.status_code)
+    return _respond(response)
+
+
+class ResponseFile(File):
+    """
+    A Django File that streams the body of a (stream=True) response.
+
+    Storage backends read the content using chunks() (or read()), so the
+    response body is passed through to the storage in CHUNK_SIZE chunks,
+    rather than being loaded into memory first.
+
+    """
+
+    def __init__(self, response: requests.Response, name: str) -> None:
+        response.raw.decode_content = True
+        super().__init__(response.raw, name)
+        self.response = response
+        length = response.headers.get("Content-Length")
+        if length and not response.headers.get("Content-Encoding"):
+            self.size = int(length)
+
+    def chunks(self, chunk_size: int | None = None) -> Iterator[bytes]:
+        return self.response.iter_content(chunk_size or CHUNK_SIZE)
+
+    def multiple_chunks(self, chunk_size: int | None = None) -> bool:
+        return True
+
+
+def download(href: str, storage: Storage, name: str) -> str:
+    """
+    Make a GET request and save the (binary) response to storage.
+
+    The response is streamed into the storage backend, so it is never held
+    in memory. If name has no extension, one is added based on the response
+    Content-Type (e.g. ".pdf"). Returns the name of the saved file, which
+    may differ from name if the storage backend doesn't overwrite files.
+
+    """
+    logger.debug("Onfido API download request: %s", href)
+    endpoint = _endpoint(href)
+    with metrics.timer(
+        "api_request", method="get", endpoint=endpoint, status="error"
+    ) as tags, tracing.span(
+        "onfido.api.download", resource_type=endpoint, href=href
+    ) as current, requests.get(
+        _url(href), headers=_headers(), stream=True
+    ) as response:
+        tags["status"] = str(response.status_code)
+        current.set_attribute("http.status_code", response.status_code)
+        if not str(response.status_code).startswith("2"):
+            raise ApiError(response)
+        if not os.path.splitext(name)[1]:
+            content_type = response.headers.get("Content-Type", "")
+            name += mimetypes.guess_extension(content_type.split(";")[0]) or ""
+        return storage.save(name, ResponseFile(response, name))
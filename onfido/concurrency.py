@@ -0,0 +1,97 @@
+"""
+Helpers for making rate-limited, concurrent calls to the Onfido API.
+
+The API calls are made from a pool of worker threads, but the results are
+yielded back to the calling thread, so that all database access (saving
+the results) stays in the calling thread.
+
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Iterable, Iterator
+
+from django.db import connections
+
+
+class RateLimiter:
+    """Thread-safe limiter that spaces calls at least 1 / rate seconds apart."""
+
+    def __init__(self, rate: float | None = None) -> None:
+        self.interval = 1 / rate if rate else 0.0
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+
+    def wait(self) -> None:
+        """Block until the next call is allowed."""
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            at = max(now, self.next_at)
+            self.next_at = at + self.interval
+        if at > now:
+            time.sleep(at - now)
+
+
+def map_concurrently(
+    func: Callable,
+    items: Iterable,
+    max_workers: int = 1,
+    rate: float | None = None,
+) -> Iterator[tuple[Any, Any, Exception | None]]:
+    """
+    Call func on each item, and yield (item, result, error) tuples.
+
+    Calls are made from up to max_workers threads, and are limited to rate
+    calls per second (across all threads). Results are yielded as they
+    complete, so they are not in the same order as items. Exceptions
+    raised by func are yielded as the error (with a result of None) rather
+    than raised. If max_workers is 1, no threads are used.
+
+    func is called from the worker threads, so it should not use the
+    database - any connections that it does open are closed after each call.
+
+    """
+    limiter = RateLimiter(rate)
+
+    def call(item: Any) -> Any:
+        limiter.wait()
+        return func(item)
+
+    if max_workers <= 1:
+        return _map_sequentially(call, items)
+    return _map_in_threads(call, items, max_workers)
+
+
+def _map_sequentially(
+    func: Callable, items: Iterable
+) -> Iterator[tuple[Any, Any, Exception | None]]:
+    for item in items:
+        try:
+            yield item, func(item), None
+        except Exception as ex:  # noqa: B902
+            yield item, None, ex
+
+
+def _map_in_threads(
+    func: Callable, items: Iterable, max_workers: int
+) -> Iterator[tuple[Any, Any, Exception | None]]:
+    def call_in_thread(item: Any) -> Any:
+        try:
+            return func(item)
+        finally:
+            # func should not touch the database, but if it does, don't
+            # leave a connection open for each worker thread.
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(call_in_thread, item): item for item in items}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as ex:  # noqa: B902
+                yield futures[future], None, ex
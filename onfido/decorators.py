@@ -3,16 +3,25 @@ from __future__ import annotations
 import hashlib
 import hmac
 import logging
+import threading
+import time
 from functools import wraps
 from typing import Any, Callable
 
 from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
 
-from .settings import TEST_MODE, WEBHOOK_TOKEN
+from . import metrics
+from .logs import log_payload
+from .settings import TEST_MODE, WEBHOOK_TOKENS_TTL, load_webhook_tokens
 
 logger = logging.getLogger(__name__)
 
+# minimum number of seconds between reloads forced by a signature mismatch
+MIN_RELOAD_INTERVAL = 5
+
 
 def _hmac(token: bytes, text: bytes) -> str:
     """
@@ -30,40 +39,129 @@ def _hmac(token: bytes, text: bytes) -> str:
     return auth_code
 
 
-def _match(token: bytes, request: HttpRequest) -> bool:
+def token_id(token: bytes) -> str:
+    """Return a short fingerprint of a token that is safe to log."""
+    return hashlib.sha256(token).hexdigest()[:8]
+
+
+class WebhookKeys:
+    """
+    The set of valid webhook tokens, held as precomputed HMAC objects.
+
+    The HMAC key setup is done once per token when the tokens are loaded,
+    and each request copies the keyed HMAC object rather than creating a
+    new one. The tokens are reloaded (using the loader function) once they
+    are more than ttl seconds old, when reload() is called (e.g. on the
+    setting_changed signal), and when a signature does not match any token
+    (at most once every MIN_RELOAD_INTERVAL seconds). This means that a new
+    token can be added (and an old one removed) without a restart, and
+    without rejecting requests that are signed with the new token.
+
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], list[bytes]] = load_webhook_tokens,
+        ttl: int = WEBHOOK_TOKENS_TTL,
+    ) -> None:
+        self.loader = loader
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.keys: list[tuple[str, Any]] = []
+        self.loaded_at: float | None = None
+
+    def reload(self) -> None:
+        """Load the tokens and precompute their HMAC objects."""
+        with self.lock:
+            try:
+                tokens = self.loader()
+            except Exception:  # noqa: B902
+                # keep the current tokens, and try again after ttl seconds
+                logger.exception("Error loading Onfido webhook tokens.")
+            else:
+                self.keys = [
+                    (token_id(token), hmac.new(token, digestmod=hashlib.sha256))
+                    for token in tokens
+                ]
+            self.loaded_at = time.monotonic()
+
+    def expire(self) -> None:
+        """Force the tokens to be reloaded on next use."""
+        self.loaded_at = None
+
+    def _age(self) -> float:
+        if self.loaded_at is None:
+            return float("inf")
+        return time.monotonic() - self.loaded_at
+
+    def get(self) -> list[tuple[str, Any]]:
+        """Return the list of (token id, HMAC object), reloading if expired."""
+        if self._age() > self.ttl:
+            self.reload()
+        return self.keys
+
+    def _match(self, body: bytes, signature: str) -> str | None:
+        for key_id, key in self.get():
+            digest = key.copy()
+            digest.update(body)
+            if hmac.compare_digest(digest.hexdigest(), signature):
+                return key_id
+        return None
+
+    def match(self, body: bytes, signature: str) -> str | None:
+        """Return the id of the token that body was signed with, or None."""
+        matched = self._match(body, signature)
+        if matched is None and self._age() > MIN_RELOAD_INTERVAL:
+            # the token may have been rotated since the tokens were loaded
+            self.reload()
+            matched = self._match(body, signature)
+        return matched
+
+
+webhook_keys = WebhookKeys()
+
+
+@receiver(setting_changed)
+def reload_webhook_keys(setting: str, **kwargs: Any) -> None:
+    """Reload the webhook tokens if the token settings are changed."""
+    if setting.startswith("ONFIDO_WEBHOOK_TOKEN"):
+        webhook_keys.expire()
+
+
+def _match(request: HttpRequest) -> str | None:
     """
-    Calculate signature and return True if it matches header.
+    Calculate signature and check that it matches the header.
 
     Args:
-        token: string, the webhook_token.
         request: an HttpRequest object from which the body content and
             X-Signature header will be extracted and matched.
 
-    Returns True if there is a match.
+    Returns the id of the matching token if there is a match, else None.
 
     """
     try:
         signature = request.headers["X-SHA2-Signature"]
         logger.debug("Onfido callback X-Signature: %s", signature)
-        logger.debug("Onfido callback request body: %s", request.body)
-        return _hmac(token, request.body) == signature
+        log_payload(logger, "Onfido callback request body: %s", payload=request.body)
+        return webhook_keys.match(request.body, signature)
     except KeyError:
         logger.warning(
             "Onfido callback missing X-Signature - this may be an unauthorised request."
         )
-        return False
+        return None
     except Exception:  # noqa: B902
         logger.exception("Error attempting to decode Onfido signature.")
-        return False
+        return None
 
 
 def verify_signature() -> Callable:
     """
     View function decorator used to verify Onfido webhook signatures.
 
-    This function uses the WEBHOOK_TOKEN specified in settings to calculate
-    the HMAC. If it doesn't exist, then this decorator will immediately fail
-    hard with an ImproperlyConfigured exception.
+    This function verifies the HMAC against each of the webhook tokens (see
+    WebhookKeys), and records the id of the matching token on the request as
+    request.onfido_webhook_token_id. If there are no tokens, then this
+    decorator will immediately fail hard with an ImproperlyConfigured exception.
 
     If TEST_MODE is on (ONFIDO_TEST_MODE setting) then the verification will
     be ignored.
@@ -96,9 +194,13 @@ def verify_signature() -> Callable:
                     "Ignoring Onfido callback verification (ONFIDO_TEST_MODE enabled)"
                 )
                 return func(request, *args, **kwargs)
-            if not WEBHOOK_TOKEN:
+            if not webhook_keys.get():
                 raise ImproperlyConfigured("Missing ONFIDO_WEBHOOK_TOKEN")
-            if _match(WEBHOOK_TOKEN, request):
+            matched = _match(request)
+            if matched:
+                logger.debug("Onfido callback signed with token: %s", matched)
+                metrics.increment("webhook_token", token=matched)
+                request.onfido_webhook_token_id = matched
                 return func(request, *args, **kwargs)
             else:
                 # logging as a warning means it'll likely appear in logs,
@@ -1,11 +1,44 @@
 from __future__ import annotations
 
-from typing import Any, Iterable
+import logging
+from typing import Any, Iterable, NamedTuple
 
 from django.conf import settings
+from django.core.files import File
+from django.db import DatabaseError, transaction
 
-from .api import get, post
+from . import tracing
+from .api import get, post, upload
+from .concurrency import map_concurrently
 from .models import Applicant, Check, Report
+from .models.check import VerificationStatus
+from .settings import CREATE_APPLICANTS_MAX_WORKERS, CREATE_APPLICANTS_RATE_LIMIT
+
+logger = logging.getLogger(__name__)
+
+
+class ApplicantResult(NamedTuple):
+    """The outcome of creating an applicant for a user - see create_applicants."""
+
+    user: Any
+    applicant: Applicant | None
+    error: Exception | None
+
+    @property
+    def ok(self) -> bool:
+        """Return True if the applicant was created."""
+        return self.error is None
+
+
+def _applicant_data(user: settings.AUTH_USER_MODEL, **kwargs: Any) -> dict:
+    """Return the data used to create an applicant for user."""
+    data = {
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "email": user.email,
+    }
+    data.update(kwargs)
+    return data
 
 
 def create_applicant(user: settings.AUTH_USER_MODEL, **kwargs: Any) -> Applicant:
@@ -20,14 +53,71 @@ def create_applicant(user: settings.AUTH_USER_MODEL, **kwargs: Any) -> Applicant
        country, and any others that may change over time.
        See https://documentation.onfido.com/#create-applicant for details.
     """
-    data = {
-        "first_name": user.first_name,
-        "last_name": user.last_name,
-        "email": user.email,
-    }
-    data.update(kwargs)
-    response = post("applicants", data)
-    return Applicant.objects.create_applicant(user, response)
+    data = _applicant_data(user, **kwargs)
+    with tracing.span("onfido.create_applicant", resource_type="applicant"):
+        response = post("applicants", data)
+        return Applicant.objects.create_applicant(user, response)
+
+
+def create_applicants(
+    users: Iterable[settings.AUTH_USER_MODEL],
+    max_workers: int = CREATE_APPLICANTS_MAX_WORKERS,
+    rate: float | None = CREATE_APPLICANTS_RATE_LIMIT,
+    batch_size: int = 500,
+    **kwargs: Any,
+) -> list[ApplicantResult]:
+    """
+    Create applicants in the Onfido system for many users.
+
+    This is the bulk equivalent of create_applicant - the applicants are
+    created using up to max_workers concurrent API requests (at most rate
+    requests per second), and the local Applicant objects are inserted
+    using bulk_create, in batches of batch_size. As with bulk_create, save()
+    (and so full_clean) is not called on the objects.
+
+    Args:
+        users: the Django users to register as applicants.
+        max_workers: the number of concurrent API requests.
+        rate: the maximum number of API requests per second.
+        batch_size: the number of rows inserted per bulk_create statement.
+
+    Kwargs:
+        any kwargs passed in are merged into the data dict sent to the API
+        for every user - see create_applicant.
+
+    Returns an ApplicantResult (user, applicant, error) for each user, in the
+    same order as users. If the API request for a user fails, the error is
+    returned in the result rather than raised.
+
+    """
+    users = list(users)
+    items = [(i, user, _applicant_data(user, **kwargs)) for i, user in enumerate(users)]
+    results: list = [None] * len(users)
+    created = []
+    for (i, user, _), response, error in map_concurrently(
+        lambda item: post("applicants", item[2]), items, max_workers, rate
+    ):
+        if error:
+            results[i] = ApplicantResult(user, None, error)
+        else:
+            created.append((i, Applicant(user=user).parse(response)))
+    for start in range(0, len(created), batch_size):
+        batch = created[start : start + batch_size]
+        try:
+            with transaction.atomic():
+                Applicant.objects.bulk_create([applicant for _, applicant in batch])
+        except DatabaseError as ex:
+            # the applicants exist in Onfido, so log their ids - they can be
+            # recovered using the onfido_import command.
+            logger.exception(
+                "Error saving Onfido applicants: %s", [a.onfido_id for _, a in batch]
+            )
+            for i, applicant in batch:
+                results[i] = ApplicantResult(applicant.user, None, ex)
+        else:
+            for i, applicant in batch:
+                results[i] = ApplicantResult(applicant.user, applicant, None)
+    return results
 
 
 def create_check(applicant: Applicant, report_names: Iterable, **kwargs: Any) -> Check:
@@ -53,9 +143,112 @@ def create_check(applicant: Applicant, report_names: Iterable, **kwargs: Any) ->
     }
     # merge in the additional kwargs
     data.update(kwargs)
-    response = post("checks", data)
-    check = Check.objects.create_check(applicant=applicant, raw=response)
-    reports = get(f"reports?check_id={check.onfido_id}")
-    for report in reports["reports"]:
-        Report.objects.create_report(check=check, raw=report)
+    with tracing.span("onfido.create_check", resource_type="check") as current:
+        response = post("checks", data)
+        check = Check.objects.create_check(applicant=applicant, raw=response)
+        current.set_attribute("onfido_id", check.onfido_id)
+        reports = get(f"reports?check_id={check.onfido_id}")
+        for report in reports["reports"]:
+            Report.objects.create_report(check=check, raw=report)
     return check
+
+
+def upload_document(
+    applicant: Applicant,
+    file: File,
+    document_type: str,
+    side: str | None = None,
+    **kwargs: Any,
+) -> dict:
+    """
+    Upload an identity document for an applicant.
+
+    Args:
+        applicant: Applicant to whom the document belongs.
+        file: a Django File (e.g. an UploadedFile, or storage.open(name)) -
+            this is streamed to the API, and is not read into memory.
+        document_type: the type of document - e.g. passport, driving_licence.
+        side: "front" or "back", for two-sided documents.
+
+    Kwargs:
+        any kwargs passed in are merged into the form data sent to the API -
+        e.g. issuing_country. See https://documentation.onfido.com/#documents
+        for details.
+
+    Returns the API response (the document object) as a dict.
+
+    """
+    data = {"applicant_id": applicant.onfido_id, "type": document_type}
+    if side:
+        data["side"] = side
+    data.update(kwargs)
+    return upload("documents", data, file)
+
+
+def upload_documents(
+    applicant: Applicant, files: dict[str, File], document_type: str, **kwargs: Any
+) -> dict[str, dict]:
+    """
+    Upload the sides of a document concurrently.
+
+    Args:
+        applicant: Applicant to whom the document belongs.
+        files: dict of side ("front", "back") to File.
+        document_type: the type of document - e.g. driving_licence.
+
+    Kwargs are passed to upload_document. Returns a dict of side to the API
+    response. If any of the uploads fails, the first error is raised (once
+    all of the uploads have finished).
+
+    """
+
+    def _upload(side: str) -> dict:
+        return upload_document(applicant, files[side], document_type, side, **kwargs)
+
+    responses = {}
+    errors = []
+    for side, response, error in map_concurrently(
+        _upload, files, max_workers=len(files)
+    ):
+        if error:
+            errors.append(error)
+        responses[side] = response
+    if errors:
+        raise errors[0]
+    return responses
+
+
+def upload_live_photo(applicant: Applicant, file: File, **kwargs: Any) -> dict:
+    """
+    Upload a live photo (selfie) of an applicant.
+
+    Args:
+        applicant: Applicant who is in the photo.
+        file: a Django File - this is streamed to the API.
+
+    Kwargs:
+        any kwargs passed in are merged into the form data sent to the API -
+        e.g. advanced_validation. See https://documentation.onfido.com/#live-photos
+        for details.
+
+    Returns the API response (the live photo object) as a dict.
+
+    """
+    data = {"applicant_id": applicant.onfido_id}
+    data.update(kwargs)
+    return upload("live_photos", data, file)
+
+
+def user_verification_status(user: settings.AUTH_USER_MODEL) -> VerificationStatus:
+    """
+    Return the (cached) status / result of the user's most recent check.
+
+    This is cheap enough to call on every request - the value is only
+    fetched from the database when the user's checks have changed. Use
+    the is_verified property to see if the check is complete and clear:
+
+        >>> user_verification_status(request.user).is_verified
+        True
+
+    """
+    return Check.objects.verification_status(user)
@@ -0,0 +1,54 @@
+"""
+Guarded, size-capped debug logging of API and webhook payloads.
+
+Payloads can be large, and formatting them on every request is wasted CPU
+when debug logging is off. Payloads are only logged if the LOG_PAYLOADS
+setting (ONFIDO_LOG_PAYLOADS) is on and the logger is enabled for DEBUG,
+and are only formatted if the record is actually emitted. Each payload is
+truncated to LOG_PAYLOAD_MAX_LENGTH characters.
+
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any
+
+from .settings import LOG_PAYLOAD_MAX_LENGTH, LOG_PAYLOADS
+
+
+class LazyPayload:
+    """Wrapper that defers formatting (and truncation) of a payload."""
+
+    __slots__ = ("payload", "max_length")
+
+    def __init__(self, payload: Any, max_length: int = LOG_PAYLOAD_MAX_LENGTH) -> None:
+        self.payload = payload
+        self.max_length = max_length
+
+    def __str__(self) -> str:
+        if isinstance(self.payload, bytes):
+            # slice before decoding, so that a huge body is never decoded
+            text = self.payload[: self.max_length + 1].decode(errors="replace")
+            length = len(self.payload)
+        elif isinstance(self.payload, (dict, list)):
+            text = json.dumps(self.payload, default=str)
+            length = len(text)
+        else:
+            text = str(self.payload)
+            length = len(text)
+        if length > self.max_length:
+            return f"{text[:self.max_length]}... ({length} chars)"
+        return text
+
+
+def log_payload(logger: logging.Logger, msg: str, *args: Any, payload: Any) -> None:
+    """
+    Log msg at DEBUG level, with payload as the final format arg.
+
+        >>> log_payload(logger, "Onfido API POST request: %s: %s", href, payload=data)
+
+    """
+    if LOG_PAYLOADS and logger.isEnabledFor(logging.DEBUG):
+        logger.debug(msg, *args, LazyPayload(payload))
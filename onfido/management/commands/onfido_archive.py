@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import time
+from argparse import ArgumentParser
+from collections import defaultdict
+from typing import Any
+
+from django.core.files.storage import Storage, default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from ...concurrency import RateLimiter, map_concurrently
+from ...models import Check, Report
+
+
+class Command(BaseCommand):
+
+    help = (
+        "Download Check PDFs (and optionally documents) into file storage. "
+        "Checks whose PDF is already in storage are skipped, as are documents "
+        "that are already in storage, so the command can safely be re-run."
+    )
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument(
+            "--path", default="onfido", help="Storage directory for the archive"
+        )
+        parser.add_argument(
+            "--documents",
+            action="store_true",
+            help="Also download the documents used by each check's reports",
+        )
+        parser.add_argument(
+            "--filter", nargs="+", help="Check status values to filter on"
+        )
+        parser.add_argument(
+            "--exclude", nargs="+", help="Check status values to exclude"
+        )
+        parser.add_argument(
+            "--workers", type=int, default=4, help="Number of concurrent downloads"
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=5,
+            help="Maximum number of API requests per second (0 for no limit)",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options["workers"] < 1 or options["rate"] < 0:
+            raise CommandError("--workers and --rate must be positive")
+        filters = options["filter"]
+        excludes = options["exclude"]
+        checks = Check.objects.all()
+        checks = checks.filter(status__in=filters) if filters else checks
+        checks = checks.exclude(status__in=excludes) if excludes else checks
+        # loaded here, as the worker threads must not use the database
+        check_list = list(checks.order_by("id").only("onfido_id"))
+        reports: dict[str, list[Report]] = defaultdict(list)
+        if options["documents"]:
+            documents = Report.objects.filter(onfido_check__in=checks).select_related(
+                "onfido_check"
+            )
+            for report in documents.only("raw", "onfido_check__onfido_id").iterator():
+                reports[report.onfido_check.onfido_id].append(report)
+
+        limiter = RateLimiter(options["rate"])
+        path = options["path"].rstrip("/")
+
+        def archive(check: Check) -> int:
+            return self.archive(
+                default_storage,
+                f"{path}/{check.onfido_id}",
+                check,
+                reports[check.onfido_id],
+                limiter,
+            )
+
+        start = time.monotonic()
+        stats = {"checks": 0, "files": 0, "skipped": 0, "failed": 0}
+        for check, files, error in map_concurrently(
+            archive, check_list, max_workers=options["workers"]
+        ):
+            if error:
+                self.stderr.write(f"Error archiving check {check.onfido_id}: {error!r}")
+                stats["failed"] += 1
+            elif files:
+                stats["checks"] += 1
+                stats["files"] += files
+            else:
+                stats["skipped"] += 1
+        self.stdout.write(
+            "Archived {checks} checks ({files} files) in {elapsed:.2f}s; "
+            "skipped {skipped} already archived; {failed} failed.".format(
+                elapsed=time.monotonic() - start, **stats
+            )
+        )
+
+    def archive(
+        self,
+        storage: Storage,
+        directory: str,
+        check: Check,
+        reports: list[Report],
+        limiter: RateLimiter,
+    ) -> int:
+        """
+        Download the files for a check, and return the number downloaded.
+
+        This is called from the worker threads, so it must not use the
+        database. The check PDF is downloaded last, so that its existence
+        marks the check as archived - a check whose PDF already exists is
+        skipped (and 0 is returned). Documents that were downloaded by an
+        earlier (interrupted) run are not downloaded again.
+
+        """
+        pdf = f"{directory}/check.pdf"
+        if storage.exists(pdf):
+            return 0
+        files = 0
+        for report in reports:
+            files += len(
+                report.download_documents(
+                    storage,
+                    f"{directory}/documents",
+                    skip_existing=True,
+                    limiter=limiter,
+                )
+            )
+        limiter.wait()
+        check.download_pdf(storage, pdf)
+        return files + 1
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import time
+from argparse import ArgumentParser
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from ...models import OutboxMessage
+from ...settings import OUTBOX_MAX_ATTEMPTS
+
+
+class Command(BaseCommand):
+
+    help = "Deliver status signals queued in the outbox (ONFIDO_SIGNAL_OUTBOX)."
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Number of messages to deliver per transaction",
+        )
+        parser.add_argument(
+            "--max-attempts",
+            type=int,
+            default=OUTBOX_MAX_ATTEMPTS,
+            help="Stop retrying messages that have failed this many times",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling the outbox instead of exiting once it is empty",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds to sleep between polls when the outbox is empty",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        while True:
+            stats = OutboxMessage.objects.dispatch(
+                batch_size=options["batch_size"],
+                max_attempts=options["max_attempts"],
+            )
+            if stats["delivered"] or stats["failed"]:
+                self.stdout.write(
+                    "Delivered {delivered} signals ({failed} failed, {abandoned} "
+                    "abandoned); latency max {max_latency:.3f}s, "
+                    "mean {mean_latency:.3f}s".format(**stats)
+                )
+            if stats["abandoned"]:
+                self.stderr.write(
+                    f"{stats['abandoned']} signals have failed "
+                    f"{options['max_attempts']} times and will not be retried"
+                )
+            # a fully delivered batch means there are probably more waiting -
+            # failed messages are not retried until their backoff has passed,
+            # so they don't count.
+            if stats["delivered"] == options["batch_size"]:
+                continue
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
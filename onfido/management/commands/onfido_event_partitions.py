@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from argparse import ArgumentParser
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from ... import partitions
+
+
+class Command(BaseCommand):
+
+    help = "Manage monthly partitions of the Event table (PostgreSQL only)."
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument(
+            "action",
+            choices=["convert", "create", "drop", "list"],
+            help=(
+                "convert the Event table to a partitioned table (once), "
+                "create future partitions, drop old partitions, or list them"
+            ),
+        )
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=3,
+            help="Number of future months to create partitions for",
+        )
+        parser.add_argument(
+            "--keep-months",
+            type=int,
+            default=12,
+            help="Number of past months to keep when dropping partitions",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if connection.vendor != "postgresql":
+            raise CommandError("Event partitioning is only supported on PostgreSQL.")
+        action = options["action"]
+        if action != "convert" and not partitions.is_partitioned():
+            raise CommandError("The Event table is not partitioned - run 'convert'.")
+        getattr(self, f"do_{action}")(**options)
+
+    def do_convert(self, months_ahead: int, **options: Any) -> None:
+        if partitions.is_partitioned():
+            raise CommandError("The Event table is already partitioned.")
+        partitions.convert(months_ahead=months_ahead)
+        self.stdout.write("Converted Event table to a partitioned table.")
+
+    def do_create(self, months_ahead: int, **options: Any) -> None:
+        names = partitions.create_partitions(months_ahead=months_ahead)
+        self.stdout.write(f"Created partitions: {', '.join(names) or 'none'}")
+
+    def do_drop(self, keep_months: int, **options: Any) -> None:
+        names = partitions.drop_partitions(keep_months=keep_months)
+        self.stdout.write(f"Dropped partitions: {', '.join(names) or 'none'}")
+
+    def do_list(self, **options: Any) -> None:
+        for name in partitions.list_partitions():
+            self.stdout.write(name)
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import time
+from argparse import ArgumentParser
+from typing import Any, Iterator
+
+from django.core.management.base import BaseCommand
+
+from ...api import get
+from ...models import Applicant, Check, Report
+from ...settings import resolve_applicant_user
+
+
+def iter_applicants(per_page: int) -> Iterator[list[dict]]:
+    """Page through the remote applicants list, one page at a time."""
+    page = 1
+    while True:
+        applicants = get(f"applicants?page={page}&per_page={per_page}")["applicants"]
+        if applicants:
+            yield applicants
+        if len(applicants) < per_page:
+            return
+        page += 1
+
+
+class Command(BaseCommand):
+
+    help = "Import Applicant / Check / Report objects that only exist in Onfido."
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument(
+            "--per-page",
+            type=int,
+            default=500,
+            help="Number of applicants to request from the API per page",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows to insert per bulk_create statement",
+        )
+        parser.add_argument(
+            "--applicants-only",
+            action="store_true",
+            help="Do not import the checks and reports for each applicant",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        self.batch_size = options["batch_size"]
+        self.counts = {"applicant": 0, "check": 0, "report": 0, "skipped": 0}
+        start = time.monotonic()
+        for page in iter_applicants(options["per_page"]):
+            applicants = self.import_applicants(page)
+            if not options["applicants_only"]:
+                checks = self.import_checks(applicants)
+                self.import_reports(checks)
+            if options["verbosity"] > 1:
+                self.stdout.write(f"Processed {len(page)} applicants: {self.counts}")
+        self.report_throughput(time.monotonic() - start)
+
+    def import_applicants(self, page: list[dict]) -> list[Applicant]:
+        """
+        Create missing applicants from a page of raw JSON.
+
+        Each raw applicant is passed to the resolver before it is parsed,
+        as the scrubber will typically remove the personal data that is
+        needed to identify the user. Applicants that cannot be mapped to
+        a user are skipped.
+
+        Returns all of the local applicants in the page (new and existing).
+
+        """
+        ids = [raw["id"] for raw in page]
+        existing = set(
+            Applicant.objects.filter(onfido_id__in=ids).values_list(
+                "onfido_id", flat=True
+            )
+        )
+        new_applicants = []
+        for raw in page:
+            if raw["id"] in existing:
+                continue
+            user = resolve_applicant_user(raw)
+            if user is None:
+                self.counts["skipped"] += 1
+                continue
+            new_applicants.append(Applicant(user=user).parse(raw))
+        self.bulk_create(Applicant, new_applicants)
+        return list(Applicant.objects.filter(onfido_id__in=ids))
+
+    def import_checks(self, applicants: list[Applicant]) -> list[Check]:
+        """
+        Create missing checks for applicants.
+
+        Returns all of the local checks for the applicants (new and existing),
+        so that any missing reports can be created for existing checks too.
+
+        """
+        raw_checks = [
+            (applicant, raw)
+            for applicant in applicants
+            for raw in get(f"checks?applicant_id={applicant.onfido_id}")["checks"]
+        ]
+        ids = [raw["id"] for _, raw in raw_checks]
+        existing = set(
+            Check.objects.filter(onfido_id__in=ids).values_list("onfido_id", flat=True)
+        )
+        new_checks = [
+            Check(user_id=applicant.user_id, applicant=applicant).parse(raw)
+            for applicant, raw in raw_checks
+            if raw["id"] not in existing
+        ]
+        self.bulk_create(Check, new_checks)
+        # a new check may now be the user's most recent
+        Check.objects.invalidate_cache(new_checks)
+        return list(Check.objects.filter(onfido_id__in=ids))
+
+    def import_reports(self, checks: list[Check]) -> None:
+        """Create missing reports for checks (new and existing)."""
+        raw_reports = [
+            (check, raw)
+            for check in checks
+            for raw in get(f"reports?check_id={check.onfido_id}")["reports"]
+        ]
+        ids = [raw["id"] for _, raw in raw_reports]
+        existing = set(
+            Report.objects.filter(onfido_id__in=ids).values_list("onfido_id", flat=True)
+        )
+        new_reports = [
+            Report(user_id=check.user_id, onfido_check=check).parse(raw)
+            for check, raw in raw_reports
+            if raw["id"] not in existing
+        ]
+        self.bulk_create(Report, new_reports)
+
+    def bulk_create(self, model: type[Applicant | Check | Report], objs: list) -> None:
+        """
+        Insert objs in batches, ignoring rows that have appeared since.
+
+        Rows that are ignored (because they were inserted by something else
+        since the objs were built) are not counted. bulk_create doesn't say
+        which rows it inserted when conflicts are ignored, so the ids are
+        re-queried before and after the insert.
+
+        """
+        ids = [obj.onfido_id for obj in objs]
+        rows = model.objects.filter(onfido_id__in=ids)
+        before = rows.count()
+        model.objects.bulk_create(
+            objs, batch_size=self.batch_size, ignore_conflicts=True
+        )
+        self.counts[model._meta.model_name] += rows.count() - before
+
+    def report_throughput(self, elapsed: float) -> None:
+        total = sum(v for k, v in self.counts.items() if k != "skipped")
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(
+            f"Imported {self.counts['applicant']} applicants, "
+            f"{self.counts['check']} checks and {self.counts['report']} reports "
+            f"in {elapsed:.2f}s ({rate:.1f} objects/s); "
+            f"skipped {self.counts['skipped']} unresolved applicants."
+        )
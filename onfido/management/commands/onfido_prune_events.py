@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import datetime
+import gzip
+import json
+from argparse import ArgumentParser
+from typing import IO, Any
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils.timezone import now as tz_now
+
+from ...models import Event
+
+
+class Command(BaseCommand):
+
+    help = "Delete (and optionally archive) Event objects older than N days."
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument(
+            "--days",
+            type=int,
+            required=True,
+            help="Retention window - events received before this are pruned",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Size of the primary key range deleted in each transaction",
+        )
+        parser.add_argument(
+            "--archive",
+            metavar="PATH",
+            help="Export pruned events to this file as gzipped NDJSON first",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the number of events that would be pruned and exit",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options["days"] < 0 or options["batch_size"] < 1:
+            raise CommandError("--days and --batch-size must be positive")
+        self.verbosity = options["verbosity"]
+        cutoff = tz_now() - datetime.timedelta(days=options["days"])
+        expired = Event.objects.filter(received_at__lt=cutoff)
+        if options["dry_run"]:
+            self.stdout.write(f"{expired.count()} events would be pruned.")
+            return
+        bounds = expired.aggregate(lo=Min("id"), hi=Max("id"))
+        if bounds["lo"] is None:
+            self.stdout.write("No events to prune.")
+            return
+        archive = gzip.open(options["archive"], "wt") if options["archive"] else None
+        try:
+            pruned = self.prune(
+                expired, bounds["lo"], bounds["hi"], options["batch_size"], archive
+            )
+        finally:
+            if archive:
+                archive.close()
+        self.stdout.write(f"Pruned {pruned} events received before {cutoff}.")
+
+    def prune(
+        self, expired: Any, lo: int, hi: int, batch_size: int, archive: IO | None
+    ) -> int:
+        """
+        Delete expired events in fixed-size primary key ranges.
+
+        Each range is deleted in its own (short) transaction, so that locks
+        are only held on at most batch_size rows at a time, and the range
+        scan uses the primary key index rather than received_at.
+
+        """
+        pruned = 0
+        for start in range(lo, hi + 1, batch_size):
+            batch = expired.filter(id__gte=start, id__lt=start + batch_size)
+            with transaction.atomic():
+                if archive:
+                    self.export(batch, archive)
+                pruned += batch.delete()[0]
+            if self.verbosity > 1:
+                self.stdout.write(f"Pruned events {start}-{start + batch_size - 1}")
+        return pruned
+
+    def export(self, batch: Any, archive: IO) -> None:
+        """Write events in the batch to the archive, one JSON object per line."""
+        for event in batch.order_by("id"):
+            record = {
+                "id": event.id,
+                "onfido_id": event.onfido_id,
+                "resource_type": event.resource_type,
+                "action": event.action,
+                "status": event.status,
+                "completed_at": event.completed_at,
+                "received_at": event.received_at,
+                "raw": event.raw,
+            }
+            archive.write(json.dumps(record, cls=DjangoJSONEncoder) + "\n")
+        # flush before the delete is committed, so rows are never lost
+        archive.flush()
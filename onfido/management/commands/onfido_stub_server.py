@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from argparse import ArgumentParser
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from ...stub import StubServer
+
+
+class Command(BaseCommand):
+
+    help = "Run a local stub of the Onfido API (see ONFIDO_API_ROOT)."
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+        parser.add_argument("--port", type=int, default=8765, help="Port to bind")
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.0,
+            help="Seconds to wait before responding to each request",
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0.0,
+            help="Proportion of requests (0-1) that fail with a 500",
+        )
+        parser.add_argument(
+            "--rate-limit-rate",
+            type=float,
+            default=0.0,
+            help="Proportion of requests (0-1) that fail with a 429",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        server = StubServer(
+            host=options["host"],
+            port=options["port"],
+            latency=options["latency"],
+            error_rate=options["error_rate"],
+            rate_limit_rate=options["rate_limit_rate"],
+        )
+        self.stdout.write(f"Onfido stub server running at {server.url}")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.httpd.server_close()
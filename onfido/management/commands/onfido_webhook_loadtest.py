@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.utils.timezone import now as tz_now
+
+from ...decorators import _hmac
+from ...models import Check, Report
+from ...settings import load_webhook_tokens
+from ...views import status_update
+
+# the response content returned by the webhook view on success
+SUCCESS = b"Update processed."
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Return the pct percentile of values (nearest-rank method)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+
+    help = "Fire signed webhook payloads for existing Check / Report objects."
+
+    def add_arguments(self, parser: ArgumentParser) -> None:
+        parser.add_argument(
+            "--resource-type",
+            choices=["check", "report"],
+            default="check",
+            help="Type of object to send events for",
+        )
+        parser.add_argument(
+            "--rate", type=float, default=10, help="Target requests per second"
+        )
+        parser.add_argument(
+            "--requests", type=int, default=100, help="Total number of requests"
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=1,
+            help="Number of requests that can be in flight at once (--url only)",
+        )
+        parser.add_argument(
+            "--url",
+            help="POST to this webhook url over HTTP instead of in-process",
+        )
+        parser.add_argument(
+            "--sample",
+            type=int,
+            default=1000,
+            help="Number of objects to generate payloads for",
+        )
+        parser.add_argument(
+            "--token",
+            help="Webhook token used to sign payloads (default ONFIDO_WEBHOOK_TOKEN)",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options["rate"] <= 0 or options["concurrency"] < 1:
+            raise CommandError("--rate and --concurrency must be positive")
+        if options["token"]:
+            token = options["token"].encode()
+        else:
+            tokens = load_webhook_tokens()
+            token = tokens[0] if tokens else None
+        if not token:
+            raise CommandError("Missing ONFIDO_WEBHOOK_TOKEN (or --token)")
+        model = Check if options["resource_type"] == "check" else Report
+        payloads = self.payloads(model, token, options["sample"])
+        if not payloads:
+            raise CommandError(f"No {model._meta.verbose_name} objects found.")
+        self.url = options["url"]
+        self.local = threading.local()
+        self.results: list[tuple[float, bool]] = []
+        # in-process requests are sent from this thread, as each thread
+        # would otherwise open (and hold) its own database connection.
+        concurrency = options["concurrency"] if self.url else 1
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for i in range(options["requests"]):
+                # open-loop: requests are sent on schedule, whatever the latency
+                delay = start + i / options["rate"] - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                if self.url:
+                    executor.submit(self.send, *payloads[i % len(payloads)])
+                else:
+                    self.send(*payloads[i % len(payloads)])
+        self.report(time.monotonic() - start)
+
+    def payloads(self, model: type[Check | Report], token: bytes, sample: int) -> list:
+        """Return a list of (body, signature) tuples for a sample of objects."""
+        payloads = []
+        resource_type = model._meta.model_name
+        for onfido_id, status in model.objects.values_list("onfido_id", "status")[
+            :sample
+        ]:
+            action = "completed" if status == model.Status.COMPLETE else "started"
+            body = json.dumps(
+                {
+                    "payload": {
+                        "resource_type": resource_type,
+                        "action": f"{resource_type}.{action}",
+                        "object": {
+                            "id": onfido_id,
+                            "status": status,
+                            "completed_at_iso8601": tz_now().isoformat(),
+                            "href": f"{model.base_href}/{onfido_id}",
+                        },
+                    }
+                }
+            ).encode()
+            payloads.append((body, _hmac(token, body)))
+        return payloads
+
+    def send(self, body: bytes, signature: str) -> None:
+        """Send a single payload and record (latency, success)."""
+        start = time.monotonic()
+        try:
+            if self.url:
+                status_code, content = self.post_http(body, signature)
+            else:
+                status_code, content = self.post_local(body, signature)
+            ok = status_code == 200 and content == SUCCESS
+        except Exception:  # noqa: B902
+            ok = False
+        self.results.append((time.monotonic() - start, ok))
+
+    def post_http(self, body: bytes, signature: str) -> tuple[int, bytes]:
+        # one session (connection pool) per worker thread
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        response = self.local.session.post(
+            self.url,
+            data=body,
+            headers={"Content-Type": "application/json", "X-SHA2-Signature": signature},
+        )
+        return response.status_code, response.content
+
+    def post_local(self, body: bytes, signature: str) -> tuple[int, bytes]:
+        request = RequestFactory().post(
+            "/",
+            data=body,
+            content_type="application/json",
+            HTTP_X_SHA2_SIGNATURE=signature,
+        )
+        response = status_update(request)
+        return response.status_code, response.content
+
+    def report(self, elapsed: float) -> None:
+        latencies = [latency * 1000 for latency, _ in self.results]
+        errors = len([ok for _, ok in self.results if not ok])
+        self.stdout.write(
+            f"Sent {len(self.results)} requests in {elapsed:.2f}s "
+            f"({len(self.results) / elapsed:.1f} req/s)\n"
+            f"Latency (ms): p50 {percentile(latencies, 50):.1f}, "
+            f"p95 {percentile(latencies, 95):.1f}, "
+            f"p99 {percentile(latencies, 99):.1f}\n"
+            f"Errors: {errors} ({errors / elapsed:.2f}/s)"
+        )
@@ -0,0 +1,138 @@
+"""
+Pluggable metrics for API calls, webhooks, syncs and signals.
+
+The backend is set using the ONFIDO_METRICS_BACKEND setting, which is the
+dotted path to a Metrics class. The default backend does nothing. Adapters
+for Prometheus (prometheus_client) and statsd (statsd) are included - neither
+package is a dependency of this app, so they must be installed separately.
+
+The following metrics are recorded (timings are in seconds):
+
+    api_request      timing     method, endpoint, status
+    webhook          timing     resource_type, action
+    webhook_token    increment  token (a fingerprint of the matching token)
+    sync             timing     model
+    sync_objects     increment  model, outcome
+    signal           timing     signal
+    outbox_latency   timing     signal
+
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from .settings import METRICS_BACKEND, _setting
+
+
+class Metrics:
+    """Default (no-op) metrics backend - subclass this to record metrics."""
+
+    def timing(self, name: str, value: float, **tags: str) -> None:
+        """Record a duration (in seconds)."""
+
+    def increment(self, name: str, value: int = 1, **tags: str) -> None:
+        """Increment a counter."""
+
+
+class PrometheusMetrics(Metrics):
+    """Record metrics as prometheus_client Histograms and Counters."""
+
+    def __init__(self, registry: Any = None, namespace: str = "onfido") -> None:
+        try:
+            import prometheus_client
+        except ImportError:
+            raise ImproperlyConfigured("PrometheusMetrics requires prometheus_client")
+        self.prometheus_client = prometheus_client
+        self.registry = registry or prometheus_client.REGISTRY
+        self.namespace = namespace
+        self.metrics: dict[str, Any] = {}
+
+    def _metric(self, metric_class: Any, name: str, tags: dict) -> Any:
+        if name not in self.metrics:
+            self.metrics[name] = metric_class(
+                name,
+                f"Onfido {name}",
+                labelnames=sorted(tags),
+                namespace=self.namespace,
+                registry=self.registry,
+            )
+        metric = self.metrics[name]
+        return metric.labels(**tags) if tags else metric
+
+    def timing(self, name: str, value: float, **tags: str) -> None:
+        histogram = self.prometheus_client.Histogram
+        self._metric(histogram, f"{name}_seconds", tags).observe(value)
+
+    def increment(self, name: str, value: int = 1, **tags: str) -> None:
+        self._metric(self.prometheus_client.Counter, name, tags).inc(value)
+
+
+class StatsdMetrics(Metrics):
+    """
+    Send metrics to statsd, with tags appended to the metric name.
+
+    e.g. timing("api_request", 0.2, method="get", endpoint="checks") is sent
+    as a 200ms timing called "onfido.api_request.checks.get" (tag values
+    are ordered by tag name).
+
+    """
+
+    def __init__(self, client: Any = None) -> None:
+        if client is None:
+            try:
+                import statsd
+            except ImportError:
+                raise ImproperlyConfigured("StatsdMetrics requires statsd")
+            client = statsd.StatsClient(
+                _setting("ONFIDO_STATSD_HOST", "localhost"),
+                int(_setting("ONFIDO_STATSD_PORT", 8125)),
+                prefix=_setting("ONFIDO_STATSD_PREFIX", "onfido"),
+            )
+        self.client = client
+
+    def _name(self, name: str, tags: dict) -> str:
+        return ".".join([name] + [str(tags[k]) for k in sorted(tags)])
+
+    def timing(self, name: str, value: float, **tags: str) -> None:
+        self.client.timing(self._name(name, tags), value * 1000)
+
+    def increment(self, name: str, value: int = 1, **tags: str) -> None:
+        self.client.incr(self._name(name, tags), value)
+
+
+backend: Metrics = import_string(METRICS_BACKEND)()
+
+
+def timing(name: str, value: float, **tags: str) -> None:
+    """Record a duration (in seconds) with the configured backend."""
+    backend.timing(name, value, **tags)
+
+
+def increment(name: str, value: int = 1, **tags: str) -> None:
+    """Increment a counter with the configured backend."""
+    backend.increment(name, value, **tags)
+
+
+@contextmanager
+def timer(name: str, **tags: str) -> Iterator[dict]:
+    """
+    Time the enclosed block, and record it with the configured backend.
+
+    The context manager yields the tags dict, so that tags that are only
+    known once the block has run (e.g. a response status) can be added.
+
+        >>> with timer("api_request", method="get") as tags:
+        ...     response = requests.get(url)
+        ...     tags["status"] = str(response.status_code)
+
+    """
+    start = time.perf_counter()
+    try:
+        yield tags
+    finally:
+        timing(name, time.perf_counter() - start, **tags)
@@ -0,0 +1,81 @@
+# Generated by Django 4.0.10 on 2026-10-19 16:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("onfido", "0019_add_new_status_choices"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxMessage",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "signal",
+                    models.CharField(
+                        choices=[
+                            ("on_status_change", "on_status_change"),
+                            ("on_completion", "on_completion"),
+                        ],
+                        help_text="The name of the signal to send.",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "onfido_id",
+                    models.CharField(
+                        help_text="The Onfido ID of the related resource.",
+                        max_length=40,
+                        verbose_name="Onfido ID",
+                    ),
+                ),
+                (
+                    "resource_type",
+                    models.CharField(
+                        help_text="The model name of the related resource.",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "kwargs",
+                    models.JSONField(
+                        default=dict,
+                        help_text="Signal kwargs (in addition to instance).",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now,
+                        help_text="When the signal was originally raised.",
+                    ),
+                ),
+                (
+                    "attempts",
+                    models.PositiveIntegerField(
+                        default=0, help_text="The number of failed delivery attempts."
+                    ),
+                ),
+                (
+                    "last_error",
+                    models.TextField(
+                        blank=True,
+                        help_text="The error raised by the most recent failed attempt.",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.0.10 on 2026-10-19 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("onfido", "0020_add_outbox_message"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="check",
+            index=models.Index(
+                fields=["user", "-created_at"], name="onfido_check_user_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,268 @@
+# Generated by Django 4.0.10 on 2026-10-19 17:19
+
+import logging
+
+from django.db import DatabaseError, migrations, models, transaction
+
+logger = logging.getLogger(__name__)
+
+# NB this migration is not atomic, so that the indexes can be built with
+# CREATE INDEX CONCURRENTLY on PostgreSQL, which does not block writes (to
+# webhooks, pulls etc.) while the index is built. If it fails part way
+# through, drop any INVALID indexes that it leaves behind before re-running.
+
+# tables whose onfido_id column is searched (icontains) in the admin
+TRIGRAM_TABLES = ["onfido_applicant", "onfido_check", "onfido_report", "onfido_event"]
+
+
+def _has_pg_trgm(schema_editor):
+    """
+    Return True if the pg_trgm extension is (or can be) installed.
+
+    The extension is created if it is available, but not installed. This
+    requires the CREATE privilege on the database, so it is done in a
+    savepoint, and False is returned if it fails.
+
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone():
+            return True
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        if not cursor.fetchone():
+            logger.warning("The pg_trgm extension is not available.")
+            return False
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError:
+        logger.warning("Unable to create the pg_trgm extension.", exc_info=True)
+        return False
+    return True
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """
+    Add pg_trgm indexes for onfido_id searches (PostgreSQL only).
+
+    The index is on UPPER(onfido_id::text) as that is the expression that
+    Django uses for icontains lookups on PostgreSQL. If the pg_trgm extension
+    can't be installed the indexes are skipped (searches still work, they
+    are just slower) - to add them later, run "CREATE EXTENSION pg_trgm" as
+    a superuser, then migrate onfido back to 0021 and forwards again.
+
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    if not _has_pg_trgm(schema_editor):
+        logger.warning("Skipping the onfido_id trigram indexes.")
+        return
+    for table in TRIGRAM_TABLES:
+        schema_editor.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {table}_onfido_id_trgm "
+            f"ON {table} USING gin ((UPPER(onfido_id::text)) gin_trgm_ops)"
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for table in TRIGRAM_TABLES:
+        schema_editor.execute(
+            f"DROP INDEX CONCURRENTLY IF EXISTS {table}_onfido_id_trgm"
+        )
+
+
+class AlterFieldConcurrently(migrations.AlterField):
+    """AlterField that adds db_index with CREATE INDEX CONCURRENTLY (PostgreSQL)."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = to_state.apps.get_model(app_label, self.model_name)
+        field = model._meta.get_field(self.name)
+        schema_editor.execute(
+            schema_editor._create_index_sql(model, fields=[field], concurrently=True)
+        )
+        # the varchar_pattern_ops index used for LIKE / startswith lookups
+        if field.db_type(schema_editor.connection).startswith("varchar"):
+            schema_editor.execute(
+                schema_editor._create_index_sql(
+                    model,
+                    fields=[field],
+                    suffix="_like",
+                    opclasses=["varchar_pattern_ops"],
+                    concurrently=True,
+                )
+            )
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """AddIndex that uses CREATE INDEX CONCURRENTLY on PostgreSQL."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return super().database_forwards(
+                app_label, schema_editor, from_state, to_state
+            )
+        model = to_state.apps.get_model(app_label, self.model_name)
+        schema_editor.add_index(model, self.index, concurrently=True)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("onfido", "0021_add_check_user_created_index"),
+    ]
+
+    operations = [
+        AlterFieldConcurrently(
+            model_name="applicant",
+            name="created_at",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                help_text="The timestamp returned from the Onfido API.",
+                null=True,
+            ),
+        ),
+        AlterFieldConcurrently(
+            model_name="check",
+            name="created_at",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                help_text="The timestamp returned from the Onfido API.",
+                null=True,
+            ),
+        ),
+        AlterFieldConcurrently(
+            model_name="check",
+            name="result",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("clear", "Clear"),
+                    ("consider", "Consider"),
+                    ("unidentified", "Unidentified"),
+                ],
+                db_index=True,
+                help_text="The final result of the check / reports (from API).",
+                max_length=20,
+                null=True,
+            ),
+        ),
+        AlterFieldConcurrently(
+            model_name="check",
+            name="updated_at",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                help_text="The timestamp of the most recent status change (from API).",
+                null=True,
+            ),
+        ),
+        AlterFieldConcurrently(
+            model_name="event",
+            name="action",
+            field=models.CharField(
+                db_index=True,
+                help_text="The event name as returned from the API callback.",
+                max_length=20,
+            ),
+        ),
+        AlterFieldConcurrently(
+            model_name="event",
+            name="completed_at",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                help_text="The timestamp returned from the Onfido API.",
+                null=True,
+            ),
+        ),
+        AlterFieldConcurrently(
+            model_name="report",
+            name="created_at",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                help_text="The timestamp returned from the Onfido API.",
+                null=True,
+            ),
+        ),
+        AlterFieldConcurrently(
+            model_name="report",
+            name="report_type",
+            field=models.CharField(
+                choices=[
+                    ("document", "Document"),
+                    (
+                        "document_with_address_information",
+                        "Document with Address Information",
+                    ),
+                    (
+                        "document_with_driving_licence_information",
+                        "Document with Driving Licence Information",
+                    ),
+                    ("facial_similarity_photo", "Facial Similarity (photo)"),
+                    ("facial_similarity_photo_fully_auto", "Facial Similarity (auto)"),
+                    ("facial_similarity_video", "Facial Similarity (video)"),
+                    ("known_faces", "Known Faces"),
+                    ("identity_enhanced", "Identity (enhanced)"),
+                    ("watchlist_enhanced", "Watchlist (enhanced)"),
+                    ("watchlist_standard", "Watchlist"),
+                    ("watchlist_peps_only", "Watchlist (PEPs only)"),
+                    ("watchlist_sanctions_only", "Watchlist (sanctions only)"),
+                    ("proof_of_address", "Proof of Address"),
+                    ("right_to_work", "Right to Work"),
+                    ("identity", "x Identity report (deprecated)"),
+                    ("street_level", "x Street level report (deprecated)"),
+                    ("facial_similarity", "x Facial similarity report (deprecated)"),
+                    ("credit", "x Credit report (deprecated)"),
+                    ("criminal_history", "x Criminal history (deprecated)"),
+                    ("ssn_trace", "SSN trace (deprecated)"),
+                ],
+                db_index=True,
+                help_text="The name of the report - see https://documentation.onfido.com/#reports",
+                max_length=50,
+            ),
+        ),
+        AlterFieldConcurrently(
+            model_name="report",
+            name="result",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("clear", "Clear"),
+                    ("consider", "Consider"),
+                    ("unidentified", "Unidentified"),
+                ],
+                db_index=True,
+                help_text="The final result of the check / reports (from API).",
+                max_length=20,
+                null=True,
+            ),
+        ),
+        AlterFieldConcurrently(
+            model_name="report",
+            name="updated_at",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                help_text="The timestamp of the most recent status change (from API).",
+                null=True,
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="event",
+            index=models.Index(
+                fields=["onfido_id", "resource_type"], name="onfido_event_onfido_id_idx"
+            ),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.10 on 2026-10-19 17:36
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("onfido", "0022_add_admin_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboxmessage",
+            name="next_attempt_at",
+            field=models.DateTimeField(
+                db_index=True,
+                default=django.utils.timezone.now,
+                help_text="The message is not delivered before this time.",
+            ),
+        ),
+    ]
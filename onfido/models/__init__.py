@@ -1,6 +1,7 @@
 from .applicant import Applicant
 from .check import Check
 from .event import Event
+from .outbox import OutboxMessage
 from .report import Report
 
-__all__ = ["Applicant", "Check", "Report", "Event"]
+__all__ = ["Applicant", "Check", "Report", "Event", "OutboxMessage"]
@@ -1,23 +1,53 @@
 from __future__ import annotations
 
+import base64
+import hashlib
+import json
 import logging
+import time
 
 from django.conf import settings
+from django.core.cache import caches
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
-from ..settings import scrub_applicant_data
+from .. import tracing
+from ..api import post
+from ..logs import log_payload
+from ..settings import SDK_TOKEN_CACHE, SDK_TOKEN_EXPIRY_MARGIN, scrub_applicant_data
 from .base import BaseModel, BaseQuerySet
 
 logger = logging.getLogger(__name__)
 
+# SDK tokens are valid for 90 minutes - used if a token's expiry can't be read
+SDK_TOKEN_LIFETIME = 90 * 60
+# maximum number of seconds to wait for another request to fetch a token, and
+# the interval at which the cache is checked for it while waiting
+SDK_TOKEN_LOCK_TIMEOUT = 10
+SDK_TOKEN_POLL_INTERVAL = 0.05
+
+
+def _sdk_token_key(applicant_id: str, referrer: str | None) -> str:
+    digest = hashlib.sha256((referrer or "").encode()).hexdigest()[:16]
+    return f"onfido:sdk_token:{applicant_id}:{digest}"
+
+
+def _token_expiry(token: str) -> float | None:
+    """Return the expiry (exp claim) of a JWT, without verifying it."""
+    try:
+        claims = token.split(".")[1]
+        claims += "=" * (-len(claims) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(claims))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
 
 class ApplicantQuerySet(BaseQuerySet):
     """Custom Applicant queryset."""
 
     def create_applicant(self, user: settings.AUTH_USER_MODEL, raw: dict) -> Applicant:
         """Create a new applicant in Onfido from a user."""
-        logger.debug("Creating new Onfido applicant from JSON: %s", raw)
+        log_payload(logger, "Creating new Onfido applicant from JSON: %s", payload=raw)
         return Applicant(user=user).parse(raw).save()
 
 
@@ -41,6 +71,7 @@ class Applicant(BaseModel):
     def __repr__(self) -> str:
         return "<Applicant id={} user_id={}>".format(self.id, self.user.id)
 
+    @tracing.traced("onfido.parse")
     def parse(self, raw_json: dict) -> Applicant:
         """
         Parse the raw value out into other properties.
@@ -52,3 +83,49 @@ class Applicant(BaseModel):
         """
         super().parse(scrub_applicant_data(raw_json))
         return self
+
+    def sdk_token(self, referrer: str | None = None) -> str:
+        """
+        Return an SDK token for the applicant.
+
+        Tokens are cached (in the ONFIDO_SDK_TOKEN_CACHE cache) until
+        ONFIDO_SDK_TOKEN_EXPIRY_MARGIN seconds before they expire. If the
+        token isn't cached, a lock is taken in the cache so that concurrent
+        requests for the same token wait for (and share) a single API call.
+
+        Args:
+            referrer: the referrer URL pattern that the web SDK is restricted
+                to - see https://documentation.onfido.com/#generate-sdk-token
+
+        """
+        cache = caches[SDK_TOKEN_CACHE]
+        key = _sdk_token_key(self.onfido_id, referrer)
+        token = cache.get(key)
+        if token:
+            return token
+        lock = f"{key}:lock"
+        deadline = time.monotonic() + SDK_TOKEN_LOCK_TIMEOUT
+        locked = cache.add(lock, True, SDK_TOKEN_LOCK_TIMEOUT)
+        while not locked and time.monotonic() < deadline:
+            time.sleep(SDK_TOKEN_POLL_INTERVAL)
+            token = cache.get(key)
+            if token:
+                return token
+            locked = cache.add(lock, True, SDK_TOKEN_LOCK_TIMEOUT)
+        try:
+            # the token may have been cached before the lock was taken
+            token = cache.get(key)
+            if token:
+                return token
+            data = {"applicant_id": self.onfido_id}
+            if referrer:
+                data["referrer"] = referrer
+            token = post("sdk_token", data)["token"]
+            expires_at = _token_expiry(token) or time.time() + SDK_TOKEN_LIFETIME
+            timeout = expires_at - time.time() - SDK_TOKEN_EXPIRY_MARGIN
+            if timeout > 0:
+                cache.set(key, token, timeout)
+            return token
+        finally:
+            if locked:
+                cache.delete(lock)
@@ -2,20 +2,40 @@ from __future__ import annotations
 
 import datetime
 import logging
-from typing import Any
+from typing import Any, Callable, ContextManager
 
 from dateutil.parser import parse as date_parse
 from django.conf import settings
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 from django.utils.timezone import now as tz_now
 from django.utils.translation import gettext_lazy as _
 
+from .. import metrics, signals, tracing
 from ..api import ApiError, get
-from ..signals import on_completion, on_status_change
+from ..concurrency import map_concurrently
+from ..settings import SIGNAL_OUTBOX
 from .event import Event
 
 logger = logging.getLogger(__name__)
 
+# the rendered raw JSON cached by the admin (see admin.RawMixin)
+RAW_CACHE_SUFFIXES = ("preview", "full")
+
+
+def raw_cache_key(obj: models.Model, suffix: str) -> str:
+    """Return the cache key for the rendered raw JSON of an object."""
+    return f"onfido:raw:{obj._meta.label_lower}:{obj.pk}:{suffix}"
+
+
+def clear_raw_cache(obj: models.Model) -> None:
+    """Remove the rendered raw JSON of an object from the cache."""
+    keys = [raw_cache_key(obj, suffix) for suffix in RAW_CACHE_SUFFIXES]
+    cache.delete_many(keys)
+    # if called inside a transaction, a concurrent request could cache the
+    # old value before the transaction commits, so delete again on commit
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
 
 class BaseModel(models.Model):
     """Base model used to set timestamps."""
@@ -31,6 +51,7 @@ class BaseModel(models.Model):
     )
     created_at = models.DateTimeField(
         help_text=_("The timestamp returned from the Onfido API."),
+        db_index=True,
         blank=True,
         null=True,
     )
@@ -46,12 +67,16 @@ class BaseModel(models.Model):
         """Return the href from base_href."""
         return f"{self.base_href}/{self.onfido_id}"
 
+    @tracing.traced("onfido.save")
     def save(self, *args: Any, **kwargs: Any) -> BaseModel:
         """Save object and return self (for chaining methods)."""
         self.full_clean()
         super().save(*args, **kwargs)
+        # raw may have changed (parse, mark_as_expired etc.)
+        clear_raw_cache(self)
         return self
 
+    @tracing.traced("onfido.parse")
     def parse(self, raw_json: dict) -> BaseModel:
         """Parse the raw value out into other properties."""
         self.raw = raw_json
@@ -77,7 +102,7 @@ class BaseModel(models.Model):
         try:
             return self.parse(get(self.href))
         except ApiError as e:
-            if e.status_code == 410 and settings.SYNC_DELETION is True:
+            if _is_deleted(e):
                 return self.mark_as_expired()
             raise e
 
@@ -94,6 +119,15 @@ class BaseModel(models.Model):
         return self.fetch().save()
 
 
+def _is_deleted(error: object) -> bool:
+    """Return True if error means that the object has been deleted by Onfido."""
+    return (
+        isinstance(error, ApiError)
+        and error.status_code == 410
+        and settings.SYNC_DELETION is True
+    )
+
+
 class BaseQuerySet(models.QuerySet):
     """Custom queryset for models subclassing BaseModel."""
 
@@ -105,13 +139,150 @@ class BaseQuerySet(models.QuerySet):
             except Exception:  # noqa: B902
                 logger.exception("Failed to fetch Onfido object: %r", obj)
 
-    def pull(self) -> None:
-        """Call pull method on all objects in the queryset."""
-        for obj in self:
-            try:
-                obj.pull()
-            except Exception:  # noqa: B902
-                logger.exception("Failed to pull Onfido object: %r", obj)
+    def pull(
+        self,
+        batch_size: int = 500,
+        max_workers: int = 1,
+        rate: float | None = None,
+        progress: Callable[[dict[str, int]], None] | None = None,
+    ) -> dict[str, int]:
+        """
+        Call pull method on all objects in the queryset.
+
+        If max_workers is more than 1 then the objects are fetched from the
+        API concurrently, using up to max_workers threads (limited to rate
+        requests per second), and saved in the calling thread.
+
+        Objects whose status is changed by the pull are collected and sent
+        in batches (of batch_size) via the on_bulk_status_change signal, as
+        a list of (instance, status_before, status_after) tuples.
+
+        If progress is set, it is called with the stats (see below) after
+        each object has been pulled.
+
+        Returns a dict of the number of objects that were changed, unchanged,
+        expired, or that failed.
+
+        """
+        stats = dict.fromkeys(["changed", "unchanged", "expired", "failed"], 0)
+        changes: list[tuple[BaseModel, str | None, str | None]] = []
+        model_name = self.model._meta.model_name
+        # fetch in worker threads, but only ever save in this thread
+        work = _fetch if max_workers > 1 else _pull
+        with metrics.timer("sync", model=model_name):
+            for obj, before, error in map_concurrently(work, self, max_workers, rate):
+                outcome = self._pulled(obj, before, error, save=max_workers > 1)
+                stats[outcome] += 1
+                metrics.increment(
+                    "sync_objects",
+                    model=model_name,
+                    outcome="error" if outcome == "failed" else "ok",
+                )
+                if outcome in ("changed", "expired") and before[0] != obj.status:
+                    changes.append((obj, before[0], obj.status))
+                if len(changes) >= batch_size:
+                    self._send_bulk_status_change(changes)
+                    changes = []
+                if progress:
+                    progress(stats)
+            if changes:
+                self._send_bulk_status_change(changes)
+        return stats
+
+    def _pulled(
+        self, obj: BaseModel, before: tuple, error: Exception | None, save: bool
+    ) -> str:
+        """Save an object that has been fetched, and return the outcome."""
+        try:
+            if error:
+                raise error
+            if save:
+                obj.save()
+                self.invalidate_cache([obj])
+        except Exception:  # noqa: B902
+            logger.exception("Failed to pull Onfido object: %r", obj)
+            return "failed"
+        after = _state(obj)
+        if after == before:
+            return "unchanged"
+        if after[0] == BaseStatusModel.Status.EXPIRED:
+            return "expired"
+        return "changed"
+
+    def invalidate_cache(self, objs: list) -> None:
+        """
+        Invalidate any cached state that depends on objs.
+
+        Called after objs have been updated in bulk. Does nothing by default.
+
+        """
+
+    def _send_bulk_status_change(self, changes: list) -> None:
+        with metrics.timer("signal", signal="on_bulk_status_change"), tracing.span(
+            "onfido.signal",
+            signal="on_bulk_status_change",
+            resource_type=self.model._meta.model_name,
+            changes=len(changes),
+        ):
+            signals.on_bulk_status_change.send(self.model, changes=changes)
+
+
+def _state(obj: BaseModel) -> tuple:
+    """Return the (status, result) of an object (None for an Applicant)."""
+    return getattr(obj, "status", None), getattr(obj, "result", None)
+
+
+def _fetch(obj: BaseModel) -> tuple:
+    """Fetch an object, and return its state before the fetch."""
+    before = _state(obj)
+    obj.fetch()
+    return before
+
+
+def _pull(obj: BaseModel) -> tuple:
+    """Pull an object, and return its state before the pull."""
+    before = _state(obj)
+    obj.pull()
+    return before
+
+
+class BaseStatusQuerySet(BaseQuerySet):
+    """Custom queryset for models subclassing BaseStatusModel."""
+
+    def mark_as_clear(self, user: settings.AUTH_USER_MODEL) -> int:
+        """
+        Override the result field of all objects in the queryset.
+
+        This is the bulk equivalent of BaseStatusModel.mark_as_clear - the
+        result field is updated in a single UPDATE, and the override events
+        are inserted using a single bulk_create, in one transaction. As
+        with QuerySet.update, save() is not called on the objects.
+
+        Args:
+            user: User object, the person who is doing the overriding.
+
+        Returns the number of objects updated.
+
+        """
+        with transaction.atomic():
+            # lock only the rows of this table (the admin changelist queryset
+            # may include joins), and drop the ordering, which isn't needed
+            locked = self.order_by().select_for_update(of=("self",))
+            objs = list(locked.only("onfido_id", "status", "user"))
+            events = [obj._override_event(user) for obj in objs]
+            for event in events:
+                event.raw["payload"]["result"] = BaseStatusModel.Result.CLEAR
+            Event.objects.bulk_create(events)
+            count = self.model.objects.filter(pk__in=[o.pk for o in objs]).update(
+                result=BaseStatusModel.Result.CLEAR
+            )
+            self.invalidate_cache(objs)
+        return count
+
+    def invalidate_cache(self, objs: list) -> None:
+        """Call invalidate_cache on each of objs - override to do so in bulk."""
+        for obj in objs:
+            obj.invalidate_cache()
 
 
 class BaseStatusModel(BaseModel):
@@ -150,10 +321,12 @@ class BaseStatusModel(BaseModel):
         max_length=20,
         choices=Result.choices,
         help_text=_("The final result of the check / reports (from API)."),
+        db_index=True,
         blank=True,
         null=True,
     )
     updated_at = models.DateTimeField(
+        db_index=True,
         blank=True,
         null=True,
         help_text=_("The timestamp of the most recent status change (from API)."),
@@ -201,7 +374,7 @@ class BaseStatusModel(BaseModel):
                 "user_id": user.id,
             }
         }
-        return Event().parse(payload)
+        return Event(received_at=tz_now()).parse(payload)
 
     def update_status(self, event: Event) -> Event:
         """
@@ -211,6 +384,18 @@ class BaseStatusModel(BaseModel):
         the status of the relevant Check/Report, and then fire the
         signals that allow external apps to hook in to this event.
 
+        If SIGNAL_OUTBOX is enabled (ONFIDO_SIGNAL_OUTBOX setting) then the
+        signals are not sent here - they are written to the OutboxMessage
+        table in the same transaction as the status update, and sent later
+        by the onfido_dispatch_signals management command.
+
+        The latest JSON is fetched from the API first, and the update is then
+        made with the object's row locked (SELECT ... FOR UPDATE) so that
+        concurrent webhooks for the same object are applied one at a time -
+        the lock is not held while the API is called. Events that are older
+        than the object's current updated_at value (e.g. retries that arrive
+        out of order) are ignored, and no signals are fired for them.
+
         If the update is a change to 'complete', then we fire a second
         signal - 'complete' is the terminal state change, and therefore
         of most interest to clients - typically the on_status_update
@@ -229,27 +414,120 @@ class BaseStatusModel(BaseModel):
         # just ensures we do actually have a datetime at this point
         if not isinstance(event.completed_at, datetime.datetime):
             raise ValueError("event.completed_at is not a datetime object")
-        # swap statuses around so we record old / new
-        self.status, old_status = event.status, self.status
-        self.updated_at = event.completed_at
-        try:
-            self.pull()
-        except Exception:  # noqa: B902
-            # even if we can't get latest, we should save the changes we
-            # have already made to the object
-            logger.warning("Unable to pull latest from Onfido: '%r'", self)
+        # fetch the latest JSON before taking the lock, so that the row isn't
+        # locked (and the transaction held open) while the API is called.
+        remote = self._fetch_raw()
+        with transaction.atomic():
+            self._lock()
+            if self._is_stale(event):
+                logger.info("Ignoring stale Onfido event: %r", event)
+                return self
+            # swap statuses around so we record old / new
+            self.status, old_status = event.status, self.status
+            self.updated_at = event.completed_at
+            pending_signals = self._status_signals(event, old_status)
+            self._apply_raw(remote)
             self.save()
-        on_status_change.send(
-            self.__class__,
-            instance=self,
-            event=event.action,
-            status_before=old_status,
-            status_after=event.status,
+            if SIGNAL_OUTBOX:
+                # prevents circ. import
+                from .outbox import OutboxMessage
+
+                for name, kwargs in pending_signals:
+                    OutboxMessage.objects.enqueue(self, name, **kwargs)
+        self.invalidate_cache()
+        if not SIGNAL_OUTBOX:
+            for name, kwargs in pending_signals:
+                with metrics.timer("signal", signal=name), self._signal_span(name):
+                    signal = getattr(signals, name)
+                    signal.send(self.__class__, instance=self, **kwargs)
+        return self
+
+    def invalidate_cache(self) -> None:
+        """
+        Invalidate any cached state that depends on this object.
+
+        Called whenever the status or result of the object changes. Does
+        nothing by default - see Check.invalidate_cache.
+
+        """
+
+    def _signal_span(self, name: str) -> ContextManager:
+        """Return a tracing span for sending a signal for this object."""
+        return tracing.span(
+            "onfido.signal",
+            signal=name,
+            onfido_id=self.onfido_id,
+            resource_type=self._meta.model_name,
         )
+
+    def _lock(self) -> None:
+        """
+        Lock the object's row and reload its current state.
+
+        Must be called inside a transaction. This serialises concurrent
+        updates to the same object (e.g. two webhooks for the same check
+        arriving on different workers), so that each update starts from
+        the state saved by the previous one, rather than the (possibly
+        stale) state that was loaded before the lock was acquired.
+
+        """
+        if self.pk is None:
+            return
+        locked = self.__class__.objects.select_for_update().get(pk=self.pk)
+        for field in self._meta.concrete_fields:
+            setattr(self, field.attname, getattr(locked, field.attname))
+
+    def _fetch_raw(self) -> dict | Exception:
+        """Return the latest JSON from the API (or the error raised)."""
+        try:
+            return get(self.href)
+        except Exception as ex:  # noqa: B902
+            return ex
+
+    def _apply_raw(self, remote: dict | Exception) -> None:
+        """
+        Parse the JSON returned by _fetch_raw (see BaseModel.fetch).
+
+        Even if we can't get the latest JSON, the changes that have already
+        been made to the object are kept (and saved by the caller).
+
+        """
+        if _is_deleted(remote):
+            self.mark_as_expired()
+        elif isinstance(remote, Exception):
+            logger.warning("Unable to pull latest from Onfido: '%r'", self)
+        else:
+            self.parse(remote)
+
+    def _is_stale(self, event: Event) -> bool:
+        """Return True if the object has been updated by a more recent event."""
+        if self.updated_at is None:
+            return False
+        return event.completed_at < self.updated_at
+
+    def _status_signals(self, event: Event, old_status: str | None) -> list:
+        """Return the (signal name, kwargs) pairs to send for a status update."""
+        pending_signals = [
+            (
+                "on_status_change",
+                {
+                    "event": event.action,
+                    "status_before": old_status,
+                    "status_after": event.status,
+                },
+            )
+        ]
         if event.status == self.Status.COMPLETE:
-            on_completion.send(self.__class__, instance=self)
+            pending_signals.append(("on_completion", {}))
+        return pending_signals
+
+    def pull(self) -> BaseStatusModel:
+        """Update the object from the remote API (see BaseModel.pull)."""
+        super().pull()
+        self.invalidate_cache()
         return self
 
+    @tracing.traced("onfido.parse")
     def parse(self, raw_json: dict) -> Event:
         """Parse the raw value out into other properties."""
         super().parse(raw_json)
@@ -277,7 +555,8 @@ class BaseStatusModel(BaseModel):
             user: User object, the person who is doing the overriding - this
                 will typically be an admin user, doing it from the admin site.
 
-        Returns the object itself, updated and saved.
+        Returns the object itself, updated and saved. (To override the
+        result of many objects at once use BaseStatusQuerySet.mark_as_clear.)
 
         """
         event = self._override_event(user)
@@ -286,6 +565,7 @@ class BaseStatusModel(BaseModel):
 
         self.result = self.Result.CLEAR
         self.save()
+        self.invalidate_cache()
         return self
 
     def mark_as_expired(self) -> Event:
@@ -299,6 +579,7 @@ class BaseStatusModel(BaseModel):
         """
         self.status = self.Status.EXPIRED
         self.raw = None
+        self.invalidate_cache()
         return self
 
     @property
@@ -1,24 +1,100 @@
 from __future__ import annotations
 
 import logging
+from typing import NamedTuple
 
 from django.conf import settings
-from django.db import models
+from django.core.cache import caches
+from django.core.files.storage import Storage
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 
+from ..api import download
+from ..logs import log_payload
+from ..settings import VERIFICATION_CACHE, VERIFICATION_CACHE_TIMEOUT
 from .applicant import Applicant
-from .base import BaseQuerySet, BaseStatusModel
+from .base import BaseStatusModel, BaseStatusQuerySet
 
 logger = logging.getLogger(__name__)
 
 
-class CheckQuerySet(BaseQuerySet):
+class VerificationStatus(NamedTuple):
+    """The status / result of a user's most recent check."""
+
+    check_id: int | None
+    status: str | None
+    result: str | None
+
+    @property
+    def is_verified(self) -> bool:
+        """Return True if the most recent check is complete and clear."""
+        return (self.status, self.result) == (
+            BaseStatusModel.Status.COMPLETE,
+            BaseStatusModel.Result.CLEAR,
+        )
+
+
+def _cache_key(user_id: int) -> str:
+    return f"onfido:verification_status:{user_id}"
+
+
+def invalidate_verification_status(*user_ids: int) -> None:
+    """Remove the cached verification status of one or more users."""
+    cache = caches[VERIFICATION_CACHE]
+    keys = [_cache_key(user_id) for user_id in set(user_ids)]
+    cache.delete_many(keys)
+    # if called inside a transaction, a concurrent request could cache the
+    # (old) committed status before this transaction commits - so delete it
+    # again once it has. (Outside of a transaction this runs immediately.)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+class CheckQuerySet(BaseStatusQuerySet):
     """Check model manager."""
 
     def create_check(self, applicant: Applicant, raw: dict) -> Check:
         """Create a new Check object from the raw JSON."""
-        logger.debug("Creating new Onfido check from JSON: %s", raw)
-        return Check(user=applicant.user, applicant=applicant).parse(raw).save()
+        log_payload(logger, "Creating new Onfido check from JSON: %s", payload=raw)
+        check = Check(user=applicant.user, applicant=applicant).parse(raw).save()
+        check.invalidate_cache()
+        return check
+
+    def invalidate_cache(self, objs: list) -> None:
+        """Remove the cached verification status of the users of objs."""
+        invalidate_verification_status(*[obj.user_id for obj in objs])
+
+    def latest_for_user(self, user: settings.AUTH_USER_MODEL) -> Check | None:
+        """Return the user's most recent check (or None)."""
+        return (
+            self.filter(user=user)
+            .order_by(models.F("created_at").desc(nulls_last=True), "-id")
+            .first()
+        )
+
+    def verification_status(self, user: settings.AUTH_USER_MODEL) -> VerificationStatus:
+        """
+        Return the status / result of the user's most recent check.
+
+        The most recent check (by created_at) always wins, whatever its
+        status - so a user whose latest check is in progress, withdrawn or
+        expired is not verified, even if an earlier check was clear. (A new
+        check is typically requested because the earlier one no longer
+        applies.) The value is cached (in the ONFIDO_VERIFICATION_CACHE cache) until
+        the user's checks change - see Check.invalidate_cache.
+
+        """
+        cache = caches[VERIFICATION_CACHE]
+        key = _cache_key(user.pk)
+        status = cache.get(key)
+        if status is None:
+            check = self.latest_for_user(user)
+            status = (
+                VerificationStatus(check.id, check.status, check.result)
+                if check
+                else VerificationStatus(None, None, None)
+            )
+            cache.set(key, status, VERIFICATION_CACHE_TIMEOUT)
+        return status
 
 
 class Check(BaseStatusModel):
@@ -49,8 +125,30 @@ class Check(BaseStatusModel):
 
     objects = CheckQuerySet.as_manager()
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at"], name="onfido_check_user_created_idx"
+            )
+        ]
+
     def __str__(self) -> str:
         return f"Onfido check for {self.user}"
 
     def __repr__(self) -> str:
         return f"<Check id={self.id} user_id={self.user_id}>"
+
+    def invalidate_cache(self) -> None:
+        """Remove the user's cached verification status."""
+        invalidate_verification_status(self.user_id)
+
+    def download_pdf(self, storage: Storage, path: str) -> str:
+        """
+        Download the check PDF, and save it to storage.
+
+        The PDF is streamed into storage without being held in memory. The
+        ".pdf" extension is added to path if it has none. Returns the name
+        of the saved file.
+
+        """
+        return download(f"{self.base_href}/{self.onfido_id}/download", storage, path)
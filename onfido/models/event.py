@@ -1,14 +1,71 @@
 from __future__ import annotations
 
+import copy
+import datetime
+import hashlib
+import json
 import logging
+from typing import Any
 
 from dateutil.parser import parse as date_parse
 from django.conf import settings
 from django.db import models
+from django.db.models.query_utils import DeferredAttribute
 from django.utils.translation import gettext_lazy as _
 
+from .. import tracing
+from ..settings import COMPACT_EVENTS
+
 logger = logging.getLogger(__name__)
 
+# key used to identify raw payloads that have been stored in compact form -
+# its value is a short digest of the original payload
+COMPACT_KEY = "_c"
+
+
+def _digest(raw: dict) -> str:
+    """Return a short SHA256 hash of the canonical JSON representation of raw."""
+    text = json.dumps(raw, sort_keys=True, separators=(",", ":"), default=str)
+    # only used to detect (accidental) mismatches, so 32 bits is plenty
+    return hashlib.sha256(text.encode()).hexdigest()[:8]
+
+
+def _format_completed_at(completed_at: datetime.datetime) -> str:
+    """Format completed_at the way Onfido does - e.g. 2019-10-28T15:00:39Z."""
+    utc = completed_at.astimezone(datetime.timezone.utc)
+    return utc.isoformat().replace("+00:00", "Z")
+
+
+class CompactRawDescriptor(DeferredAttribute):
+    """Field descriptor that expands compact raw payloads when accessed."""
+
+    def __get__(self, instance: Any, cls: Any = None) -> Any:
+        value = super().__get__(instance, cls)
+        if instance is not None and isinstance(value, dict) and COMPACT_KEY in value:
+            value = instance.expand_raw(value)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance: Any, value: Any) -> None:
+        instance.__dict__[self.field.attname] = value
+
+
+class EventRawField(models.JSONField):
+    """JSONField that stores the Event payload in compact form if enabled."""
+
+    descriptor_class = CompactRawDescriptor
+
+    def pre_save(self, model_instance: models.Model, add: bool) -> Any:
+        value = super().pre_save(model_instance, add)
+        if COMPACT_EVENTS and value is not None:
+            return model_instance.compact_raw(value)
+        return value
+
+    def deconstruct(self) -> tuple:
+        # the storage is identical to JSONField, so don't generate migrations
+        name, _, args, kwargs = super().deconstruct()
+        return name, "django.db.models.JSONField", args, kwargs
+
 
 class Event(models.Model):
     """Used to record callback events received from the API."""
@@ -22,25 +79,35 @@ class Event(models.Model):
         max_length=20, help_text=_("The resource_type returned from the API callback.")
     )
     action = models.CharField(
-        max_length=20, help_text=_("The event name as returned from the API callback.")
+        max_length=20,
+        db_index=True,
+        help_text=_("The event name as returned from the API callback."),
     )
     status = models.CharField(
         max_length=20, help_text=_("The status of the object after the event.")
     )
     completed_at = models.DateTimeField(
         help_text=_("The timestamp returned from the Onfido API."),
+        db_index=True,
         blank=True,
         null=True,
     )
     received_at = models.DateTimeField(
         help_text=_("The timestamp when the server received the event."),
     )
-    raw = models.JSONField(
+    raw = EventRawField(
         help_text=_("The raw JSON returned from the API."), blank=True, null=True
     )
 
     class Meta:
         ordering = ["completed_at"]
+        indexes = [
+            # used to look up the events for a Check / Report
+            models.Index(
+                fields=["onfido_id", "resource_type"],
+                name="onfido_event_onfido_id_idx",
+            )
+        ]
 
     def __str__(self) -> str:
         return "{} event occurred on {}.{}".format(
@@ -78,9 +145,10 @@ class Event(models.Model):
         """Return the user to whom the resource refers."""
         return self.resource.user
 
+    @tracing.traced("onfido.parse")
     def parse(self, raw_json: dict) -> Event:
         """Parse the raw value out into other properties."""
-        self.raw = raw_json
+        self.raw = raw_json  # type: ignore[assignment]
         payload = self.raw["payload"]
         self.resource_type = payload["resource_type"]
         self.action = payload["action"]
@@ -89,3 +157,55 @@ class Event(models.Model):
         self.status = obj["status"]
         self.completed_at = date_parse(obj["completed_at_iso8601"])
         return self
+
+    def _column_values(self) -> dict:
+        """Return the payload values that are duplicated in model fields."""
+        values = {
+            ("resource_type",): self.resource_type,
+            ("action",): self.action,
+            ("object", "id"): self.onfido_id,
+            ("object", "status"): self.status,
+        }
+        if self.completed_at:
+            completed_at = _format_completed_at(self.completed_at)
+            values[("object", "completed_at_iso8601")] = completed_at
+        return values
+
+    def compact_raw(self, raw: dict) -> dict:
+        """
+        Return a compact version of raw for storage.
+
+        The values that are already stored in the model fields (onfido_id,
+        resource_type, action, status, completed_at) are removed, and a short
+        hash of the original payload is added (as COMPACT_KEY), which is used
+        to verify the payload when it is rebuilt (see expand_raw). If any of
+        the values cannot be rebuilt exactly from the fields, raw is stored
+        as it is.
+
+        """
+        if COMPACT_KEY in raw or not isinstance(raw.get("payload"), dict):
+            return raw
+        extra = copy.deepcopy(raw)
+        for path, value in self._column_values().items():
+            container = extra["payload"]
+            for key in path[:-1]:
+                container = container.get(key)
+                if not isinstance(container, dict):
+                    return raw
+            if path[-1] not in container or container[path[-1]] != value:
+                return raw
+            del container[path[-1]]
+        return {COMPACT_KEY: _digest(raw), **extra}
+
+    def expand_raw(self, compact: dict) -> dict:
+        """Rebuild the original raw payload from its compact form."""
+        raw = copy.deepcopy(compact)
+        digest = raw.pop(COMPACT_KEY)
+        for path, value in self._column_values().items():
+            container = raw["payload"]
+            for key in path[:-1]:
+                container = container.setdefault(key, {})
+            container[path[-1]] = value
+        if _digest(raw) != digest:
+            logger.warning("Rebuilt Onfido event payload does not match: %r", self)
+        return raw
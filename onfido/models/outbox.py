@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import datetime
+import logging
+
+from django.db import DatabaseError, models, transaction
+from django.utils.timezone import now as tz_now
+from django.utils.translation import gettext_lazy as _
+
+from .. import metrics, signals, tracing
+from ..settings import OUTBOX_CLAIM_TIMEOUT, OUTBOX_MAX_RETRY_DELAY, OUTBOX_RETRY_DELAY
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxMessageQuerySet(models.QuerySet):
+    """Custom OutboxMessage queryset."""
+
+    def enqueue(
+        self, instance: models.Model, signal: str, **kwargs: str | None
+    ) -> OutboxMessage:
+        """Record a signal that should be sent for instance."""
+        return self.create(
+            signal=signal,
+            resource_type=instance._meta.model_name,
+            onfido_id=instance.onfido_id,
+            kwargs=kwargs,
+        )
+
+    def pending(self, max_attempts: int | None = None) -> OutboxMessageQuerySet:
+        """Return messages that are due for (re)delivery."""
+        qs = self.order_by("id").filter(next_attempt_at__lte=tz_now())
+        return qs.filter(attempts__lt=max_attempts) if max_attempts else qs
+
+    def abandoned(self, max_attempts: int) -> OutboxMessageQuerySet:
+        """Return messages that have failed too many times to be retried."""
+        return self.filter(attempts__gte=max_attempts)
+
+    def retry(self) -> int:
+        """Reset the attempts of messages, so that they are retried now."""
+        return self.update(attempts=0, next_attempt_at=tz_now())
+
+    def dispatch(self, batch_size: int = 100, max_attempts: int | None = None) -> dict:
+        """
+        Deliver a batch of pending messages.
+
+        The batch is claimed (by pushing back next_attempt_at by
+        OUTBOX_CLAIM_TIMEOUT seconds) in a short transaction that locks the
+        rows using SKIP LOCKED where supported, so that multiple dispatchers
+        can run in parallel without holding locks while receivers run. Each
+        message is then delivered in its own transaction, and deleted only
+        once all of its receivers have run without error. Messages whose
+        receivers fail are left in the outbox and retried after an
+        exponential backoff (see OutboxMessage.deliver), which means that
+        delivery is at-least-once - receivers must be idempotent. Messages
+        that reach max_attempts are no longer retried, and are logged as
+        errors (and counted as abandoned).
+
+        Returns a dict of delivery stats (delivered, failed, abandoned, max /
+        mean latency).
+
+        """
+        stats = {
+            "delivered": 0,
+            "failed": 0,
+            "abandoned": 0,
+            "max_latency": 0.0,
+            "mean_latency": 0.0,
+        }
+        batch = self._claim(batch_size, max_attempts)
+        instances = self._resolve(batch)
+        delivered = []
+        for message in batch:
+            instance = instances.get((message.resource_type, message.onfido_id))
+            with transaction.atomic():
+                if message.deliver(instance):
+                    message.delete()
+                    delivered.append(message)
+                    continue
+            if max_attempts and message.attempts >= max_attempts:
+                logger.error("Abandoning outbox message: %r", message)
+                stats["abandoned"] += 1
+        if delivered:
+            now = tz_now()
+            latencies = [(now - m.created_at).total_seconds() for m in delivered]
+            for message, latency in zip(delivered, latencies):
+                metrics.timing("outbox_latency", latency, signal=message.signal)
+            stats["max_latency"] = max(latencies)
+            stats["mean_latency"] = sum(latencies) / len(latencies)
+        stats["delivered"] = len(delivered)
+        stats["failed"] = len(batch) - len(delivered)
+        return stats
+
+    def _claim(self, batch_size: int, max_attempts: int | None) -> list[OutboxMessage]:
+        """Lock a batch of pending messages, and postpone their next attempt."""
+        with transaction.atomic():
+            pending = self.pending(max_attempts).select_for_update(skip_locked=True)
+            batch = list(pending[:batch_size])
+            claimed_until = tz_now() + datetime.timedelta(seconds=OUTBOX_CLAIM_TIMEOUT)
+            self.filter(id__in=[m.id for m in batch]).update(
+                next_attempt_at=claimed_until
+            )
+        return batch
+
+    def _resolve(self, batch: list[OutboxMessage]) -> dict:
+        """Fetch the Check / Report objects for a batch in one query per type."""
+        # prevents circ. import
+        from .check import Check
+        from .report import Report
+
+        instances = {}
+        for model in (Check, Report):
+            onfido_ids = [
+                m.onfido_id for m in batch if m.resource_type == model._meta.model_name
+            ]
+            if onfido_ids:
+                objs = model.objects.in_bulk(onfido_ids, field_name="onfido_id")
+                for onfido_id, obj in objs.items():
+                    instances[(model._meta.model_name, onfido_id)] = obj
+        return instances
+
+
+class OutboxMessage(models.Model):
+    """A status signal waiting to be sent by the outbox dispatcher."""
+
+    class Signal(models.TextChoices):
+        ON_STATUS_CHANGE = ("on_status_change", "on_status_change")
+        ON_COMPLETION = ("on_completion", "on_completion")
+
+    signal = models.CharField(
+        max_length=20,
+        choices=Signal.choices,
+        help_text=_("The name of the signal to send."),
+    )
+    onfido_id = models.CharField(
+        "Onfido ID",
+        max_length=40,
+        help_text=_("The Onfido ID of the related resource."),
+    )
+    resource_type = models.CharField(
+        max_length=20, help_text=_("The model name of the related resource.")
+    )
+    kwargs = models.JSONField(
+        help_text=_("Signal kwargs (in addition to instance)."), default=dict
+    )
+    created_at = models.DateTimeField(
+        default=tz_now, help_text=_("When the signal was originally raised.")
+    )
+    attempts = models.PositiveIntegerField(
+        default=0, help_text=_("The number of failed delivery attempts.")
+    )
+    next_attempt_at = models.DateTimeField(
+        default=tz_now,
+        db_index=True,
+        help_text=_("The message is not delivered before this time."),
+    )
+    last_error = models.TextField(
+        blank=True, help_text=_("The error raised by the most recent failed attempt.")
+    )
+
+    objects = OutboxMessageQuerySet.as_manager()
+
+    def __str__(self) -> str:
+        return f"{self.signal} for {self.resource_type}.{self.onfido_id}"
+
+    def __repr__(self) -> str:
+        return "<OutboxMessage id={} signal='{}' onfido_id='{}.{}'>".format(
+            self.id, self.signal, self.resource_type, self.onfido_id
+        )
+
+    def deliver(self, instance: models.Model | None) -> bool:
+        """
+        Send the signal to all receivers and return True if none failed.
+
+        If the related object no longer exists there is nothing to send, and
+        the message is considered delivered. Failures are recorded against
+        the message (and saved) so that they can be inspected, and the next
+        attempt is delayed by OUTBOX_RETRY_DELAY seconds, doubled for each
+        previous failure (up to OUTBOX_MAX_RETRY_DELAY).
+
+        """
+        if instance is None:
+            logger.warning("Discarding outbox message for missing object: %r", self)
+            return True
+        error = self._send(instance)
+        if error is None:
+            return True
+        logger.warning("Outbox signal receiver failed: %r: %r", self, error)
+        self.attempts += 1
+        self.last_error = repr(error)
+        self.next_attempt_at = tz_now() + datetime.timedelta(seconds=self.retry_delay)
+        self.save(update_fields=["attempts", "last_error", "next_attempt_at"])
+        return False
+
+    def _send(self, instance: models.Model) -> Exception | None:
+        """
+        Send the signal to all receivers, and return the first error raised.
+
+        The receivers are run in a savepoint, which is rolled back if any of
+        them fails, so that a database error raised by a receiver (which
+        aborts the transaction on PostgreSQL) doesn't prevent the failure
+        from being recorded, or affect the other messages in the batch.
+
+        """
+        signal = getattr(signals, self.signal)
+        try:
+            with transaction.atomic(), metrics.timer(
+                "signal", signal=self.signal
+            ), tracing.span(
+                "onfido.signal",
+                signal=self.signal,
+                onfido_id=self.onfido_id,
+                resource_type=self.resource_type,
+            ):
+                responses = signal.send_robust(
+                    instance.__class__, instance=instance, **self.kwargs
+                )
+                errors = [r for _, r in responses if isinstance(r, Exception)]
+                if errors:
+                    transaction.set_rollback(True)
+        except DatabaseError as ex:
+            # a receiver swallowed a database error, and the savepoint could
+            # not be released (it has been rolled back)
+            return ex
+        return errors[0] if errors else None
+
+    @property
+    def retry_delay(self) -> float:
+        """Return the number of seconds to wait before the next attempt."""
+        if not self.attempts:
+            return 0
+        return min(
+            OUTBOX_RETRY_DELAY * 2 ** (self.attempts - 1), OUTBOX_MAX_RETRY_DELAY
+        )
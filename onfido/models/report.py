@@ -1,24 +1,39 @@
 from __future__ import annotations
 
 import logging
+import os
 
 from django.conf import settings
+from django.core.files.storage import Storage
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
+from .. import tracing
+from ..api import download
+from ..concurrency import RateLimiter
+from ..logs import log_payload
 from ..settings import scrub_report_data
-from .base import BaseQuerySet, BaseStatusModel
+from .base import BaseStatusModel, BaseStatusQuerySet
 from .check import Check
 
 logger = logging.getLogger(__name__)
 
 
-class ReportQuerySet(BaseQuerySet):
+def _stored_names(storage: Storage, directory: str) -> set[str]:
+    """Return the names (without extensions) of the files in a directory."""
+    try:
+        _, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return set()
+    return {os.path.splitext(name)[0] for name in files}
+
+
+class ReportQuerySet(BaseStatusQuerySet):
     """Report model queryset."""
 
     def create_report(self, check: Check, raw: dict) -> Report:
         """Create a new Report from the raw JSON."""
-        logger.debug("Creating new Onfido report from JSON: %s", raw)
+        log_payload(logger, "Creating new Onfido report from JSON: %s", payload=raw)
         return Report(user=check.user, onfido_check=check).parse(raw).save()
 
 
@@ -91,6 +106,7 @@ class Report(BaseStatusModel):
     )
     report_type = models.CharField(
         max_length=50,
+        db_index=True,
         choices=ReportType.choices + REPORT_TYPE_CHOICES_DEPRECATED,
         help_text=_(
             "The name of the report - see https://documentation.onfido.com/#reports"
@@ -109,6 +125,7 @@ class Report(BaseStatusModel):
             self.id, self.report_type, self.user.id
         )
 
+    @tracing.traced("onfido.parse")
     def parse(self, raw_json: dict) -> Report:
         """
         Parse the raw value out into other properties.
@@ -121,3 +138,37 @@ class Report(BaseStatusModel):
         super().parse(scrub_report_data(raw_json))
         self.report_type = self.raw["name"]
         return self
+
+    @property
+    def document_ids(self) -> list[str]:
+        """Return the ids of the documents that the report is based on."""
+        # raw is None once the report has been expired
+        return [d["id"] for d in (self.raw or {}).get("documents") or []]
+
+    def download_documents(
+        self,
+        storage: Storage,
+        directory: str,
+        skip_existing: bool = False,
+        limiter: RateLimiter | None = None,
+    ) -> list[str]:
+        """
+        Download the report's documents, and save them to storage.
+
+        Each document is streamed into storage as "<directory>/<document id>",
+        with an extension based on its content type. If skip_existing is True
+        then documents that are already in the directory (with any extension)
+        are not downloaded again. If limiter is set, its wait method is called
+        before each request. Returns the names of the saved files.
+
+        """
+        existing = _stored_names(storage, directory) if skip_existing else set()
+        names = []
+        for document_id in self.document_ids:
+            if document_id in existing:
+                continue
+            if limiter:
+                limiter.wait()
+            href = f"documents/{document_id}/download"
+            names.append(download(href, storage, f"{directory}/{document_id}"))
+        return names
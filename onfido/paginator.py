@@ -0,0 +1,52 @@
+"""
+Paginator that avoids exact counts of very large querysets.
+
+On PostgreSQL, SELECT COUNT(*) has to scan the whole table (or index), which
+on multi-million row tables can take seconds. ApproximateCountPaginator asks
+the query planner for its estimate of the number of rows instead (using
+EXPLAIN, which takes the filters into account), and only runs the exact
+count if the estimate is below a threshold - so small tables and tightly
+filtered querysets still get exact page counts.
+
+"""
+
+from __future__ import annotations
+
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections, models
+from django.utils.functional import cached_property
+
+from .settings import ADMIN_APPROXIMATE_COUNT_THRESHOLD
+
+
+def estimate_count(queryset: models.QuerySet) -> int | None:
+    """Return the planner's row estimate for queryset (None if not PostgreSQL)."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    # psycopg2 decodes the json column, other drivers may not
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class ApproximateCountPaginator(Paginator):
+    """Paginator that uses the planner estimate for counts above threshold."""
+
+    threshold = ADMIN_APPROXIMATE_COUNT_THRESHOLD
+
+    @cached_property
+    def count(self) -> int:
+        """Return the estimated number of objects, if above threshold."""
+        estimate = None
+        if isinstance(self.object_list, models.QuerySet):
+            estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < self.threshold:
+            return super().count
+        return estimate
@@ -0,0 +1,269 @@
+"""
+Monthly range partitioning of the Event table (PostgreSQL only).
+
+The Event table is converted (once) into a table partitioned by RANGE on
+received_at, with one partition per calendar month. Old months can then
+be removed by detaching and dropping their partition, which is O(1), rather
+than by deleting rows. The Event model itself is unchanged - it continues
+to read from / write to the (parent) table by name.
+
+NB PostgreSQL requires the partition key to be part of the primary key, so
+the primary key of the converted table is (id, received_at). The id column
+is still populated from a sequence, and is still unique in practice.
+
+"""
+
+from __future__ import annotations
+
+import datetime
+import logging
+
+from django.db import connection, transaction
+from django.db.backends.utils import names_digest
+
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+# partitions are named {table}_pYYYY_MM, e.g. onfido_event_p2022_05
+PARTITION_SUFFIX_FORMAT = "_p%Y_%m"
+
+
+def _table() -> str:
+    return Event._meta.db_table
+
+
+def month_start(value: datetime.date) -> datetime.date:
+    """Return the first day of the month containing value."""
+    return datetime.date(value.year, value.month, 1)
+
+
+def add_months(month: datetime.date, months: int) -> datetime.date:
+    """Return the first day of the month that is N months after month."""
+    index = month.year * 12 + month.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: datetime.date) -> str:
+    """Return the name of the partition that holds the given month."""
+    return _table() + month.strftime(PARTITION_SUFFIX_FORMAT)
+
+
+def partition_month(name: str) -> datetime.date | None:
+    """Return the month held by a partition, or None if it's not monthly."""
+    try:
+        suffix = name[len(_table()) :]
+        return datetime.datetime.strptime(suffix, PARTITION_SUFFIX_FORMAT).date()
+    except ValueError:
+        return None
+
+
+def create_partition_sql(month: datetime.date, parent: str = "") -> str:
+    """Return the DDL used to create the partition for a month."""
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} "
+        f"PARTITION OF {parent or _table()} "
+        f"FOR VALUES FROM ('{month.isoformat()}') "
+        f"TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def default_partition_name() -> str:
+    """Return the name of the DEFAULT partition (see convert_sql)."""
+    return f"{_table()}_default"
+
+
+def create_partitions_sql(months: list[datetime.date], default: bool) -> list[str]:
+    """
+    Return the DDL used to create the partitions for months.
+
+    If the table has a DEFAULT partition then it may already hold rows for
+    those months (e.g. if 'create' was run late), and PostgreSQL refuses to
+    create a partition that overlaps them. So the DEFAULT partition is
+    detached, the partitions are created, any matching rows are moved from
+    the DEFAULT partition into them, and it is then re-attached.
+
+    """
+    if not months:
+        return []
+    if not default:
+        return [create_partition_sql(m) for m in months]
+    table = _table()
+    default_name = default_partition_name()
+    statements = [f"ALTER TABLE {table} DETACH PARTITION {default_name}"]
+    statements += [create_partition_sql(m) for m in months]
+    for month in months:
+        statements.append(
+            f"WITH moved AS (DELETE FROM {default_name} "
+            f"WHERE received_at >= '{month.isoformat()}' "
+            f"AND received_at < '{add_months(month, 1).isoformat()}' "
+            f"RETURNING *) INSERT INTO {table} SELECT * FROM moved"
+        )
+    statements.append(f"ALTER TABLE {table} ATTACH PARTITION {default_name} DEFAULT")
+    return statements
+
+
+def drop_partition_sql(name: str) -> list[str]:
+    """Return the DDL used to detach and drop a partition."""
+    return [
+        f"ALTER TABLE {_table()} DETACH PARTITION {name}",
+        f"DROP TABLE {name}",
+    ]
+
+
+def index_sql() -> list[str]:
+    """
+    Return the DDL used to create the Event secondary indexes.
+
+    The indexes are those declared on the model (db_index fields, using the
+    names that Django generates for them, plus the varchar_pattern_ops
+    "_like" index that Django adds for CharFields, used by LIKE / startswith
+    lookups, and Meta.indexes), plus the trigram index on onfido_id if the
+    pg_trgm extension is installed. When
+    run against the partitioned table each index is created on every
+    partition.
+
+    """
+    table = _table()
+    statements = []
+    for field in Event._meta.fields:
+        if field.db_index and not field.primary_key:
+            digest = names_digest(table, field.column, length=8)
+            statements.append(
+                f"CREATE INDEX {table}_{field.column}_{digest} "
+                f"ON {table} ({field.column})"
+            )
+            if field.get_internal_type() == "CharField":
+                statements.append(
+                    f"CREATE INDEX {table}_{field.column}_{digest}_like "
+                    f"ON {table} ({field.column} varchar_pattern_ops)"
+                )
+    for index in Event._meta.indexes:
+        columns = ", ".join(Event._meta.get_field(f).column for f in index.fields)
+        statements.append(f"CREATE INDEX {index.name} ON {table} ({columns})")
+    statements.append(
+        "DO $$ BEGIN "
+        "IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN "
+        f"CREATE INDEX {table}_onfido_id_trgm "
+        f"ON {table} USING gin ((UPPER(onfido_id::text)) gin_trgm_ops); "
+        "END IF; END $$"
+    )
+    return statements
+
+
+def rename_indexes_sql(table: str, suffix: str) -> str:
+    """Return the DDL used to add a suffix to the names of a table's indexes."""
+    return (
+        "DO $$ DECLARE r record; BEGIN "
+        "FOR r IN SELECT c.relname FROM pg_index i "
+        "JOIN pg_class c ON c.oid = i.indexrelid "
+        f"WHERE i.indrelid = '{table}'::regclass LOOP "
+        "EXECUTE format('ALTER INDEX %I RENAME TO %I', "
+        f"r.relname, left(r.relname, {63 - len(suffix)}) || '{suffix}'); "
+        "END LOOP; END $$"
+    )
+
+
+def convert_sql(first_month: datetime.date, last_month: datetime.date) -> list[str]:
+    """
+    Return the DDL used to convert the Event table into a partitioned table.
+
+    The existing table is renamed to {table}_legacy (and left in place, so
+    that it can be checked, and dropped manually), and its rows are copied
+    into the new partitioned table. A new sequence is created for the id
+    column, as the original sequence (serial or identity) is owned by the
+    legacy table. A DEFAULT partition catches any rows that fall outside
+    of the monthly partitions.
+
+    LIKE ... INCLUDING DEFAULTS does not copy any indexes, so the legacy
+    indexes are renamed (to free up their names), and the secondary indexes
+    are recreated on the partitioned table once the rows have been copied.
+
+    """
+    table = _table()
+    new_table = f"{table}_partitioned"
+    sequence = f"{table}_partitioned_id_seq"
+    statements = [
+        f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE",
+        (
+            f"CREATE TABLE {new_table} (LIKE {table} INCLUDING DEFAULTS) "
+            "PARTITION BY RANGE (received_at)"
+        ),
+        f"CREATE SEQUENCE {sequence} OWNED BY {new_table}.id",
+        f"ALTER TABLE {new_table} ALTER COLUMN id SET DEFAULT nextval('{sequence}')",
+        (
+            f"SELECT setval('{sequence}', "
+            f"COALESCE((SELECT max(id) FROM {table}), 0) + 1, false)"
+        ),
+        f"ALTER TABLE {new_table} ADD PRIMARY KEY (id, received_at)",
+        f"CREATE TABLE {default_partition_name()} PARTITION OF {new_table} DEFAULT",
+    ]
+    month = first_month
+    while month <= last_month:
+        statements.append(create_partition_sql(month, parent=new_table))
+        month = add_months(month, 1)
+    statements += [
+        f"INSERT INTO {new_table} SELECT * FROM {table}",
+        f"ALTER TABLE {table} RENAME TO {table}_legacy",
+        f"ALTER TABLE {new_table} RENAME TO {table}",
+        rename_indexes_sql(f"{table}_legacy", "_legacy"),
+    ]
+    return statements + index_sql()
+
+
+def is_partitioned() -> bool:
+    """Return True if the Event table has already been partitioned."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s",
+            [_table()],
+        )
+        return cursor.fetchone() is not None
+
+
+def list_partitions() -> list[str]:
+    """Return the names of all of the Event table partitions."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s ORDER BY c.relname",
+            [_table()],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _execute(statements: list[str]) -> None:
+    with transaction.atomic(), connection.cursor() as cursor:
+        for sql in statements:
+            logger.debug("Executing partition DDL: %s", sql)
+            cursor.execute(sql)
+
+
+def convert(months_ahead: int = 3) -> None:
+    """Convert the Event table into a partitioned table."""
+    first = Event.objects.order_by("received_at").values_list("received_at").first()
+    today = datetime.date.today()
+    first_month = month_start(first[0] if first else today)
+    _execute(convert_sql(first_month, add_months(month_start(today), months_ahead)))
+
+
+def create_partitions(months_ahead: int = 3) -> list[str]:
+    """Create partitions for the current month and months_ahead future months."""
+    month = month_start(datetime.date.today())
+    months = [add_months(month, i) for i in range(months_ahead + 1)]
+    existing = set(list_partitions())
+    missing = [m for m in months if partition_name(m) not in existing]
+    _execute(create_partitions_sql(missing, default_partition_name() in existing))
+    return [partition_name(m) for m in missing]
+
+
+def drop_partitions(keep_months: int) -> list[str]:
+    """Drop the partitions for months before the last keep_months months."""
+    cutoff = add_months(month_start(datetime.date.today()), -keep_months)
+    expired = [n for n in list_partitions() if (partition_month(n) or cutoff) < cutoff]
+    _execute([sql for name in expired for sql in drop_partition_sql(name)])
+    return expired
@@ -10,14 +10,28 @@ def _setting(key, default):
 # API key from evnironment by default
 API_KEY = _setting("ONFIDO_API_KEY", None)
 
-# Webhook token - see https://documentation.onfido.com/#webhooks
-WEBHOOK_TOKEN = _setting("ONFIDO_WEBHOOK_TOKEN", None)
-# token must be a bytestring for HMAC function to work
-WEBHOOK_TOKEN = str.encode(WEBHOOK_TOKEN) if WEBHOOK_TOKEN else None
+# API root url - override to point at a proxy, or a local stub server
+API_ROOT = _setting("ONFIDO_API_ROOT", "https://api.onfido.com/v3/")
+
+# Seconds for which the webhook tokens are cached before they are reloaded
+WEBHOOK_TOKENS_TTL = int(_setting("ONFIDO_WEBHOOK_TOKENS_TTL", 300))
 
 # Set to False to turn off event logging
 LOG_EVENTS = _setting("ONFIDO_LOG_EVENTS", True)
 
+# Set to True to store Event payloads in compact form - the values that are
+# already stored in the Event fields are removed, and the full payload is
+# rebuilt when Event.raw is accessed.
+COMPACT_EVENTS = _setting("ONFIDO_COMPACT_EVENTS", False)
+
+# Set to True to include request / response payloads in debug logging, and
+# the maximum number of characters of each payload that are logged.
+LOG_PAYLOADS = _setting("ONFIDO_LOG_PAYLOADS", False)
+LOG_PAYLOAD_MAX_LENGTH = int(_setting("ONFIDO_LOG_PAYLOAD_MAX_LENGTH", 2000))
+
+# Dotted path to the metrics backend class - see onfido.metrics
+METRICS_BACKEND = _setting("ONFIDO_METRICS_BACKEND", "onfido.metrics.Metrics")
+
 # Set to True to bypass request verification (NOT RECOMMENDED)
 TEST_MODE = _setting("ONFIDO_TEST_MODE", False)
 
@@ -25,6 +39,68 @@ TEST_MODE = _setting("ONFIDO_TEST_MODE", False)
 # can't be found on the Onfido platform.
 SYNC_DELETION = _setting("ONFIDO_SYNC_DELETION", False)
 
+# Number of threads used to fetch objects by the admin "Pull from Onfido"
+# action, the maximum number of API requests per second that they make, and
+# the number of selected objects above which the action runs in the background
+# - by default, the number that can be pulled in PULL_REQUEST_SECONDS.
+PULL_MAX_WORKERS = int(_setting("ONFIDO_PULL_MAX_WORKERS", 8))
+PULL_RATE_LIMIT = float(_setting("ONFIDO_PULL_RATE_LIMIT", 5))
+PULL_REQUEST_SECONDS = 10
+PULL_BACKGROUND_THRESHOLD = int(
+    _setting(
+        "ONFIDO_PULL_BACKGROUND_THRESHOLD", PULL_RATE_LIMIT * PULL_REQUEST_SECONDS or 50
+    )
+)
+
+# Number of threads used by helpers.create_applicants to create applicants,
+# and the maximum number of API requests per second that they make.
+CREATE_APPLICANTS_MAX_WORKERS = int(_setting("ONFIDO_CREATE_APPLICANTS_MAX_WORKERS", 8))
+CREATE_APPLICANTS_RATE_LIMIT = float(_setting("ONFIDO_CREATE_APPLICANTS_RATE_LIMIT", 5))
+
+# Set to True to make the admin changelists cheaper on very large tables -
+# they are ordered by primary key, and use the database's estimated count
+# (PostgreSQL only) when it is above the threshold.
+ADMIN_FAST_CHANGELIST = _setting("ONFIDO_ADMIN_FAST_CHANGELIST", False)
+ADMIN_APPROXIMATE_COUNT_THRESHOLD = int(
+    _setting("ONFIDO_ADMIN_APPROXIMATE_COUNT_THRESHOLD", 100000)
+)
+
+# Number of (most recent) related events shown on the admin detail pages.
+ADMIN_EVENTS_PAGE_SIZE = int(_setting("ONFIDO_ADMIN_EVENTS_PAGE_SIZE", 20))
+
+# Number of characters of raw JSON shown on the admin detail pages (the full
+# JSON is linked), and the number of seconds for which it is cached.
+ADMIN_RAW_PREVIEW_LENGTH = int(_setting("ONFIDO_ADMIN_RAW_PREVIEW_LENGTH", 5000))
+ADMIN_RAW_CACHE_TIMEOUT = int(_setting("ONFIDO_ADMIN_RAW_CACHE_TIMEOUT", 3600))
+
+# The cache (alias) used to store each user's verification status, and the
+# number of seconds for which it is cached.
+VERIFICATION_CACHE = _setting("ONFIDO_VERIFICATION_CACHE", "default")
+VERIFICATION_CACHE_TIMEOUT = int(_setting("ONFIDO_VERIFICATION_CACHE_TIMEOUT", 3600))
+
+# The cache (alias) used to store applicants' SDK tokens, and the number of
+# seconds before a token expires at which a new one is generated instead.
+SDK_TOKEN_CACHE = _setting("ONFIDO_SDK_TOKEN_CACHE", "default")
+SDK_TOKEN_EXPIRY_MARGIN = int(_setting("ONFIDO_SDK_TOKEN_EXPIRY_MARGIN", 600))
+
+# Set to True to write status signals to the outbox table (in the same
+# transaction as the status update) instead of sending them synchronously.
+# The onfido_dispatch_signals command must be running to deliver them.
+SIGNAL_OUTBOX = _setting("ONFIDO_SIGNAL_OUTBOX", False)
+
+# Number of failed delivery attempts after which an outbox message is no
+# longer retried (it is left in the table, and shown as "abandoned" in the
+# admin), and the delay before the first retry - which doubles after each
+# failed attempt, up to the maximum delay (all in seconds).
+OUTBOX_MAX_ATTEMPTS = int(_setting("ONFIDO_OUTBOX_MAX_ATTEMPTS", 10))
+OUTBOX_RETRY_DELAY = float(_setting("ONFIDO_OUTBOX_RETRY_DELAY", 5))
+OUTBOX_MAX_RETRY_DELAY = float(_setting("ONFIDO_OUTBOX_MAX_RETRY_DELAY", 3600))
+
+# Seconds for which a batch of outbox messages is claimed by a dispatcher -
+# if the dispatcher dies mid-batch, its undelivered messages are retried
+# once the claim expires.
+OUTBOX_CLAIM_TIMEOUT = float(_setting("ONFIDO_OUTBOX_CLAIM_TIMEOUT", 300))
+
 
 def DEFAULT_REPORT_SCRUBBER(raw):
     """Remove breakdown and properties."""
@@ -44,3 +120,46 @@ scrub_report_data = (
 scrub_applicant_data = (
     getattr(settings, "ONFIDO_APPLICANT_SCRUBBER", None) or DEFAULT_APPLICANT_SCRUBBER
 )
+
+
+def DEFAULT_APPLICANT_USER_RESOLVER(raw):
+    """Return the user whose email matches the (unscrubbed) applicant."""
+    from django.contrib.auth import get_user_model
+
+    email = raw.get("email")
+    if not email:
+        return None
+    return get_user_model().objects.filter(email__iexact=email).first()
+
+
+def DEFAULT_WEBHOOK_TOKEN_LOADER():
+    """
+    Return the webhook tokens from the ONFIDO_WEBHOOK_TOKEN(S) settings.
+
+    ONFIDO_WEBHOOK_TOKENS is a list of tokens (or a comma-separated string
+    if set in the environment) that are accepted in addition to the primary
+    ONFIDO_WEBHOOK_TOKEN (see https://documentation.onfido.com/#webhooks).
+    NB the environment and Django settings of a running process don't
+    change, so rotating tokens without a restart requires a custom
+    ONFIDO_WEBHOOK_TOKEN_LOADER.
+
+    """
+    tokens = _setting("ONFIDO_WEBHOOK_TOKENS", None) or []
+    if isinstance(tokens, str):
+        tokens = tokens.split(",")
+    tokens = [_setting("ONFIDO_WEBHOOK_TOKEN", None)] + list(tokens)
+    tokens = [t.encode() if isinstance(t, str) else t for t in tokens if t]
+    return list(dict.fromkeys(t.strip() for t in tokens))
+
+
+# function that returns the list of valid webhook tokens (as bytes)
+load_webhook_tokens = (
+    getattr(settings, "ONFIDO_WEBHOOK_TOKEN_LOADER", None)
+    or DEFAULT_WEBHOOK_TOKEN_LOADER
+)
+
+# function used to map remote applicants to local users when importing
+resolve_applicant_user = (
+    getattr(settings, "ONFIDO_APPLICANT_USER_RESOLVER", None)
+    or DEFAULT_APPLICANT_USER_RESOLVER
+)
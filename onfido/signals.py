@@ -19,3 +19,10 @@ on_status_change = Signal()
 # signal that results in completion, we have a dedicated signal.
 # providing_args=["instance", "completed_at"]
 on_completion = Signal()
+
+# fired by BaseQuerySet.pull() (e.g. onfido_sync) for each batch of objects
+# whose status has changed - there are no per-object signals in this case,
+# so that receivers can process the changes using bulk operations.
+# e.g. (Check, [(obj, 'in_progress', 'complete'), ...])
+# providing_args=["changes"]
+on_bulk_status_change = Signal()
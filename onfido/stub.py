@@ -0,0 +1,298 @@
+"""
+In-process stub of the Onfido API, for load testing and benchmarks.
+
+The stub implements the subset of the v3 API that this app uses - applicants,
+checks, reports and webhook registration - backed by in-memory dicts. It can
+be configured to add latency to every request, and to fail a proportion of
+requests with a 500 or a 429 (rate limited) error, so that the behaviour of
+the app under adverse conditions can be measured.
+
+Point the app at the stub by setting ONFIDO_API_ROOT to StubServer.url (or by
+patching onfido.api.API_ROOT in tests):
+
+    >>> with StubServer(latency=0.05, error_rate=0.01) as server:
+    ...     with mock.patch("onfido.api.API_ROOT", server.url):
+    ...         create_applicant(user)
+
+The stub can also generate signed webhook payloads for the objects that it
+holds (see StubServer.webhook), using the same HMAC as the webhook view.
+
+"""
+from __future__ import annotations
+
+import json
+import logging
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib import parse as urlparse
+
+from django.utils.timezone import now as tz_now
+
+from .decorators import _hmac
+
+logger = logging.getLogger(__name__)
+
+# all stub urls are served under this path, e.g. http://127.0.0.1:8765/v3/
+API_PATH = "/v3/"
+
+
+class StubServer:
+    """Threaded HTTP server that mimics the Onfido API."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: int = 1,
+        webhook_token: bytes = b"stub-webhook-token",
+        seed: int | None = None,
+    ) -> None:
+        """
+        Initialise the stub (the server is not started until start() is called).
+
+        Args:
+            host: the interface to bind to.
+            port: the port to bind to - 0 picks a free port.
+            latency: seconds to wait before responding to each request.
+            error_rate: proportion (0-1) of requests that fail with a 500.
+            rate_limit_rate: proportion (0-1) of requests that fail with a 429.
+            retry_after: value of the Retry-After header sent with a 429.
+            webhook_token: token used to sign webhook payloads.
+            seed: random seed, for repeatable error sequences.
+
+        """
+        self.host = host
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.webhook_token = webhook_token
+        self.random = random.Random(seed)  # noqa: S311
+        self.lock = threading.Lock()
+        self.applicants: dict[str, dict] = {}
+        self.checks: dict[str, dict] = {}
+        self.reports: dict[str, dict] = {}
+        self.webhooks: dict[str, dict] = {}
+        self.request_count = 0
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self  # type: ignore[attr-defined]
+        self.thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        """Return the API root url of the running stub."""
+        return f"http://{self.host}:{self.httpd.server_port}{API_PATH}"
+
+    def start(self) -> StubServer:
+        self.thread = threading.Thread(
+            target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> StubServer:
+        return self.start()
+
+    def __exit__(self, *args: Any) -> None:
+        self.stop()
+
+    def _href(self, resource: str, onfido_id: str) -> str:
+        return f"{API_PATH}{resource}/{onfido_id}"
+
+    def create_applicant(self, data: dict) -> dict:
+        applicant_id = str(uuid.uuid4())
+        applicant = {
+            "id": applicant_id,
+            "created_at": tz_now().isoformat(),
+            "href": self._href("applicants", applicant_id),
+            "sandbox": True,
+            **data,
+        }
+        with self.lock:
+            self.applicants[applicant_id] = applicant
+        return applicant
+
+    def create_check(self, data: dict) -> dict:
+        if data.get("applicant_id") not in self.applicants:
+            raise KeyError(data.get("applicant_id"))
+        check_id = str(uuid.uuid4())
+        reports = [self._create_report(check_id, name) for name in data["report_names"]]
+        check = {
+            "id": check_id,
+            "created_at": tz_now().isoformat(),
+            "href": self._href("checks", check_id),
+            "status": "in_progress",
+            "result": None,
+            "sandbox": True,
+            "tags": data.get("tags", []),
+            "report_ids": [r["id"] for r in reports],
+            "applicant_id": data["applicant_id"],
+        }
+        with self.lock:
+            self.checks[check_id] = check
+        return check
+
+    def _create_report(self, check_id: str, name: str) -> dict:
+        report_id = str(uuid.uuid4())
+        report = {
+            "id": report_id,
+            "created_at": tz_now().isoformat(),
+            "href": self._href("reports", report_id),
+            "name": name,
+            "status": "awaiting_data",
+            "result": None,
+            "sub_result": None,
+            "breakdown": {},
+            "properties": {},
+            "check_id": check_id,
+            "documents": [],
+        }
+        with self.lock:
+            self.reports[report_id] = report
+        return report
+
+    def complete_check(self, check_id: str, result: str = "clear") -> None:
+        """Mark a check (and all of its reports) as complete."""
+        with self.lock:
+            check = self.checks[check_id]
+            for report_id in check["report_ids"]:
+                self.reports[report_id].update(status="complete", result=result)
+            check.update(status="complete", result=result)
+
+    def webhook(self, resource_type: str, onfido_id: str, action: str) -> tuple:
+        """
+        Return a signed webhook payload for an object held by the stub.
+
+        Returns a tuple of (body, signature) - where body is the bytes to POST
+        to the webhook view, and signature is the X-SHA2-Signature header.
+
+        """
+        store = self.checks if resource_type == "check" else self.reports
+        obj = store[onfido_id]
+        payload = {
+            "payload": {
+                "resource_type": resource_type,
+                "action": action,
+                "object": {
+                    "id": onfido_id,
+                    "status": obj["status"],
+                    "completed_at_iso8601": tz_now().isoformat(),
+                    "href": obj["href"],
+                },
+            }
+        }
+        body = json.dumps(payload).encode()
+        return body, _hmac(self.webhook_token, body)
+
+    def dispatch(self, method: str, path: str, query: dict, data: dict) -> tuple:
+        """Route a request and return (status_code, response data)."""
+        parts = path[len(API_PATH) :].strip("/").split("/")
+        resource, onfido_id = parts[0], (parts[1] if len(parts) > 1 else None)
+        if method == "POST" and onfido_id is None:
+            creators = {
+                "applicants": self.create_applicant,
+                "checks": self.create_check,
+                "webhooks": self._create_webhook,
+            }
+            return 201, creators[resource](data)
+        stores = {
+            "applicants": self.applicants,
+            "checks": self.checks,
+            "reports": self.reports,
+        }
+        if onfido_id:
+            return 200, stores[resource][onfido_id]
+        return 200, {resource: self._list(resource, stores[resource], query)}
+
+    def _list(self, resource: str, store: dict, query: dict) -> list:
+        if resource == "checks":
+            applicant_id = query.get("applicant_id")
+            return [c for c in store.values() if c["applicant_id"] == applicant_id]
+        if resource == "reports":
+            check_id = query.get("check_id")
+            return [r for r in store.values() if r["check_id"] == check_id]
+        page = int(query.get("page", 1))
+        per_page = int(query.get("per_page", 20))
+        return list(store.values())[(page - 1) * per_page : page * per_page]
+
+    def _create_webhook(self, data: dict) -> dict:
+        webhook_id = str(uuid.uuid4())
+        webhook = {
+            "id": webhook_id,
+            "url": data["url"],
+            "token": self.webhook_token.decode(),
+            "href": self._href("webhooks", webhook_id),
+            "enabled": True,
+            "events": data.get("events", []),
+        }
+        with self.lock:
+            self.webhooks[webhook_id] = webhook
+        return webhook
+
+
+def _error(error_type: str, message: str) -> dict:
+    return {"error": {"type": error_type, "message": message, "fields": {}}}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Request handler that delegates to the StubServer."""
+
+    server: Any
+
+    def do_GET(self) -> None:  # noqa: N802
+        self._handle("GET")
+
+    def do_POST(self) -> None:  # noqa: N802
+        self._handle("POST")
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        logger.debug("Onfido stub: " + format, *args)
+
+    def _respond(self, status: int, data: dict, headers: dict | None = None) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method: str) -> None:
+        stub = self.server.stub
+        with stub.lock:
+            stub.request_count += 1
+            roll = stub.random.random()
+        if stub.latency:
+            time.sleep(stub.latency)
+        if not self.headers.get("Authorization", "").startswith("Token token="):
+            return self._respond(401, _error("authorization_error", "Missing token"))
+        if roll < stub.rate_limit_rate:
+            return self._respond(
+                429,
+                _error("rate_limit", "Rate limit exceeded"),
+                {"Retry-After": str(stub.retry_after)},
+            )
+        if roll < stub.rate_limit_rate + stub.error_rate:
+            return self._respond(500, _error("internal_server_error", "Stub error"))
+        url = urlparse.urlparse(self.path)
+        query = dict(urlparse.parse_qsl(url.query))
+        length = int(self.headers.get("Content-Length") or 0)
+        data = json.loads(self.rfile.read(length)) if length else {}
+        try:
+            status, response = stub.dispatch(method, url.path, query, data)
+        except KeyError as ex:
+            return self._respond(404, _error("resource_not_found", f"Not found: {ex}"))
+        return self._respond(status, response)
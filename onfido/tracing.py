@@ -0,0 +1,100 @@
+"""
+Optional OpenTelemetry tracing for API calls, parsing, saves and signals.
+
+If the opentelemetry-api package is installed, spans are created using the
+"onfido" tracer, and will be exported by whatever tracer provider the project
+has configured. If it is not installed, all of the functions in this module
+are no-ops.
+
+The following spans are recorded (all carry resource_type, and onfido_id
+where known):
+
+    onfido.create_applicant / onfido.create_check   helpers
+    onfido.api.get / onfido.api.post                 each API request
+    onfido.api.upload / onfido.api.download          each file upload / download
+    onfido.webhook                                   the webhook view
+    onfido.parse                                     each parse() call
+    onfido.save                                      each DB save
+    onfido.signal                                    each signal dispatch
+
+"""
+
+from __future__ import annotations
+
+import contextvars
+import functools
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+try:
+    from opentelemetry import trace
+except ImportError:
+    trace = None
+
+tracer = trace.get_tracer("onfido") if trace else None
+
+# names of the traced() spans that are open in the current context - used to
+# prevent nested spans when an overridden method calls super().
+_active: contextvars.ContextVar[frozenset] = contextvars.ContextVar(
+    "onfido_traced", default=frozenset()
+)
+
+
+class _NoopSpan:
+    """Stand-in for an OpenTelemetry span when tracing is not available."""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """
+    Record the enclosed block as a span, and yield the span.
+
+    Attributes with a value of None are not recorded. The span (or a no-op
+    stand-in) is yielded so that attributes can be added once known:
+
+        >>> with span("onfido.api.get", endpoint="checks") as current:
+        ...     response = requests.get(url)
+        ...     current.set_attribute("http.status_code", response.status_code)
+
+    """
+    if tracer is None:
+        yield _NoopSpan()
+        return
+    attributes = {k: v for k, v in attributes.items() if v is not None}
+    with tracer.start_as_current_span(name, attributes=attributes) as current:
+        yield current
+
+
+def traced(name: str) -> Callable:
+    """
+    Record calls to a model method as a span.
+
+    The span carries the model name as resource_type, and the object's
+    onfido_id (which is set after the method has run, as parse() is the
+    method that sets it). If the method calls super(), and the parent
+    method is also traced under the same name, only one span is recorded.
+
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            active = _active.get()
+            if name in active:
+                return func(self, *args, **kwargs)
+            token = _active.set(active | {name})
+            try:
+                with span(name, resource_type=self._meta.model_name) as current:
+                    result = func(self, *args, **kwargs)
+                    if self.onfido_id:
+                        current.set_attribute("onfido_id", self.onfido_id)
+                    return result
+            finally:
+                _active.reset(token)
+
+        return wrapper
+
+    return decorator
@@ -6,16 +6,20 @@ in status' of checks and reports.
 See https://documentation.onfido.com/?shell#webhooks
 
 """
+
 from __future__ import annotations
 
 import json
 import logging
+import time
 
 from django.http import HttpRequest, HttpResponse
 from django.utils.timezone import now
 from django.views.decorators.csrf import csrf_exempt
 
+from . import metrics, tracing
 from .decorators import verify_signature
+from .logs import log_payload
 from .models import Check, Event, Report
 from .settings import LOG_EVENTS
 
@@ -42,14 +46,19 @@ def status_update(request: HttpRequest) -> HttpResponse:
 
     """
     received_at = now()
-    logger.debug("Received Onfido callback: {}".format(request.body))
+    log_payload(logger, "Received Onfido callback: %s", payload=request.body)
     data = json.loads(request.body)
     event = Event(received_at=received_at)
+    start = time.perf_counter()
     try:
-        resource = event.parse(data).resource
-        resource.update_status(event)
-        if LOG_EVENTS:
-            event.save()
+        with tracing.span("onfido.webhook") as current:
+            resource = event.parse(data).resource
+            current.set_attribute("onfido_id", event.onfido_id)
+            current.set_attribute("resource_type", event.resource_type)
+            resource.update_status(event)
+            if LOG_EVENTS:
+                with tracing.span("onfido.save", resource_type="event"):
+                    event.save()
         return HttpResponse("Update processed.")
     except KeyError as ex:
         logger.warning("Missing Onfido event content: %s", ex)
@@ -66,3 +75,10 @@ def status_update(request: HttpRequest) -> HttpResponse:
     except Exception:  # noqa: B902
         logger.exception("Onfido update could not be processed.")
         return HttpResponse("Unknown error.")
+    finally:
+        metrics.timing(
+            "webhook",
+            time.perf_counter() - start,
+            resource_type=event.resource_type or "unknown",
+            action=event.action or "unknown",
+        )
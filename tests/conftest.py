@@ -1,9 +1,11 @@
 """Shared pytest fixtures and test data."""
+
 import copy
 import uuid
 
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 
 from onfido.models import Applicant, Check, Event, Report
 
@@ -16,6 +18,13 @@ DOCUMENT_ID = str(uuid.uuid4())
 User = get_user_model()
 
 
+@pytest.fixture
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
 @pytest.fixture
 def user():
     return User.objects.create_user(
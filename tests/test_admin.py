@@ -1,43 +1,147 @@
+import datetime
 from decimal import Decimal
 from unittest import mock
 
 import pytest
+import simplejson as json
 from dateutil.parser import parse as date_parse
+from django.contrib import admin
+from django.contrib.admin.models import LogEntry
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.timezone import now as tz_now
+from django.utils.timezone import utc
 
-from onfido.admin import Applicant, Check, EventsMixin, RawMixin, ResultMixin, UserMixin
+from onfido.admin import (
+    Applicant,
+    Check,
+    EventsMixin,
+    PullMixin,
+    RawMixin,
+    ResultMixin,
+    UserMixin,
+    _pretty,
+    _pull_in_background,
+)
+from onfido.models import OutboxMessage
+from onfido.models.base import BaseQuerySet
 from tests.conftest import TEST_EVENT
 
 
 class TestResultMixin:
-    @mock.patch.object(Check, "mark_as_clear")
-    def test__events(self, mock_clear):
-        def request():
-            request = mock.Mock()
-            request.user = get_user_model()()
-            return request
-
-        check = Check()
-        request = request()
+    def test_mark_as_clear(self):
+        request = mock.Mock()
+        request.user = get_user_model()()
+        queryset = mock.Mock()
+        queryset.mark_as_clear.return_value = 2
         mixin = ResultMixin()
-        mixin.mark_as_clear(request, [check])
-        mock_clear.assert_called_once_with(request.user)
+        mixin.message_user = mock.Mock()
+        mixin.mark_as_clear(request, queryset)
+        queryset.mark_as_clear.assert_called_once_with(request.user)
+        mixin.message_user.assert_called_once_with(
+            request, "2 item(s) marked as clear."
+        )
+
+
+@pytest.mark.django_db
+class TestPullMixin:
+    def _request(self, user):
+        request = mock.Mock()
+        request.user = user
+        return request
+
+    @mock.patch("onfido.admin.PULL_BACKGROUND_THRESHOLD", 10)
+    @mock.patch.object(BaseQuerySet, "pull")
+    def test_pull_from_onfido(self, mock_pull, check):
+        mock_pull.return_value = {
+            "changed": 1,
+            "unchanged": 0,
+            "expired": 0,
+            "failed": 0,
+        }
+        request = self._request(check.user)
+        mixin = PullMixin()
+        mixin.message_user = mock.Mock()
+        mixin.pull_from_onfido(request, Check.objects.all())
+        mock_pull.assert_called_once()
+        mixin.message_user.assert_called_once_with(
+            request,
+            "Pulled 1 item(s) from Onfido: 1 changed, 0 unchanged, 0 expired, 0 failed",
+        )
+
+    @mock.patch("onfido.admin.PULL_BACKGROUND_THRESHOLD", 0)
+    @mock.patch("onfido.admin.threading.Thread")
+    def test_pull_from_onfido__background(self, mock_thread, check):
+        request = self._request(check.user)
+        mixin = PullMixin()
+        mixin.message_user = mock.Mock()
+        mixin.pull_from_onfido(request, Check.objects.all())
+        mock_thread.assert_called_once_with(
+            target=_pull_in_background,
+            args=(Check, [check.pk], check.user.pk),
+            daemon=True,
+        )
+        mock_thread.return_value.start.assert_called_once_with()
+
+    @mock.patch("onfido.admin.connections")
+    @mock.patch.object(Check, "fetch", autospec=True)
+    def test__pull_in_background(self, mock_fetch, mock_connections, check):
+        _pull_in_background(Check, [check.pk], check.user.pk)
+        entry = LogEntry.objects.get()
+        assert entry.user == check.user
+        assert entry.change_message == (
+            "Pulled 1 item(s) from Onfido: "
+            "0 changed, 1 unchanged, 0 expired, 0 failed"
+        )
+        mock_connections.close_all.assert_called_once_with()
 
 
 @pytest.mark.django_db
 class TestEventsMixin:
     """onfido.admin.EventsMixin tests."""
 
-    @mock.patch.object(Check, "events")
-    def test__events(self, mock_events, event):
+    def test__events(self, check, event):
+        event.received_at = tz_now()
+        event.save()
         payload = TEST_EVENT["payload"]
         action = payload["action"]
+        status = payload["object"]["status"]
         completed_at = date_parse(payload["object"]["completed_at_iso8601"])
-        mock_events.return_value = [event]
         mixin = EventsMixin()
-        check = Check()
         html = mixin._events(check)
-        assert html == (f"<ul><li>{completed_at.date()}: {action}</li></ul>")
+        assert html == (f"<ul><li>{completed_at.date()}: {action} ({status})</li></ul>")
+
+    @mock.patch("onfido.admin.ADMIN_EVENTS_PAGE_SIZE", 2)
+    def test__events__paginated(self, check, event):
+        for day in (1, 2, 3):
+            event.pk = None
+            event.action = f"action.{day}"
+            event.completed_at = datetime.datetime(2020, 1, day, tzinfo=utc)
+            event.received_at = tz_now()
+            event.save()
+        mixin = admin.site._registry[Check]
+        # one query, regardless of the number of events
+        with CaptureQueriesContext(connection) as ctx:
+            html = mixin._events(check)
+        assert len(ctx.captured_queries) == 1
+        sql = ctx.captured_queries[0]["sql"]
+        assert '"onfido_event"."raw"' not in sql
+        # most recent events, in chronological order
+        assert "action.1" not in html
+        assert html.index("action.2") < html.index("action.3")
+        url = reverse("admin:onfido_event_changelist")
+        assert f"{url}?onfido_id={check.onfido_id}&amp;resource_type=check" in html
+
+    def test_events_changelist(self, admin_client, check, event):
+        event.received_at = tz_now()
+        event.save()
+        url = reverse("admin:onfido_event_changelist")
+        query = {"onfido_id": check.onfido_id, "resource_type": "check"}
+        response = admin_client.get(url, query)
+        assert response.status_code == 200
+        assert list(response.context["cl"].result_list) == [event]
 
 
 class TestRawMixin:
@@ -46,13 +150,67 @@ class TestRawMixin:
         obj = Applicant(raw={"foo": "bar"})
         html = mixin._raw(obj)
         assert (
-            html == '<code>{<br>&nbsp;&nbsp;&nbsp;&nbsp;"foo":&nbsp;"bar"<br>}</code>'
+            html == "<code>{<br>&nbsp;&nbsp;&nbsp;&nbsp;&quot;foo&quot;:"
+            "&nbsp;&quot;bar&quot;<br>}</code>"
         )
 
         # test with Decimal (stdlib json won't work) and unicode
         obj = Applicant(raw={"foo": Decimal(1.0), "bar": "åß∂ƒ©˙∆"})
         html = mixin._raw(obj)
 
+    @mock.patch("onfido.admin.ADMIN_RAW_PREVIEW_LENGTH", 10)
+    def test__raw__truncated(self):
+        mixin = RawMixin()
+        obj = Applicant(raw={"foo": "bar"})
+        html = mixin._raw(obj)
+        assert html == (
+            "<code>{<br>&nbsp;&nbsp;&nbsp;&nbsp;&quot;foo</code>"
+            "<p>&hellip; (10 more characters)</p>"
+        )
+
+    def test__raw__escaped(self):
+        mixin = RawMixin()
+        obj = Applicant(raw={"name": "<script>alert(1)</script>"})
+        html = mixin._raw(obj)
+        assert "<script>" not in html
+        assert "&lt;script&gt;alert(1)&lt;/script&gt;" in html
+
+    @pytest.mark.django_db
+    @pytest.mark.usefixtures("clear_cache")
+    @mock.patch("onfido.admin.ADMIN_RAW_PREVIEW_LENGTH", 10)
+    def test__raw__cached(self, check):
+        mixin = admin.site._registry[Check]
+        html = mixin._raw(check)
+        url = reverse("admin:onfido_check_raw", args=[check.pk])
+        assert f'<a href="{url}">' in html
+        with mock.patch("onfido.admin._pretty") as mock_pretty:
+            assert mixin._raw(check) == html
+            mock_pretty.assert_not_called()
+        # saving the object invalidates the cached html, even though
+        # mark_as_expired doesn't change updated_at
+        updated_at = check.updated_at
+        check.mark_as_expired().save()
+        assert check.updated_at == updated_at
+        assert mixin._raw(check) == "<code>null</code>"
+        # the key doesn't depend on raw, so it is cheap to build
+        with mock.patch("onfido.admin.json.dumps") as mock_dumps:
+            assert mixin._raw(check) == "<code>null</code>"
+            mock_dumps.assert_not_called()
+
+    @pytest.mark.django_db
+    @pytest.mark.usefixtures("clear_cache")
+    def test_raw_view(self, admin_client, client, check):
+        url = reverse("admin:onfido_check_raw", args=[check.pk])
+        response = admin_client.get(url)
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/json"
+        assert json.loads(response.content) == check.raw
+        assert response.content.decode() == _pretty(check.raw)
+        # requires an admin login
+        assert client.get(url).status_code == 302
+        url = reverse("admin:onfido_check_raw", args=[0])
+        assert admin_client.get(url).status_code == 404
+
 
 class TestUserMixin:
     def test__user(self):
@@ -65,3 +223,23 @@ class TestUserMixin:
         assertUser("fred", "flintstone", "Fred Flintstone")
         assertUser("", "", "")
         assertUser("fredå", "flintstone", "Fredå Flintstone")
+
+
+@pytest.mark.django_db
+class TestOutboxMessageAdmin:
+    def test_changelist(self, admin_client, check):
+        OutboxMessage.objects.enqueue(check, "on_completion")
+        abandoned = OutboxMessage.objects.enqueue(check, "on_status_change")
+        abandoned.attempts = 10
+        abandoned.save()
+        url = reverse("admin:onfido_outboxmessage_changelist")
+        response = admin_client.get(url, {"state": "abandoned"})
+        assert list(response.context["cl"].result_list) == [abandoned]
+
+    def test_retry(self, admin_client, check):
+        message = OutboxMessage.objects.enqueue(check, "on_completion")
+        OutboxMessage.objects.update(attempts=10)
+        url = reverse("admin:onfido_outboxmessage_changelist")
+        admin_client.post(url, {"action": "retry", "_selected_action": [message.pk]})
+        message.refresh_from_db()
+        assert message.attempts == 0
@@ -1,8 +1,26 @@
+import io
+import shutil
+import tempfile
+from email.parser import BytesParser
 from unittest import mock
 
+import requests
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
 from django.test import TestCase
 
-from onfido.api import ApiError, _headers, _respond, _url, get, post
+from onfido.api import (
+    CHUNK_SIZE,
+    ApiError,
+    MultipartStream,
+    _headers,
+    _respond,
+    _url,
+    download,
+    get,
+    post,
+    upload,
+)
 
 
 class ApiTests(TestCase):
@@ -47,3 +65,104 @@ class ApiTests(TestCase):
         mock_post.return_value = response
         self.assertEqual(post("/", data), response.json.return_value)
         mock_post.assert_called_once_with(_url("/"), headers=headers, json=data)
+
+
+class MultipartStreamTests(TestCase):
+    """onfido.api.MultipartStream tests."""
+
+    def parse(self, stream):
+        body = b"".join(stream)
+        self.assertEqual(len(body), len(stream))
+        header = f"Content-Type: {stream.content_type}\r\n\r\n".encode()
+        message = BytesParser().parsebytes(header + body)
+        return {
+            part.get_param("name", header="content-disposition"): part
+            for part in message.get_payload()
+        }
+
+    def test_body(self):
+        file = ContentFile(b"\x00\x01image", name="path/to/front.jpg")
+        stream = MultipartStream({"type": "passport", "flag": True}, "file", file)
+        parts = self.parse(stream)
+        self.assertEqual(parts["type"].get_payload(), "passport")
+        self.assertEqual(parts["flag"].get_payload(), "true")
+        self.assertEqual(parts["file"].get_filename(), "front.jpg")
+        self.assertEqual(parts["file"].get_content_type(), "image/jpeg")
+        self.assertEqual(parts["file"].get_payload(decode=True), b"\x00\x01image")
+
+    def test_chunks(self):
+        """Test that the file is streamed in chunks, not read whole."""
+        file = ContentFile(b"x" * (CHUNK_SIZE * 3 + 1), name="big.png")
+        stream = MultipartStream({}, "file", file)
+        chunks = list(stream)
+        self.assertEqual(len(chunks), 6)  # head, 4 file chunks, tail
+        self.assertTrue(all(len(c) <= CHUNK_SIZE for c in chunks))
+        self.assertEqual(sum(len(c) for c in chunks), len(stream))
+
+    @mock.patch("requests.post")
+    def test_upload(self, mock_post):
+        response = mock.Mock(status_code=201)
+        mock_post.return_value = response
+        file = ContentFile(b"image", name="selfie.png")
+        data = {"applicant_id": "123"}
+        self.assertEqual(upload("live_photos", data, file), response.json.return_value)
+        kwargs = mock_post.call_args.kwargs
+        body = kwargs["data"]
+        self.assertIsInstance(body, MultipartStream)
+        self.assertEqual(kwargs["headers"]["Content-Type"], body.content_type)
+        self.assertEqual(mock_post.call_args.args, (_url("live_photos"),))
+
+    def test_prepared_request(self):
+        """Test that requests streams the body, with a Content-Length."""
+        file = ContentFile(b"image", name="selfie.png")
+        body = MultipartStream({"applicant_id": "123"}, "file", file)
+        prepared = requests.Request("POST", _url("live_photos"), data=body).prepare()
+        self.assertIs(prepared.body, body)
+        self.assertEqual(prepared.headers["Content-Length"], str(len(body)))
+        self.assertNotIn("Transfer-Encoding", prepared.headers)
+
+
+def binary_response(content, status_code=200, content_type="application/pdf"):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers["Content-Type"] = content_type
+    response.headers["Content-Length"] = str(len(content))
+    response.raw = io.BytesIO(content)
+    return response
+
+
+class DownloadTests(TestCase):
+    """onfido.api.download tests."""
+
+    def setUp(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        self.storage = mock.Mock(wraps=FileSystemStorage(location=location))
+
+    @mock.patch("requests.get")
+    def test_download(self, mock_get):
+        content = b"%PDF" + b"x" * CHUNK_SIZE * 2
+        mock_get.return_value = binary_response(content)
+        name = download("checks/123/download", self.storage, "archive/123")
+        self.assertEqual(name, "archive/123.pdf")
+        self.assertEqual(mock_get.call_args.kwargs["stream"], True)
+        with self.storage.open(name) as f:
+            self.assertEqual(f.read(), content)
+        # the response was passed through to the storage in chunks
+        file = self.storage.save.call_args.args[1]
+        self.assertEqual(file.size, len(content))
+        self.assertTrue(file.multiple_chunks())
+
+    @mock.patch("requests.get")
+    def test_download__extension(self, mock_get):
+        mock_get.return_value = binary_response(b"image", content_type="image/png")
+        name = download("documents/123/download", self.storage, "123.jpg")
+        self.assertEqual(name, "123.jpg")
+
+    @mock.patch("requests.get")
+    def test_download__error(self, mock_get):
+        error = b'{"error": {"message": "Not found", "type": "resource_not_found"}}'
+        mock_get.return_value = binary_response(error, 404, "application/json")
+        with self.assertRaises(ApiError):
+            download("checks/123/download", self.storage, "123")
+        self.storage.save.assert_not_called()
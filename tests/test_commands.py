@@ -0,0 +1,359 @@
+import copy
+import datetime
+import gzip
+import json
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils.timezone import now as tz_now
+
+from onfido.decorators import WebhookKeys
+from onfido.management.commands.onfido_webhook_loadtest import percentile
+from onfido.models import Applicant, Check, Event, OutboxMessage, Report
+from onfido.signals import on_completion
+
+from .conftest import (
+    APPLICANT_ID,
+    CHECK_ID,
+    DOCUMENT_ID,
+    TEST_APPLICANT,
+    TEST_CHECK,
+    TEST_EVENT,
+    TEST_REPORT_IDENTITY_ENHANCED,
+)
+
+
+def fake_api(href):
+    """Return canned list responses for the onfido_import command."""
+    if href.startswith("applicants"):
+        return {"applicants": [copy.deepcopy(TEST_APPLICANT)]}
+    if href.startswith("checks"):
+        return {"checks": [copy.deepcopy(TEST_CHECK)]}
+    if href.startswith("reports"):
+        return {"reports": [copy.deepcopy(TEST_REPORT_IDENTITY_ENHANCED)]}
+    raise ValueError(href)
+
+
+@pytest.mark.django_db
+class TestImportCommand:
+    @mock.patch("onfido.management.commands.onfido_import.resolve_applicant_user")
+    @mock.patch("onfido.management.commands.onfido_import.get", side_effect=fake_api)
+    def test_import(self, mock_get, mock_resolve, user):
+        mock_resolve.return_value = user
+        out = StringIO()
+        call_command("onfido_import", per_page=10, stdout=out)
+        applicant = Applicant.objects.get()
+        assert applicant.onfido_id == APPLICANT_ID
+        assert applicant.user == user
+        # scrubber has been applied
+        assert "first_name" not in applicant.raw
+        check = Check.objects.get()
+        assert check.onfido_id == CHECK_ID
+        assert check.applicant == applicant
+        report = Report.objects.get()
+        assert report.onfido_check == check
+        assert "breakdown" not in report.raw
+        assert "Imported 1 applicants, 1 checks and 1 reports" in out.getvalue()
+        # the resolver is passed the unscrubbed data
+        assert mock_resolve.call_args[0][0]["first_name"] == "Jane"
+
+    @pytest.mark.usefixtures("clear_cache")
+    @mock.patch("onfido.management.commands.onfido_import.resolve_applicant_user")
+    @mock.patch("onfido.management.commands.onfido_import.get", side_effect=fake_api)
+    def test_import__verification_status(self, mock_get, mock_resolve, user):
+        mock_resolve.return_value = user
+        # cached before the import
+        assert Check.objects.verification_status(user).check_id is None
+        call_command("onfido_import", stdout=StringIO())
+        assert (
+            Check.objects.verification_status(user).check_id == Check.objects.get().id
+        )
+
+    @mock.patch("onfido.management.commands.onfido_import.resolve_applicant_user")
+    @mock.patch("onfido.management.commands.onfido_import.get", side_effect=fake_api)
+    def test_import__existing(self, mock_get, mock_resolve, check):
+        out = StringIO()
+        call_command("onfido_import", stdout=out)
+        mock_resolve.assert_not_called()
+        assert Applicant.objects.count() == 1
+        assert Check.objects.count() == 1
+        # missing reports are backfilled for existing checks
+        report = Report.objects.get()
+        assert report.onfido_check == check
+        assert "Imported 0 applicants, 0 checks and 1 reports" in out.getvalue()
+        # nothing is missing on a second run
+        out = StringIO()
+        call_command("onfido_import", stdout=out)
+        assert Report.objects.count() == 1
+        assert "Imported 0 applicants, 0 checks and 0 reports" in out.getvalue()
+
+    @mock.patch("onfido.management.commands.onfido_import.resolve_applicant_user")
+    @mock.patch("onfido.management.commands.onfido_import.get", side_effect=fake_api)
+    def test_import__conflict(self, mock_get, mock_resolve, user):
+        """Test that rows ignored by bulk_create are not counted."""
+
+        def resolve(raw):
+            # the applicant is created by something else during the import
+            Applicant.objects.create_applicant(user, copy.deepcopy(TEST_APPLICANT))
+            return user
+
+        mock_resolve.side_effect = resolve
+        out = StringIO()
+        call_command("onfido_import", applicants_only=True, stdout=out)
+        assert Applicant.objects.count() == 1
+        assert "Imported 0 applicants" in out.getvalue()
+
+    @mock.patch("onfido.management.commands.onfido_import.resolve_applicant_user")
+    @mock.patch("onfido.management.commands.onfido_import.get", side_effect=fake_api)
+    def test_import__unresolved(self, mock_get, mock_resolve):
+        mock_resolve.return_value = None
+        out = StringIO()
+        call_command("onfido_import", applicants_only=True, stdout=out)
+        assert Applicant.objects.count() == 0
+        assert "skipped 1 unresolved applicants" in out.getvalue()
+
+    @mock.patch("onfido.management.commands.onfido_import.get")
+    def test_import__paging(self, mock_get):
+        mock_get.side_effect = [
+            {"applicants": []},
+        ]
+        call_command("onfido_import", per_page=1, stdout=StringIO())
+        mock_get.assert_called_once_with("applicants?page=1&per_page=1")
+
+
+@pytest.mark.django_db
+class TestArchiveCommand:
+    @mock.patch("onfido.models.check.download")
+    @mock.patch("onfido.models.report.download")
+    @mock.patch("onfido.management.commands.onfido_archive.default_storage")
+    def test_archive(
+        self,
+        mock_storage,
+        mock_report_download,
+        mock_check_download,
+        check,
+        document_report,
+    ):
+        mock_storage.exists.return_value = False
+        mock_storage.listdir.return_value = ([], [])
+        out = StringIO()
+        call_command("onfido_archive", documents=True, workers=2, rate=0, stdout=out)
+        mock_report_download.assert_called_once_with(
+            f"documents/{DOCUMENT_ID}/download",
+            mock_storage,
+            f"onfido/{check.onfido_id}/documents/{DOCUMENT_ID}",
+        )
+        # the PDF is downloaded last, as it marks the check as archived
+        mock_check_download.assert_called_once_with(
+            f"checks/{check.onfido_id}/download",
+            mock_storage,
+            f"onfido/{check.onfido_id}/check.pdf",
+        )
+        assert "Archived 1 checks (2 files)" in out.getvalue()
+
+    @mock.patch("onfido.models.check.download")
+    @mock.patch("onfido.models.report.download")
+    @mock.patch("onfido.management.commands.onfido_archive.default_storage")
+    def test_archive__existing_documents(
+        self,
+        mock_storage,
+        mock_report_download,
+        mock_check_download,
+        check,
+        document_report,
+    ):
+        # an earlier run downloaded the documents, but not the PDF
+        mock_storage.exists.return_value = False
+        mock_storage.listdir.return_value = ([], [f"{DOCUMENT_ID}.jpg"])
+        out = StringIO()
+        call_command("onfido_archive", documents=True, stdout=out)
+        mock_report_download.assert_not_called()
+        mock_check_download.assert_called_once()
+        assert "Archived 1 checks (1 files)" in out.getvalue()
+
+    @mock.patch("onfido.models.check.download")
+    @mock.patch("onfido.management.commands.onfido_archive.default_storage")
+    def test_archive__skipped(self, mock_storage, mock_download, check):
+        mock_storage.exists.return_value = True
+        out = StringIO()
+        call_command("onfido_archive", stdout=out)
+        mock_download.assert_not_called()
+        assert "skipped 1 already archived" in out.getvalue()
+
+    @mock.patch("onfido.models.check.download")
+    @mock.patch("onfido.management.commands.onfido_archive.default_storage")
+    def test_archive__filter(self, mock_storage, mock_download, check):
+        mock_storage.exists.return_value = False
+        out = StringIO()
+        call_command("onfido_archive", filter=["complete"], stdout=out)
+        mock_download.assert_not_called()
+        assert "Archived 0 checks" in out.getvalue()
+
+    @mock.patch("onfido.models.check.download")
+    @mock.patch("onfido.management.commands.onfido_archive.default_storage")
+    def test_archive__error(self, mock_storage, mock_download, check):
+        mock_storage.exists.return_value = False
+        mock_download.side_effect = ConnectionError
+        out, err = StringIO(), StringIO()
+        call_command("onfido_archive", stdout=out, stderr=err)
+        assert f"Error archiving check {check.onfido_id}" in err.getvalue()
+        assert "1 failed" in out.getvalue()
+
+    def test_archive__invalid(self):
+        with pytest.raises(CommandError):
+            call_command("onfido_archive", workers=0)
+
+
+@pytest.mark.django_db
+class TestDispatchSignalsCommand:
+    def test_dispatch(self, check):
+        OutboxMessage.objects.enqueue(check, "on_completion")
+        out = StringIO()
+        call_command("onfido_dispatch_signals", stdout=out)
+        assert OutboxMessage.objects.count() == 0
+        assert "Delivered 1 signals (0 failed, 0 abandoned)" in out.getvalue()
+
+    def test_dispatch__failing_receiver(self, check):
+        """Test that a failing batch is not immediately retried."""
+
+        def receiver(**kwargs):
+            raise Exception("email server down")
+
+        for _ in range(3):
+            OutboxMessage.objects.enqueue(check, "on_completion")
+        on_completion.connect(receiver)
+        try:
+            call_command("onfido_dispatch_signals", batch_size=3, stdout=StringIO())
+        finally:
+            on_completion.disconnect(receiver)
+        assert list(OutboxMessage.objects.values_list("attempts", flat=True)) == [
+            1,
+            1,
+            1,
+        ]
+
+    def test_dispatch__abandoned(self, check):
+        def receiver(**kwargs):
+            raise Exception("email server down")
+
+        OutboxMessage.objects.enqueue(check, "on_completion")
+        OutboxMessage.objects.update(attempts=9)
+        err = StringIO()
+        on_completion.connect(receiver)
+        try:
+            call_command(
+                "onfido_dispatch_signals",
+                max_attempts=10,
+                stdout=StringIO(),
+                stderr=err,
+            )
+        finally:
+            on_completion.disconnect(receiver)
+        assert "1 signals have failed 10 times" in err.getvalue()
+
+    def test_dispatch__empty(self):
+        out = StringIO()
+        call_command("onfido_dispatch_signals", stdout=out)
+        assert out.getvalue() == ""
+
+
+@pytest.mark.django_db
+class TestPruneEventsCommand:
+    def create_events(self, check, days_ago):
+        received_at = tz_now() - datetime.timedelta(days=days_ago)
+        for _ in range(3):
+            event = Event(received_at=received_at).parse(copy.deepcopy(TEST_EVENT))
+            event.save()
+
+    def test_prune(self, check):
+        self.create_events(check, days_ago=40)
+        self.create_events(check, days_ago=10)
+        out = StringIO()
+        call_command("onfido_prune_events", days=30, batch_size=2, stdout=out)
+        assert Event.objects.count() == 3
+        assert "Pruned 3 events" in out.getvalue()
+
+    def test_prune__dry_run(self, check):
+        self.create_events(check, days_ago=40)
+        out = StringIO()
+        call_command("onfido_prune_events", days=30, dry_run=True, stdout=out)
+        assert Event.objects.count() == 3
+        assert "3 events would be pruned" in out.getvalue()
+
+    def test_prune__empty(self):
+        out = StringIO()
+        call_command("onfido_prune_events", days=30, stdout=out)
+        assert "No events to prune" in out.getvalue()
+
+    def test_prune__archive(self, check, tmp_path):
+        self.create_events(check, days_ago=40)
+        path = tmp_path / "events.ndjson.gz"
+        call_command(
+            "onfido_prune_events", days=30, archive=str(path), stdout=StringIO()
+        )
+        assert Event.objects.count() == 0
+        with gzip.open(path, "rt") as f:
+            records = [json.loads(line) for line in f]
+        assert len(records) == 3
+        assert records[0]["raw"] == TEST_EVENT
+        assert records[0]["action"] == TEST_EVENT["payload"]["action"]
+
+    def test_prune__invalid(self):
+        with pytest.raises(CommandError):
+            call_command("onfido_prune_events", days=30, batch_size=0)
+
+
+@pytest.mark.django_db
+class TestWebhookLoadtestCommand:
+    def test_percentile(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile([], 50) == 0
+
+    @mock.patch("onfido.decorators.webhook_keys", WebhookKeys(lambda: [b"secret"]))
+    @mock.patch("onfido.decorators.TEST_MODE", False)
+    @mock.patch("onfido.models.base.get")
+    def test_loadtest(self, mock_get, check):
+        mock_get.side_effect = lambda href: copy.deepcopy(TEST_CHECK)
+        out = StringIO()
+        call_command(
+            "onfido_webhook_loadtest",
+            rate=1000,
+            requests=5,
+            token="secret",
+            stdout=out,
+        )
+        assert mock_get.call_count == 5
+        assert "Sent 5 requests" in out.getvalue()
+        assert "p95" in out.getvalue()
+        assert "Errors: 0" in out.getvalue()
+
+    @mock.patch("onfido.decorators.webhook_keys", WebhookKeys(lambda: [b"other"]))
+    @mock.patch("onfido.decorators.TEST_MODE", False)
+    def test_loadtest__bad_signature(self, check):
+        out = StringIO()
+        call_command(
+            "onfido_webhook_loadtest", rate=1000, requests=2, token="secret", stdout=out
+        )
+        assert "Errors: 2" in out.getvalue()
+
+    @pytest.mark.parametrize("rate", [0, -1])
+    def test_loadtest__invalid_rate(self, check, rate):
+        with pytest.raises(CommandError):
+            call_command("onfido_webhook_loadtest", rate=rate, token="secret")
+
+    def test_loadtest__no_objects(self):
+        with pytest.raises(CommandError):
+            call_command("onfido_webhook_loadtest", token="secret")
+
+    @mock.patch(
+        "onfido.management.commands.onfido_webhook_loadtest.load_webhook_tokens",
+        lambda: [],
+    )
+    def test_loadtest__no_token(self, check):
+        with pytest.raises(CommandError):
+            call_command("onfido_webhook_loadtest", token=None)
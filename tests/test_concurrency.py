@@ -0,0 +1,40 @@
+import time
+
+from onfido.concurrency import RateLimiter, map_concurrently
+
+
+def _double(value):
+    if value < 0:
+        raise ValueError(value)
+    return value * 2
+
+
+class TestRateLimiter:
+    def test_wait(self):
+        limiter = RateLimiter(rate=100)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.wait()
+        # the first call is immediate, the following two are 10ms apart
+        assert time.monotonic() - start >= 0.02
+
+    def test_no_limit(self):
+        limiter = RateLimiter()
+        limiter.wait()
+        assert limiter.next_at == 0
+
+
+class TestMapConcurrently:
+    def test_sequential(self):
+        results = list(map_concurrently(_double, [1, -1, 2]))
+        assert [(item, result) for item, result, _ in results] == [
+            (1, 2),
+            (-1, None),
+            (2, 4),
+        ]
+        assert isinstance(results[1][2], ValueError)
+
+    def test_concurrent(self):
+        results = list(map_concurrently(_double, range(-1, 10), max_workers=4))
+        assert sorted(r for _, r, e in results if not e) == [i * 2 for i in range(10)]
+        assert [i for i, _, e in results if e] == [-1]
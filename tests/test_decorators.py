@@ -4,7 +4,14 @@ from django.core.exceptions import ImproperlyConfigured
 from django.http import HttpResponse, HttpResponseForbidden
 from django.test import RequestFactory, TestCase
 
-from onfido.decorators import _hmac, _match, verify_signature
+from onfido.decorators import (
+    WebhookKeys,
+    _hmac,
+    _match,
+    reload_webhook_keys,
+    token_id,
+    verify_signature,
+)
 
 # taken from a real requestbin webhook callback
 TEST_WEBHOOK_TOKEN = b"ileDMrEn29YPQqZBZi8HJ-e33nqXMrtx"
@@ -49,22 +56,76 @@ class DecoratorTests(TestCase):
 
         def match(token, body):
             request = self.get_request(body)
-            return _match(token, request)
+            with mock.patch(
+                "onfido.decorators.webhook_keys", WebhookKeys(lambda: [token])
+            ):
+                return _match(request)
 
-        self.assertTrue(match(TEST_WEBHOOK_TOKEN, TEST_REQUEST_BODY))
-        self.assertFalse(match("foo", TEST_REQUEST_BODY))
-        self.assertFalse(match(TEST_WEBHOOK_TOKEN, "bar"))
+        self.assertEqual(
+            match(TEST_WEBHOOK_TOKEN, TEST_REQUEST_BODY), token_id(TEST_WEBHOOK_TOKEN)
+        )
+        self.assertIsNone(match(b"foo", TEST_REQUEST_BODY))
+        self.assertIsNone(match(TEST_WEBHOOK_TOKEN, "bar"))
 
         # test with a good request, but various HMAC error
-        with mock.patch("onfido.decorators._hmac") as mock_hmac:
-            mock_hmac.side_effect = KeyError()
-            self.assertFalse(match(TEST_WEBHOOK_TOKEN, TEST_REQUEST_BODY))
-            mock_hmac.side_effect = Exception("We are f-secure")
-            self.assertFalse(match(TEST_WEBHOOK_TOKEN, TEST_REQUEST_BODY))
+        with mock.patch.object(WebhookKeys, "match") as mock_match:
+            mock_match.side_effect = KeyError()
+            self.assertIsNone(match(TEST_WEBHOOK_TOKEN, TEST_REQUEST_BODY))
+            mock_match.side_effect = Exception("We are f-secure")
+            self.assertIsNone(match(TEST_WEBHOOK_TOKEN, TEST_REQUEST_BODY))
 
         # test bad request (missing the X-Signature header)
         request = self.get_request(signature=None)
-        self.assertFalse(_match(TEST_WEBHOOK_TOKEN, request))
+        self.assertIsNone(_match(request))
+
+    def test_webhook_keys__match(self):
+        """Test matching against multiple tokens."""
+        keys = WebhookKeys(lambda: [b"foo", TEST_WEBHOOK_TOKEN, b"bar"])
+        self.assertEqual(
+            keys.match(TEST_REQUEST_BODY, TEST_REQUEST_SIGNATURE),
+            token_id(TEST_WEBHOOK_TOKEN),
+        )
+        # the precomputed HMAC objects are reused
+        self.assertEqual(
+            keys.match(TEST_REQUEST_BODY, TEST_REQUEST_SIGNATURE),
+            token_id(TEST_WEBHOOK_TOKEN),
+        )
+        self.assertIsNone(keys.match(TEST_REQUEST_BODY, "foo"))
+
+    def test_webhook_keys__reload(self):
+        """Test that rotated tokens are picked up without a restart."""
+        loader = mock.Mock(return_value=[b"old"])
+        keys = WebhookKeys(loader, ttl=60)
+        self.assertEqual(len(keys.get()), 1)
+        self.assertEqual(len(keys.get()), 1)
+        loader.assert_called_once()
+
+        # a mismatch forces a reload, but no more than once every few seconds
+        loader.return_value = [b"old", TEST_WEBHOOK_TOKEN]
+        self.assertIsNone(keys.match(TEST_REQUEST_BODY, TEST_REQUEST_SIGNATURE))
+        with mock.patch("onfido.decorators.MIN_RELOAD_INTERVAL", -1):
+            self.assertEqual(
+                keys.match(TEST_REQUEST_BODY, TEST_REQUEST_SIGNATURE),
+                token_id(TEST_WEBHOOK_TOKEN),
+            )
+
+        # expired tokens are reloaded, and a failed load keeps the old tokens
+        loader.side_effect = Exception()
+        keys.expire()
+        self.assertEqual(len(keys.get()), 2)
+
+    def test_webhook_keys__settings(self):
+        """Test the default loader, and reloading on setting_changed."""
+        keys = WebhookKeys()
+        with mock.patch("onfido.decorators.webhook_keys", keys):
+            with self.settings(
+                ONFIDO_WEBHOOK_TOKEN="foo", ONFIDO_WEBHOOK_TOKENS=["bar", "foo"]
+            ):
+                self.assertEqual(
+                    [k for k, _ in keys.get()], [token_id(b"foo"), token_id(b"bar")]
+                )
+                reload_webhook_keys(setting="ONFIDO_WEBHOOK_TOKENS")
+                self.assertIsNone(keys.loaded_at)
 
     @mock.patch("onfido.decorators._match")
     def test_verify_signature(self, mock_match):
@@ -80,23 +141,25 @@ class DecoratorTests(TestCase):
         # import module as we want to manipulate the WEBHOOK_TOKEN
         from onfido import decorators
 
+        self.addCleanup(setattr, decorators, "webhook_keys", decorators.webhook_keys)
+
         # in TEST_MODE we return immediately
         decorators.TEST_MODE = True
-        decorators.WEBHOOK_TOKEN = None
+        decorators.webhook_keys = WebhookKeys(lambda: [])
         mock_match.reset_mock()
         request_function(request)
         mock_match.assert_not_called()
 
         # without a WEBHOOK_TOKEN we should get an error
         decorators.TEST_MODE = False
-        decorators.WEBHOOK_TOKEN = None
         self.assertRaises(ImproperlyConfigured, request_function, request)
         mock_match.assert_not_called()
 
-        # mock out _hmac so we can force a pass / fail
+        # mock out _match so we can force a pass / fail
         decorators.TEST_MODE = False
-        decorators.WEBHOOK_TOKEN = TEST_WEBHOOK_TOKEN
-        mock_match.return_value = True
+        decorators.webhook_keys = WebhookKeys(lambda: [TEST_WEBHOOK_TOKEN])
+        mock_match.return_value = token_id(TEST_WEBHOOK_TOKEN)
         self.assertIsInstance(request_function(request), HttpResponse)
-        mock_match.return_value = False
+        self.assertEqual(request.onfido_webhook_token_id, token_id(TEST_WEBHOOK_TOKEN))
+        mock_match.return_value = None
         self.assertIsInstance(request_function(request), HttpResponseForbidden)
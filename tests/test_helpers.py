@@ -3,13 +3,20 @@ from unittest import mock
 
 import pytest
 from dateutil.parser import parse as date_parse
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
 
 from onfido.helpers import (  # import from helpers to deter possible dependency issues
     Applicant,
+    ApplicantResult,
     Check,
     Report,
     create_applicant,
+    create_applicants,
     create_check,
+    upload_document,
+    upload_documents,
+    upload_live_photo,
 )
 
 from .conftest import (
@@ -19,6 +26,8 @@ from .conftest import (
     TEST_REPORT_IDENTITY_ENHANCED,
 )
 
+User = get_user_model()
+
 
 @pytest.mark.django_db
 class TestHelperFunctions:
@@ -105,3 +114,103 @@ class TestHelperFunctions:
                 "foo": "bar",
             },
         )
+
+
+@pytest.mark.django_db
+class TestUploadHelpers:
+    @mock.patch("onfido.helpers.upload")
+    def test_upload_document(self, mock_upload, applicant):
+        file = ContentFile(b"image", name="front.jpg")
+        response = upload_document(
+            applicant, file, "driving_licence", "front", issuing_country="GBR"
+        )
+        assert response == mock_upload.return_value
+        mock_upload.assert_called_once_with(
+            "documents",
+            {
+                "applicant_id": applicant.onfido_id,
+                "type": "driving_licence",
+                "side": "front",
+                "issuing_country": "GBR",
+            },
+            file,
+        )
+
+    @mock.patch("onfido.helpers.upload")
+    def test_upload_documents(self, mock_upload, applicant):
+        mock_upload.side_effect = lambda href, data, file: {"side": data["side"]}
+        files = {
+            "front": ContentFile(b"front", name="front.jpg"),
+            "back": ContentFile(b"back", name="back.jpg"),
+        }
+        responses = upload_documents(applicant, files, "driving_licence")
+        assert responses == {"front": {"side": "front"}, "back": {"side": "back"}}
+        assert mock_upload.call_count == 2
+
+    @mock.patch("onfido.helpers.upload")
+    def test_upload_documents__error(self, mock_upload, applicant):
+        mock_upload.side_effect = [{}, ValueError("upload failed")]
+        files = {
+            "front": ContentFile(b"front", name="front.jpg"),
+            "back": ContentFile(b"back", name="back.jpg"),
+        }
+        with pytest.raises(ValueError):
+            upload_documents(applicant, files, "driving_licence")
+
+    @mock.patch("onfido.helpers.upload")
+    def test_upload_live_photo(self, mock_upload, applicant):
+        file = ContentFile(b"image", name="selfie.png")
+        upload_live_photo(applicant, file, advanced_validation=False)
+        mock_upload.assert_called_once_with(
+            "live_photos",
+            {"applicant_id": applicant.onfido_id, "advanced_validation": False},
+            file,
+        )
+
+
+@pytest.mark.django_db
+class TestCreateApplicants:
+    def users(self, count):
+        return [
+            User.objects.create_user(f"user{i}", first_name=f"user{i}")
+            for i in range(count)
+        ]
+
+    def fake_post(self, href, data):
+        if data["first_name"] == "user1":
+            raise ConnectionError("API unavailable")
+        return dict(deepcopy(TEST_APPLICANT), id=f"id-{data['first_name']}")
+
+    @mock.patch("onfido.helpers.post")
+    def test_create_applicants(self, mock_post):
+        mock_post.side_effect = self.fake_post
+        users = self.users(4)
+        results = create_applicants(
+            users, max_workers=2, rate=None, batch_size=2, country="GBR"
+        )
+        assert mock_post.call_count == 4
+        assert mock_post.call_args_list[0] == mock.call(
+            "applicants",
+            {"first_name": "user0", "last_name": "", "email": "", "country": "GBR"},
+        )
+        # one result per user, in order
+        assert [r.user for r in results] == users
+        assert [r.ok for r in results] == [True, False, True, True]
+        assert isinstance(results[1].error, ConnectionError)
+        assert results[1].applicant is None
+        assert sorted(Applicant.objects.values_list("onfido_id", flat=True)) == [
+            "id-user0",
+            "id-user2",
+            "id-user3",
+        ]
+        applicant = Applicant.objects.get(onfido_id="id-user0")
+        assert applicant.user == users[0]
+        assert results[0] == ApplicantResult(users[0], results[0].applicant, None)
+
+    @mock.patch("onfido.helpers.post")
+    def test_create_applicants__db_error(self, mock_post):
+        mock_post.side_effect = lambda href, data: dict(deepcopy(TEST_APPLICANT))
+        # both users get the same onfido_id, so the insert fails
+        results = create_applicants(self.users(2), rate=None)
+        assert [r.ok for r in results] == [False, False]
+        assert Applicant.objects.count() == 0
@@ -0,0 +1,45 @@
+import logging
+from unittest import mock
+
+import pytest
+
+from onfido.logs import LazyPayload, log_payload
+
+logger = logging.getLogger("onfido.tests")
+
+
+class TestLazyPayload:
+    @pytest.mark.parametrize(
+        "payload,text",
+        [
+            (b"abc", "abc"),
+            (b"abcdef", "abcd... (6 chars)"),
+            ([1], "[1]"),
+            ({"abc": 1}, '{"ab... (10 chars)'),
+            ("abcdef", "abcd... (6 chars)"),
+        ],
+    )
+    def test_str(self, payload, text):
+        assert str(LazyPayload(payload, max_length=4)) == text
+
+
+class TestLogPayload:
+    @mock.patch("onfido.logs.LOG_PAYLOADS", True)
+    def test_log_payload(self, caplog):
+        with caplog.at_level(logging.DEBUG, logger="onfido.tests"):
+            log_payload(logger, "Request: %s: %s", "checks", payload={"a": 1})
+        assert caplog.messages == ['Request: checks: {"a": 1}']
+
+    @mock.patch("onfido.logs.LOG_PAYLOADS", False)
+    def test_log_payload__disabled(self, caplog):
+        with caplog.at_level(logging.DEBUG, logger="onfido.tests"):
+            log_payload(logger, "Request: %s", payload={"a": 1})
+        assert caplog.messages == []
+
+    @mock.patch("onfido.logs.LOG_PAYLOADS", True)
+    @mock.patch.object(LazyPayload, "__str__")
+    def test_log_payload__not_debug(self, mock_str, caplog):
+        with caplog.at_level(logging.INFO, logger="onfido.tests"):
+            log_payload(logger, "Request: %s", payload={"a": 1})
+        assert caplog.messages == []
+        mock_str.assert_not_called()
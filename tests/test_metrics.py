@@ -0,0 +1,89 @@
+from unittest import mock
+
+import pytest
+
+from onfido import metrics
+from onfido.api import _endpoint, get
+from onfido.metrics import Metrics, PrometheusMetrics, StatsdMetrics, timer
+
+
+class RecordingMetrics(Metrics):
+    def __init__(self) -> None:
+        self.timings = []
+        self.increments = []
+
+    def timing(self, name, value, **tags):
+        self.timings.append((name, tags))
+
+    def increment(self, name, value=1, **tags):
+        self.increments.append((name, value, tags))
+
+
+@pytest.fixture
+def recorder():
+    backend = RecordingMetrics()
+    with mock.patch.object(metrics, "backend", backend):
+        yield backend
+
+
+class TestTimer:
+    def test_timer(self, recorder):
+        with timer("foo", bar="baz") as tags:
+            tags["status"] = "200"
+        assert recorder.timings == [("foo", {"bar": "baz", "status": "200"})]
+
+    def test_timer_error(self, recorder):
+        with pytest.raises(ValueError):
+            with timer("foo", status="error"):
+                raise ValueError()
+        assert recorder.timings == [("foo", {"status": "error"})]
+
+
+class TestApiMetrics:
+    @pytest.mark.parametrize(
+        "href,endpoint",
+        [
+            ("applicants", "applicants"),
+            ("checks/123", "checks"),
+            ("/reports?check_id=123", "reports"),
+        ],
+    )
+    def test__endpoint(self, href, endpoint):
+        assert _endpoint(href) == endpoint
+
+    @mock.patch("requests.get")
+    def test_get(self, mock_get, recorder):
+        mock_get.return_value.status_code = 200
+        get("checks/123")
+        assert recorder.timings == [
+            ("api_request", {"method": "get", "endpoint": "checks", "status": "200"})
+        ]
+
+    @mock.patch("requests.get", side_effect=ConnectionError)
+    def test_get_error(self, mock_get, recorder):
+        with pytest.raises(ConnectionError):
+            get("checks/123")
+        assert recorder.timings[0][1]["status"] == "error"
+
+
+class TestPrometheusMetrics:
+    def test_metrics(self):
+        prometheus_client = pytest.importorskip("prometheus_client")
+        registry = prometheus_client.CollectorRegistry()
+        backend = PrometheusMetrics(registry=registry)
+        backend.timing("webhook", 0.5, resource_type="check", action="check.started")
+        backend.increment("sync_objects", 2, model="check", outcome="ok")
+        labels = {"resource_type": "check", "action": "check.started"}
+        assert registry.get_sample_value("onfido_webhook_seconds_sum", labels) == 0.5
+        labels = {"model": "check", "outcome": "ok"}
+        assert registry.get_sample_value("onfido_sync_objects_total", labels) == 2
+
+
+class TestStatsdMetrics:
+    def test_metrics(self):
+        client = mock.Mock()
+        backend = StatsdMetrics(client=client)
+        backend.timing("api_request", 0.2, method="get", endpoint="checks")
+        client.timing.assert_called_once_with("api_request.checks.get", 200)
+        backend.increment("sync_objects", model="check", outcome="error")
+        client.incr.assert_called_once_with("sync_objects.check.error", 1)
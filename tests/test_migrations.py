@@ -0,0 +1,110 @@
+import importlib
+from unittest import mock
+
+from django.db import DatabaseError, connection
+from django.db.migrations.loader import MigrationLoader
+
+migration = importlib.import_module("onfido.migrations.0022_add_admin_filter_indexes")
+
+
+def _schema_editor(vendor="postgresql", installed=False, available=True):
+    schema_editor = mock.MagicMock()
+    schema_editor.connection.vendor = vendor
+    cursor = schema_editor.connection.cursor.return_value.__enter__.return_value
+    cursor.fetchone.side_effect = [
+        (1,) if installed else None,
+        (1,) if available else None,
+    ]
+    return schema_editor
+
+
+def _sql(schema_editor):
+    return [c.args[0] for c in schema_editor.execute.call_args_list]
+
+
+@mock.patch.object(migration.transaction, "atomic")
+class TestTrigramMigration:
+    def test_create_trigram_indexes__sqlite(self, mock_atomic):
+        schema_editor = _schema_editor(vendor="sqlite")
+        migration.create_trigram_indexes(None, schema_editor)
+        schema_editor.execute.assert_not_called()
+
+    def test_create_trigram_indexes(self, mock_atomic):
+        schema_editor = _schema_editor()
+        migration.create_trigram_indexes(None, schema_editor)
+        sql = _sql(schema_editor)
+        assert sql[0] == "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+        assert sql[1] == (
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS onfido_applicant_onfido_id_trgm "
+            "ON onfido_applicant USING gin ((UPPER(onfido_id::text)) gin_trgm_ops)"
+        )
+        assert len(sql) == 5
+
+    def test_create_trigram_indexes__installed(self, mock_atomic):
+        schema_editor = _schema_editor(installed=True)
+        migration.create_trigram_indexes(None, schema_editor)
+        sql = _sql(schema_editor)
+        assert "CREATE EXTENSION IF NOT EXISTS pg_trgm" not in sql
+        assert len(sql) == 4
+
+    def test_create_trigram_indexes__unavailable(self, mock_atomic):
+        schema_editor = _schema_editor(available=False)
+        migration.create_trigram_indexes(None, schema_editor)
+        schema_editor.execute.assert_not_called()
+
+    def test_create_trigram_indexes__not_permitted(self, mock_atomic):
+        schema_editor = _schema_editor()
+        schema_editor.execute.side_effect = DatabaseError("permission denied")
+        migration.create_trigram_indexes(None, schema_editor)
+        # only the CREATE EXTENSION is attempted, in a savepoint
+        assert _sql(schema_editor) == ["CREATE EXTENSION IF NOT EXISTS pg_trgm"]
+        mock_atomic.assert_called_once_with(using=schema_editor.connection.alias)
+
+
+class TestConcurrentIndexes:
+    def states(self):
+        loader = MigrationLoader(None)
+        return (
+            loader.project_state(("onfido", "0021_add_check_user_created_index")),
+            loader.project_state(("onfido", "0022_add_admin_filter_indexes")),
+        )
+
+    def operation(self, cls, model_name):
+        return next(
+            op
+            for op in migration.Migration.operations
+            if isinstance(op, cls) and op.model_name == model_name
+        )
+
+    def test_atomic(self):
+        assert migration.Migration.atomic is False
+
+    def test_alter_field(self):
+        operation = self.operation(migration.AlterFieldConcurrently, "event")
+        assert operation.name == "action"
+        schema_editor = mock.MagicMock(connection=connection)
+        with mock.patch.object(connection, "vendor", "postgresql"):
+            operation.database_forwards("onfido", schema_editor, *self.states())
+        calls = schema_editor._create_index_sql.call_args_list
+        assert len(calls) == 2
+        assert all(c.kwargs["concurrently"] for c in calls)
+        assert calls[1].kwargs["opclasses"] == ["varchar_pattern_ops"]
+        assert schema_editor.execute.call_count == 2
+        schema_editor.alter_field.assert_not_called()
+
+    def test_alter_field__datetime(self):
+        operation = self.operation(migration.AlterFieldConcurrently, "applicant")
+        schema_editor = mock.MagicMock(connection=connection)
+        with mock.patch.object(connection, "vendor", "postgresql"):
+            operation.database_forwards("onfido", schema_editor, *self.states())
+        # no LIKE index for non-varchar columns
+        schema_editor._create_index_sql.assert_called_once()
+
+    def test_add_index(self):
+        operation = self.operation(migration.AddIndexConcurrently, "event")
+        schema_editor = mock.MagicMock()
+        schema_editor.connection.vendor = "postgresql"
+        operation.database_forwards("onfido", schema_editor, *self.states())
+        schema_editor.add_index.assert_called_once_with(
+            mock.ANY, operation.index, concurrently=True
+        )
@@ -1,10 +1,16 @@
+import base64
 import copy
+import json
+import threading
+import time
+from unittest import mock
 
 import pytest
 from dateutil.parser import parse as date_parse
 from django.contrib.auth import get_user_model
 
 from onfido.models import Applicant
+from onfido.models.applicant import _token_expiry
 from onfido.settings import scrub_applicant_data
 
 from ..conftest import APPLICANT_ID, TEST_APPLICANT
@@ -56,3 +62,74 @@ class TestApplicantModel:
             "created_at": TEST_APPLICANT["created_at"],
             "href": TEST_APPLICANT["href"],
         }
+
+
+def jwt(**claims):
+    """Return an (unsigned) JWT with the given claims."""
+    payload = base64.urlsafe_b64encode(json.dumps(claims).encode()).rstrip(b"=")
+    return f"header.{payload.decode()}.signature"
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("clear_cache")
+class TestSdkToken:
+    def test__token_expiry(self):
+        assert _token_expiry(jwt(exp=1600000000)) == 1600000000
+        assert _token_expiry(jwt(foo="bar")) is None
+        assert _token_expiry("not-a-jwt") is None
+
+    @mock.patch("onfido.models.applicant.post")
+    def test_sdk_token(self, mock_post, applicant):
+        token = jwt(exp=time.time() + 5400)
+        mock_post.return_value = {"token": token}
+        assert applicant.sdk_token(referrer="https://*.example.com/*") == token
+        mock_post.assert_called_once_with(
+            "sdk_token",
+            {
+                "applicant_id": applicant.onfido_id,
+                "referrer": "https://*.example.com/*",
+            },
+        )
+        # cached (per referrer)
+        assert applicant.sdk_token(referrer="https://*.example.com/*") == token
+        assert mock_post.call_count == 1
+        applicant.sdk_token(referrer="https://*.example.org/*")
+        assert mock_post.call_count == 2
+
+    @mock.patch("onfido.models.applicant.post")
+    def test_sdk_token__expiring(self, mock_post, applicant):
+        """Test that tokens that are about to expire are not cached."""
+        mock_post.return_value = {"token": jwt(exp=time.time() + 60)}
+        applicant.sdk_token()
+        applicant.sdk_token()
+        assert mock_post.call_count == 2
+
+    @mock.patch("onfido.models.applicant.post")
+    def test_sdk_token__single_flight(self, mock_post, applicant):
+        def slow_post(href, data):
+            time.sleep(0.2)
+            return {"token": jwt(exp=time.time() + 5400)}
+
+        mock_post.side_effect = slow_post
+        tokens = []
+        threads = [
+            threading.Thread(target=lambda: tokens.append(applicant.sdk_token()))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert mock_post.call_count == 1
+        assert len(set(tokens)) == 1 and len(tokens) == 5
+
+    @mock.patch("onfido.models.applicant.post", side_effect=ConnectionError)
+    def test_sdk_token__error(self, mock_post, applicant):
+        """Test that the lock is released if the API call fails."""
+        with pytest.raises(ConnectionError):
+            applicant.sdk_token()
+        mock_post.side_effect = None
+        mock_post.return_value = {"token": jwt(exp=time.time() + 5400)}
+        with mock.patch("onfido.models.applicant.time.sleep") as mock_sleep:
+            applicant.sdk_token()
+        mock_sleep.assert_not_called()
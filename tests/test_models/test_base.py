@@ -9,7 +9,7 @@ from django.test import TestCase
 from django.test.utils import override_settings
 
 from onfido.api import ApiError
-from onfido.models import Applicant, Check, Event
+from onfido.models import Applicant, Check, Event, OutboxMessage
 from onfido.models.base import BaseModel, BaseStatusModel
 
 
@@ -154,6 +154,69 @@ class TestBaseQuerySet:
         Applicant.objects.all().pull()
         assert mock_pull.call_count == 1
 
+    @mock.patch("onfido.signals.on_bulk_status_change.send")
+    def test_pull__bulk_status_change(self, mock_send, check):
+        def complete(obj):
+            obj.status = BaseStatusModel.Status.COMPLETE
+
+        with mock.patch.object(Check, "pull", autospec=True, side_effect=complete):
+            Check.objects.all().pull()
+        mock_send.assert_called_once_with(
+            Check, changes=[(check, "in_progress", "complete")]
+        )
+
+    @mock.patch("onfido.signals.on_bulk_status_change.send")
+    def test_pull__bulk_status_change__batches(self, mock_send, check):
+        def complete(obj):
+            obj.status = BaseStatusModel.Status.COMPLETE
+
+        Check.objects.create(
+            user=check.user, applicant=check.applicant, onfido_id="foo"
+        )
+        with mock.patch.object(Check, "pull", autospec=True, side_effect=complete):
+            Check.objects.all().pull(batch_size=1)
+        assert mock_send.call_count == 2
+
+    @mock.patch("onfido.signals.on_bulk_status_change.send")
+    @mock.patch.object(BaseModel, "pull")
+    def test_pull__bulk_status_change__unchanged(self, mock_pull, mock_send, check):
+        Check.objects.all().pull()
+        mock_send.assert_not_called()
+
+    @mock.patch("onfido.signals.on_bulk_status_change.send")
+    def test_pull__concurrent(self, mock_send, check):
+        def fetch(obj):
+            if obj.onfido_id == "error":
+                raise Exception("Something went wrong")
+            if obj.onfido_id == "expired":
+                obj.status = BaseStatusModel.Status.EXPIRED
+            else:
+                obj.result = BaseStatusModel.Result.CLEAR
+
+        for onfido_id in ("error", "expired"):
+            Check.objects.create(
+                user=check.user, applicant=check.applicant, onfido_id=onfido_id
+            )
+        with mock.patch.object(
+            Check, "fetch", autospec=True, side_effect=fetch
+        ), mock.patch.object(BaseModel, "save") as mock_save:
+            stats = Check.objects.all().pull(max_workers=3, rate=1000)
+        assert stats == {"changed": 1, "unchanged": 0, "expired": 1, "failed": 1}
+        # objects are saved in this thread
+        assert mock_save.call_count == 2
+        mock_send.assert_called_once()
+        (changes,) = mock_send.call_args.kwargs.values()
+        assert [(o.onfido_id, a, b) for o, a, b in changes] == [
+            ("expired", None, "expired")
+        ]
+
+    @mock.patch.object(BaseModel, "pull")
+    def test_pull__progress(self, mock_pull, applicant):
+        progress = mock.Mock()
+        stats = Applicant.objects.all().pull(progress=progress)
+        assert stats == {"changed": 0, "unchanged": 1, "expired": 0, "failed": 0}
+        progress.assert_called_once_with(stats)
+
 
 class BaseStatusModelTests(TestCase):
     """onfido.models.BaseStatusModel tests."""
@@ -185,15 +248,15 @@ class BaseStatusModelTests(TestCase):
 
     @mock.patch("onfido.signals.on_status_change.send")
     @mock.patch("onfido.signals.on_completion.send")
-    @mock.patch.object(BaseStatusModel, "pull")
+    @mock.patch("onfido.models.base.get")
     @mock.patch.object(BaseStatusModel, "save")
-    def test_update_status(self, mock_save, mock_pull, mock_complete, mock_update):
+    def test_update_status(self, mock_save, mock_get, mock_complete, mock_update):
         """Test the update_status method."""
         now = datetime.datetime.now()
 
         def reset():
             mock_save.reset_mock()
-            mock_pull.reset_mock()
+            mock_get.reset_mock()
             mock_complete.reset_mock()
             mock_update.reset_mock()
             event = Event(
@@ -203,9 +266,15 @@ class BaseStatusModelTests(TestCase):
                 resource_type="check",
                 completed_at=now,
             )
-            obj = BaseStatusModelInstance(status="before")
+            obj = BaseStatusModelInstance(onfido_id="foo", status="before")
             assert obj.status == "before"
             assert obj.updated_at is None
+            mock_get.side_effect = lambda href: {
+                "id": "foo",
+                "created_at": "2016-10-15T19:05:50Z",
+                "status": event.status,
+                "result": "clear",
+            }
             return event, obj
 
         # try passing in something that is not a datetime
@@ -218,8 +287,10 @@ class BaseStatusModelTests(TestCase):
         obj = obj.update_status(event)
         self.assertEqual(obj.status, event.status)
         self.assertEqual(obj.updated_at, now)
-        mock_pull.assert_called_once_with()
-        mock_save.assert_not_called()
+        # the latest JSON has been parsed (and saved)
+        self.assertEqual(obj.result, "clear")
+        mock_get.assert_called_once_with(obj.href)
+        mock_save.assert_called_once_with()
         mock_update.assert_called_once_with(
             BaseStatusModelInstance,
             instance=obj,
@@ -235,8 +306,8 @@ class BaseStatusModelTests(TestCase):
         obj = obj.update_status(event)
         self.assertEqual(obj.status, event.status)
         self.assertEqual(obj.updated_at, now)
-        mock_pull.assert_called_once_with()
-        mock_save.assert_not_called()
+        mock_get.assert_called_once_with(obj.href)
+        mock_save.assert_called_once_with()
         mock_update.assert_called_once_with(
             BaseStatusModelInstance,
             instance=obj,
@@ -246,13 +317,14 @@ class BaseStatusModelTests(TestCase):
         )
         mock_complete.assert_called_once_with(BaseStatusModelInstance, instance=obj)
 
-        # test that we can handle the API failing on pull()
+        # test that we can handle the API failing
         event, obj = reset()
-        mock_pull.side_effect = Exception("Something went wrong in the API")
+        mock_get.side_effect = Exception("Something went wrong in the API")
         obj = obj.update_status(event)
         self.assertEqual(obj.status, event.status)
         self.assertEqual(obj.updated_at, now)
-        mock_pull.assert_called_once_with()
+        self.assertEqual(obj.result, None)
+        mock_get.assert_called_once_with(obj.href)
         mock_save.assert_called_once_with()
         mock_update.assert_called_once_with(
             BaseStatusModelInstance,
@@ -263,6 +335,20 @@ class BaseStatusModelTests(TestCase):
         )
         mock_complete.assert_not_called()
 
+    @mock.patch("onfido.signals.on_status_change.send")
+    @mock.patch.object(BaseStatusModel, "save")
+    def test_update_status__fetch_before_lock(self, mock_save, mock_update):
+        """Test that the API is not called while the row is locked."""
+        calls = mock.Mock()
+        event = Event(status="after", completed_at=datetime.datetime.now())
+        obj = BaseStatusModelInstance(onfido_id="foo", status="before")
+        with mock.patch("onfido.models.base.get", calls.get), mock.patch.object(
+            BaseStatusModel, "_lock", calls.lock
+        ):
+            calls.get.side_effect = Exception("API unavailable")
+            obj.update_status(event)
+        assert [c[0] for c in calls.mock_calls] == ["get", "lock"]
+
     @mock.patch("onfido.models.base.tz_now")
     def test__override_event(self, mock_now):
         """Test the _override_event method."""
@@ -381,3 +467,70 @@ class BaseStatusModelTests(TestCase):
         obj = obj.update_status(event)
         self.assertEqual(obj.updated_at, now)
         assert obj.status == BaseStatusModel.Status.EXPIRED
+
+
+@pytest.mark.django_db
+class TestUpdateStatusOutbox:
+    @mock.patch("onfido.models.base.SIGNAL_OUTBOX", True)
+    @mock.patch("onfido.signals.on_status_change.send")
+    @mock.patch("onfido.signals.on_completion.send")
+    @mock.patch("onfido.models.base.get", side_effect=ConnectionError)
+    def test_update_status(self, mock_get, mock_complete, mock_update, check):
+        event = Event(
+            action="check.completed",
+            status=BaseStatusModel.Status.COMPLETE,
+            onfido_id=check.onfido_id,
+            resource_type="check",
+            completed_at=datetime.datetime.now(),
+        )
+        check.update_status(event)
+        mock_update.assert_not_called()
+        mock_complete.assert_not_called()
+        messages = OutboxMessage.objects.order_by("id")
+        assert [m.signal for m in messages] == ["on_status_change", "on_completion"]
+        assert messages[0].kwargs == {
+            "event": "check.completed",
+            "status_before": "in_progress",
+            "status_after": "complete",
+        }
+        assert messages[1].kwargs == {}
+
+
+@pytest.mark.django_db
+class TestUpdateStatusLocking:
+    @mock.patch("onfido.signals.on_status_change.send")
+    @mock.patch("onfido.models.base.get", side_effect=ConnectionError)
+    def test_update_status__reloads_locked_row(self, mock_get, mock_update, check):
+        completed_at = date_parse("2019-10-28T15:00:39Z")
+        # simulate a concurrent update made by another worker
+        Check.objects.filter(pk=check.pk).update(
+            status="awaiting_applicant", updated_at=completed_at
+        )
+        event = Event(
+            action="check.completed",
+            status=BaseStatusModel.Status.COMPLETE,
+            onfido_id=check.onfido_id,
+            resource_type="check",
+            completed_at=completed_at + datetime.timedelta(seconds=1),
+        )
+        check.update_status(event)
+        assert mock_update.call_args[1]["status_before"] == "awaiting_applicant"
+
+    @mock.patch("onfido.signals.on_status_change.send")
+    @mock.patch("onfido.models.base.get", side_effect=ConnectionError)
+    def test_update_status__stale_event(self, mock_get, mock_update, check):
+        completed_at = date_parse("2019-10-28T15:00:39Z")
+        Check.objects.filter(pk=check.pk).update(
+            status="complete", updated_at=completed_at
+        )
+        event = Event(
+            action="check.started",
+            status=BaseStatusModel.Status.IN_PROGRESS,
+            onfido_id=check.onfido_id,
+            resource_type="check",
+            completed_at=completed_at - datetime.timedelta(seconds=1),
+        )
+        check.update_status(event)
+        mock_update.assert_not_called()
+        check.refresh_from_db()
+        assert check.status == "complete"
@@ -1,9 +1,12 @@
 import copy
+import datetime
+from unittest import mock
 
 import pytest
 from dateutil.parser import parse as date_parse
 
-from onfido.models import Check
+from onfido.helpers import user_verification_status
+from onfido.models import Check, Event
 
 from ..conftest import APPLICANT_ID, TEST_CHECK
 
@@ -23,6 +26,22 @@ class TestCheckManager:
         assert check.result == data["result"]
         assert check.created_at == date_parse(data["created_at"])
 
+    def test_mark_as_clear(self, user, check, django_assert_num_queries):
+        """Test the bulk mark_as_clear method."""
+        other = copy.deepcopy(TEST_CHECK)
+        other.update(id="other")
+        Check.objects.create_check(applicant=check.applicant, raw=other)
+        # SELECT ... FOR UPDATE, INSERT (events), UPDATE, plus savepoints
+        with django_assert_num_queries(5) as queries:
+            assert Check.objects.order_by("-id").mark_as_clear(user) == 2
+        # the rows are locked without sorting them
+        select = next(q["sql"] for q in queries if q["sql"].startswith("SELECT"))
+        assert "ORDER BY" not in select
+        assert Check.objects.filter(result=Check.Result.CLEAR).count() == 2
+        events = Event.objects.filter(action="manual.override")
+        assert events.count() == 2
+        assert events.get(onfido_id="other").raw["payload"]["result"] == "clear"
+
 
 @pytest.mark.django_db
 class TestCheckModel:
@@ -47,3 +66,80 @@ class TestCheckModel:
         assert check.created_at == date_parse(TEST_CHECK["created_at"])
         assert check.status == "in_progress"
         assert check.result is None
+
+    @mock.patch("onfido.models.check.download")
+    def test_download_pdf(self, mock_download, check):
+        storage = mock.Mock()
+        name = check.download_pdf(storage, "archive/check")
+        assert name == mock_download.return_value
+        mock_download.assert_called_once_with(
+            f"checks/{check.onfido_id}/download", storage, "archive/check"
+        )
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("clear_cache")
+class TestVerificationStatus:
+    """onfido.helpers.user_verification_status tests."""
+
+    def test_latest_for_user(self, user, check):
+        assert Check.objects.latest_for_user(user) == check
+        older = copy.deepcopy(TEST_CHECK)
+        older.update(id="older", created_at="2019-01-01T00:00:00Z")
+        Check.objects.create_check(applicant=check.applicant, raw=older)
+        assert Check.objects.latest_for_user(user) == check
+
+    def test_no_checks(self, user, django_assert_num_queries):
+        status = user_verification_status(user)
+        assert status.check_id is None
+        assert not status.is_verified
+
+    def test_cached(self, user, check, django_assert_num_queries):
+        status = user_verification_status(user)
+        assert status.check_id == check.id
+        assert status.status == Check.Status.IN_PROGRESS
+        assert not status.is_verified
+        with django_assert_num_queries(0):
+            assert user_verification_status(user) == status
+
+    def test_update_status(self, user, check, event):
+        assert not user_verification_status(user).is_verified
+        check.result = Check.Result.CLEAR
+        check.save()
+        event.status = Check.Status.COMPLETE
+        event.completed_at += datetime.timedelta(days=1)
+        with mock.patch("onfido.models.base.get", side_effect=Exception):
+            check.update_status(event)
+        assert user_verification_status(user).is_verified
+
+    def test_mark_as_clear(self, user, check):
+        Check.objects.filter(id=check.id).update(status=Check.Status.COMPLETE)
+        check.refresh_from_db()
+        assert not user_verification_status(user).is_verified
+        check.mark_as_clear(user)
+        assert user_verification_status(user).is_verified
+
+    def test_mark_as_expired(self, user, check):
+        assert user_verification_status(user).status == Check.Status.IN_PROGRESS
+        check.mark_as_expired().save()
+        assert user_verification_status(user).status == Check.Status.EXPIRED
+
+    def test_latest_check_wins(self, user, check):
+        Check.objects.filter(id=check.id).update(
+            status=Check.Status.COMPLETE, result=Check.Result.CLEAR
+        )
+        assert user_verification_status(user).is_verified
+        # a newer check that is still in progress replaces the clear one
+        newer = copy.deepcopy(TEST_CHECK)
+        newer.update(id="newer", created_at="2020-01-01T00:00:00Z")
+        Check.objects.create_check(applicant=check.applicant, raw=newer)
+        status = user_verification_status(user)
+        assert status.status == Check.Status.IN_PROGRESS
+        assert not status.is_verified
+
+    def test_create_check(self, user, check):
+        assert user_verification_status(user).check_id == check.id
+        newer = copy.deepcopy(TEST_CHECK)
+        newer.update(id="newer", created_at="2020-01-01T00:00:00Z")
+        new_check = Check.objects.create_check(applicant=check.applicant, raw=newer)
+        assert user_verification_status(user).check_id == new_check.id
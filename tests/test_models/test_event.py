@@ -1,9 +1,13 @@
 import copy
+import json
+from unittest import mock
 
 import pytest
 from dateutil.parser import parse as date_parse
+from django.utils.timezone import now as tz_now
 
 from onfido.models import Check, Event, Report
+from onfido.models.event import COMPACT_KEY
 
 from ..conftest import TEST_EVENT
 
@@ -59,3 +63,62 @@ class TestEventModel:
         assert event.completed_at == (
             date_parse(data["payload"]["object"]["completed_at_iso8601"])
         )
+
+
+@pytest.mark.django_db
+class TestCompactEvents:
+    def create_event(self, data=TEST_EVENT):
+        event = Event(received_at=tz_now()).parse(copy.deepcopy(data))
+        with mock.patch("onfido.models.event.COMPACT_EVENTS", True):
+            event.save()
+        return event
+
+    def stored_raw(self, event):
+        return Event.objects.filter(pk=event.pk).values_list("raw", flat=True).get()
+
+    def test_compact_raw(self):
+        event = Event().parse(copy.deepcopy(TEST_EVENT))
+        compact = event.compact_raw(event.raw)
+        assert compact["payload"] == {
+            "object": {"href": TEST_EVENT["payload"]["object"]["href"]}
+        }
+        assert len(compact[COMPACT_KEY]) == 8
+        # the stored payload is smaller than the original
+        assert len(json.dumps(compact)) < len(json.dumps(TEST_EVENT))
+        # compacting twice is a no-op
+        assert event.compact_raw(compact) == compact
+
+    def test_expand_raw(self):
+        event = Event().parse(copy.deepcopy(TEST_EVENT))
+        assert event.expand_raw(event.compact_raw(event.raw)) == TEST_EVENT
+
+    def test_save(self):
+        event = self.create_event()
+        stored = self.stored_raw(event)
+        assert COMPACT_KEY in stored
+        assert "action" not in stored["payload"]
+        # the in-memory instance is unaffected
+        assert event.raw == TEST_EVENT
+        # and the raw payload is rebuilt when loaded
+        assert Event.objects.get(pk=event.pk).raw == TEST_EVENT
+
+    def test_save__non_canonical_timestamp(self):
+        data = copy.deepcopy(TEST_EVENT)
+        data["payload"]["object"]["completed_at_iso8601"] = "2019-10-28T16:00:39+01:00"
+        event = self.create_event(data)
+        stored = self.stored_raw(event)
+        # the timestamp cannot be rebuilt exactly, so the payload is retained
+        assert stored == data
+        assert Event.objects.get(pk=event.pk).raw == data
+
+    def test_save__disabled(self, event):
+        event.received_at = tz_now()
+        event.save()
+        assert self.stored_raw(event) == TEST_EVENT
+
+    def test_expand_raw__mismatch(self, caplog):
+        event = self.create_event()
+        Event.objects.filter(pk=event.pk).update(action="check.completed")
+        event = Event.objects.get(pk=event.pk)
+        assert event.raw["payload"]["action"] == "check.completed"
+        assert "does not match" in caplog.text
@@ -0,0 +1,162 @@
+import copy
+import datetime
+from unittest import mock
+
+import pytest
+from django.db import IntegrityError
+from django.utils.timezone import now as tz_now
+
+from onfido.models import Check, Event, OutboxMessage
+from onfido.signals import on_completion, on_status_change
+
+from ..conftest import TEST_CHECK
+
+
+@pytest.mark.django_db
+class TestOutboxMessageQuerySet:
+    def test_enqueue(self, check):
+        message = OutboxMessage.objects.enqueue(
+            check, "on_status_change", event="check.completed", status_before=None
+        )
+        assert message.resource_type == "check"
+        assert message.onfido_id == check.onfido_id
+        assert message.kwargs == {"event": "check.completed", "status_before": None}
+        assert message.attempts == 0
+
+    def test_pending(self, check):
+        message = OutboxMessage.objects.enqueue(check, "on_completion")
+        assert list(OutboxMessage.objects.pending()) == [message]
+        message.attempts = 3
+        message.save()
+        assert list(OutboxMessage.objects.pending(max_attempts=3)) == []
+        assert list(OutboxMessage.objects.abandoned(3)) == [message]
+        # messages are not pending until their backoff has passed
+        message.attempts = 1
+        message.next_attempt_at = tz_now() + datetime.timedelta(seconds=10)
+        message.save()
+        assert list(OutboxMessage.objects.pending(max_attempts=3)) == []
+        message.next_attempt_at = tz_now()
+        message.save()
+        assert list(OutboxMessage.objects.pending(max_attempts=3)) == [message]
+
+    def test_retry(self, check):
+        message = OutboxMessage.objects.enqueue(check, "on_completion")
+        OutboxMessage.objects.update(
+            attempts=10, next_attempt_at=tz_now() + datetime.timedelta(hours=1)
+        )
+        assert OutboxMessage.objects.retry() == 1
+        assert list(OutboxMessage.objects.pending(max_attempts=10)) == [message]
+
+    def test_dispatch(self, check):
+        receiver = mock.Mock()
+        on_status_change.connect(receiver)
+        OutboxMessage.objects.enqueue(
+            check, "on_status_change", event="check.completed", status_before=None
+        )
+        try:
+            stats = OutboxMessage.objects.dispatch()
+        finally:
+            on_status_change.disconnect(receiver)
+        receiver.assert_called_once_with(
+            signal=on_status_change,
+            sender=check.__class__,
+            instance=check,
+            event="check.completed",
+            status_before=None,
+        )
+        assert stats["delivered"] == 1
+        assert stats["failed"] == 0
+        assert OutboxMessage.objects.count() == 0
+
+    def test_dispatch__receiver_error(self, check):
+        def receiver(**kwargs):
+            raise Exception("email server down")
+
+        on_completion.connect(receiver)
+        OutboxMessage.objects.enqueue(check, "on_completion")
+        try:
+            stats = OutboxMessage.objects.dispatch()
+        finally:
+            on_completion.disconnect(receiver)
+        assert stats["delivered"] == 0
+        assert stats["failed"] == 1
+        # message is retained for redelivery
+        message = OutboxMessage.objects.get()
+        assert message.attempts == 1
+        assert "email server down" in message.last_error
+        # ... after a backoff
+        assert message.next_attempt_at > tz_now()
+        assert list(OutboxMessage.objects.pending()) == []
+
+    def test_dispatch__receiver_database_error(self, check):
+        other = copy.deepcopy(TEST_CHECK)
+        other.update(id="other")
+        other = Check.objects.create_check(applicant=check.applicant, raw=other)
+
+        def receiver(instance, **kwargs):
+            if instance.onfido_id == check.onfido_id:
+                # the receiver's own writes are rolled back with the savepoint
+                Event.objects.create(
+                    onfido_id="x", resource_type="check", received_at=tz_now()
+                )
+                raise IntegrityError("duplicate key value")
+
+        on_completion.connect(receiver)
+        OutboxMessage.objects.enqueue(other, "on_completion")
+        OutboxMessage.objects.enqueue(check, "on_completion")
+        OutboxMessage.objects.enqueue(other, "on_status_change")
+        try:
+            stats = OutboxMessage.objects.dispatch()
+        finally:
+            on_completion.disconnect(receiver)
+        assert stats["delivered"] == 2
+        assert stats["failed"] == 1
+        message = OutboxMessage.objects.get()
+        assert message.onfido_id == check.onfido_id
+        assert message.attempts == 1
+        assert "duplicate key value" in message.last_error
+        assert message.next_attempt_at > tz_now()
+        assert not Event.objects.filter(onfido_id="x").exists()
+
+    def test_dispatch__claimed(self, check):
+        OutboxMessage.objects.enqueue(check, "on_completion")
+        with mock.patch.object(OutboxMessage, "deliver", return_value=False):
+            OutboxMessage.objects.dispatch()
+        # the message is not picked up by another dispatcher until the
+        # claim expires
+        assert list(OutboxMessage.objects.pending()) == []
+
+    @mock.patch("onfido.models.outbox.OUTBOX_RETRY_DELAY", 5)
+    @mock.patch("onfido.models.outbox.OUTBOX_MAX_RETRY_DELAY", 60)
+    def test_retry_delay(self):
+        delays = [OutboxMessage(attempts=n).retry_delay for n in range(6)]
+        assert delays == [0, 5, 10, 20, 40, 60]
+
+    def test_dispatch__abandoned(self, check):
+        def receiver(**kwargs):
+            raise Exception("email server down")
+
+        on_completion.connect(receiver)
+        OutboxMessage.objects.enqueue(check, "on_completion")
+        OutboxMessage.objects.update(attempts=2)
+        try:
+            stats = OutboxMessage.objects.dispatch(max_attempts=3)
+        finally:
+            on_completion.disconnect(receiver)
+        assert stats["failed"] == 1
+        assert stats["abandoned"] == 1
+        assert OutboxMessage.objects.abandoned(3).count() == 1
+
+    def test_dispatch__missing_object(self, check):
+        OutboxMessage.objects.enqueue(check, "on_completion")
+        check.delete()
+        stats = OutboxMessage.objects.dispatch()
+        assert stats["delivered"] == 1
+        assert OutboxMessage.objects.count() == 0
+
+    def test_dispatch__batch_size(self, check):
+        for _ in range(3):
+            OutboxMessage.objects.enqueue(check, "on_completion")
+        stats = OutboxMessage.objects.dispatch(batch_size=2)
+        assert stats["delivered"] == 2
+        assert OutboxMessage.objects.count() == 1
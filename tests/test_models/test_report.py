@@ -7,7 +7,7 @@ from dateutil.parser import parse as date_parse
 from onfido.models import Report
 from onfido.models.base import BaseModel
 
-from ..conftest import IDENTITY_REPORT_ID, TEST_REPORT_IDENTITY_ENHANCED
+from ..conftest import DOCUMENT_ID, IDENTITY_REPORT_ID, TEST_REPORT_IDENTITY_ENHANCED
 
 
 @pytest.mark.django_db
@@ -51,3 +51,42 @@ class TestReportModel:
         assert report.status == TEST_REPORT_IDENTITY_ENHANCED["status"]
         assert report.result == TEST_REPORT_IDENTITY_ENHANCED["result"]
         assert report.report_type == TEST_REPORT_IDENTITY_ENHANCED["name"]
+
+    def test_document_ids(self, identity_report, document_report):
+        assert identity_report.document_ids == []
+        assert document_report.document_ids == [DOCUMENT_ID]
+
+    def test_document_ids__expired(self, document_report):
+        document_report.mark_as_expired()
+        assert document_report.raw is None
+        assert document_report.document_ids == []
+
+    @mock.patch("onfido.models.report.download")
+    def test_download_documents(self, mock_download, document_report):
+        storage = mock.Mock()
+        names = document_report.download_documents(storage, "archive")
+        assert names == [mock_download.return_value]
+        mock_download.assert_called_once_with(
+            f"documents/{DOCUMENT_ID}/download", storage, f"archive/{DOCUMENT_ID}"
+        )
+
+    @mock.patch("onfido.models.report.download")
+    def test_download_documents__skip_existing(self, mock_download, document_report):
+        storage = mock.Mock()
+        storage.listdir.return_value = ([], [f"{DOCUMENT_ID}.png"])
+        limiter = mock.Mock()
+        assert (
+            document_report.download_documents(
+                storage, "archive", skip_existing=True, limiter=limiter
+            )
+            == []
+        )
+        mock_download.assert_not_called()
+        limiter.wait.assert_not_called()
+        # a missing directory has no existing documents
+        storage.listdir.side_effect = FileNotFoundError
+        names = document_report.download_documents(
+            storage, "archive", skip_existing=True, limiter=limiter
+        )
+        assert names == [mock_download.return_value]
+        limiter.wait.assert_called_once_with()
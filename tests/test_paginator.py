@@ -0,0 +1,73 @@
+from unittest import mock
+
+import pytest
+from django.contrib.admin.sites import site
+
+from onfido.admin import CheckAdmin
+from onfido.models import Check
+from onfido.paginator import ApproximateCountPaginator, estimate_count
+
+
+def _mock_postgres(plan_rows):
+    connection = mock.MagicMock(vendor="postgresql")
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.fetchone.return_value = ('[{"Plan": {"Plan Rows": %i}}]' % plan_rows,)
+    return mock.patch("onfido.paginator.connections", {"default": connection})
+
+
+@pytest.mark.django_db
+class TestApproximateCountPaginator:
+    def test_estimate_count__sqlite(self, check):
+        assert estimate_count(Check.objects.all()) is None
+
+    def test_estimate_count(self):
+        with _mock_postgres(123):
+            assert estimate_count(Check.objects.filter(status="complete")) == 123
+
+    @pytest.mark.parametrize("plan_rows,count", [(10, 1), (1000, 1000)])
+    def test_count(self, check, plan_rows, count):
+        paginator = ApproximateCountPaginator(Check.objects.all(), 10)
+        paginator.threshold = 100
+        with _mock_postgres(plan_rows):
+            assert paginator.count == count
+
+    def test_count__sqlite(self, check):
+        assert ApproximateCountPaginator(Check.objects.all(), 10).count == 1
+
+
+@pytest.mark.django_db
+class TestFastChangelistMixin:
+    @mock.patch("onfido.admin.ADMIN_FAST_CHANGELIST", True)
+    def test_enabled(self, rf):
+        model_admin = CheckAdmin(Check, site)
+        request = rf.get("/")
+        assert model_admin.show_full_result_count is False
+        assert model_admin.get_ordering(request) == ("-pk",)
+        paginator = model_admin.get_paginator(request, Check.objects.all(), 10)
+        assert isinstance(paginator, ApproximateCountPaginator)
+
+    @mock.patch("onfido.admin.ADMIN_FAST_CHANGELIST", False)
+    def test_disabled(self, rf):
+        model_admin = CheckAdmin(Check, site)
+        request = rf.get("/")
+        assert model_admin.get_ordering(request) == (
+            "user__first_name",
+            "user__last_name",
+        )
+        paginator = model_admin.get_paginator(request, Check.objects.all(), 10)
+        assert not isinstance(paginator, ApproximateCountPaginator)
+
+    @mock.patch("onfido.admin.ADMIN_FAST_CHANGELIST", True)
+    def test_get_search_fields(self, rf):
+        model_admin = CheckAdmin(Check, site)
+        assert model_admin.get_search_fields(rf.get("/")) == (
+            "^onfido_id",
+            "user__first_name",
+            "user__last_name",
+        )
+
+    @mock.patch("onfido.admin.ADMIN_FAST_CHANGELIST", True)
+    def test_changelist(self, admin_client, check):
+        response = admin_client.get("/admin/onfido/check/")
+        assert response.status_code == 200
+        assert check.onfido_id in response.content.decode()
@@ -0,0 +1,154 @@
+import datetime
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from onfido import partitions
+
+
+class TestPartitionHelpers:
+    def test_month_start(self):
+        assert partitions.month_start(
+            datetime.datetime(2022, 5, 24, 12, 58)
+        ) == datetime.date(2022, 5, 1)
+
+    def test_add_months(self):
+        month = datetime.date(2022, 11, 1)
+        assert partitions.add_months(month, 1) == datetime.date(2022, 12, 1)
+        assert partitions.add_months(month, 2) == datetime.date(2023, 1, 1)
+        assert partitions.add_months(month, -11) == datetime.date(2021, 12, 1)
+
+    def test_partition_name(self):
+        month = datetime.date(2022, 5, 1)
+        assert partitions.partition_name(month) == "onfido_event_p2022_05"
+        assert partitions.partition_month("onfido_event_p2022_05") == month
+        assert partitions.partition_month("onfido_event_default") is None
+
+    def test_create_partition_sql(self):
+        assert partitions.create_partition_sql(datetime.date(2022, 12, 1)) == (
+            "CREATE TABLE IF NOT EXISTS onfido_event_p2022_12 "
+            "PARTITION OF onfido_event "
+            "FOR VALUES FROM ('2022-12-01') TO ('2023-01-01')"
+        )
+
+    def test_drop_partition_sql(self):
+        assert partitions.drop_partition_sql("onfido_event_p2022_05") == [
+            "ALTER TABLE onfido_event DETACH PARTITION onfido_event_p2022_05",
+            "DROP TABLE onfido_event_p2022_05",
+        ]
+
+    def test_convert_sql(self):
+        statements = partitions.convert_sql(
+            datetime.date(2022, 1, 1), datetime.date(2022, 3, 1)
+        )
+        partition_ddl = [s for s in statements if "FOR VALUES FROM" in s]
+        assert len(partition_ddl) == 3
+        assert all("PARTITION OF onfido_event_partitioned" in s for s in partition_ddl)
+        assert (
+            "ALTER TABLE onfido_event_partitioned RENAME TO onfido_event" in statements
+        )
+
+    def test_convert_sql__indexes(self):
+        statements = partitions.convert_sql(
+            datetime.date(2022, 1, 1), datetime.date(2022, 1, 1)
+        )
+        renamed = statements.index(
+            "ALTER TABLE onfido_event_partitioned RENAME TO onfido_event"
+        )
+        # the legacy index names must be freed up before they are reused
+        assert "'onfido_event_legacy'::regclass" in statements[renamed + 1]
+        assert statements[renamed + 2 :] == partitions.index_sql()
+        for sql in (
+            "CREATE INDEX onfido_event_onfido_id_idx "
+            "ON onfido_event (onfido_id, resource_type)",
+            "CREATE INDEX onfido_event_action_3bdf6af9 ON onfido_event (action)",
+            "CREATE INDEX onfido_event_action_3bdf6af9_like "
+            "ON onfido_event (action varchar_pattern_ops)",
+            "CREATE INDEX onfido_event_completed_at_19b34356 "
+            "ON onfido_event (completed_at)",
+        ):
+            assert sql in statements
+        assert "onfido_event_onfido_id_trgm" in statements[-1]
+
+    @mock.patch("onfido.partitions._execute")
+    @mock.patch("onfido.partitions.list_partitions")
+    def test_drop_partitions(self, mock_list, mock_execute):
+        current = partitions.month_start(datetime.date.today())
+        old = partitions.add_months(current, -13)
+        mock_list.return_value = [
+            "onfido_event_default",
+            partitions.partition_name(old),
+            partitions.partition_name(current),
+        ]
+        assert partitions.drop_partitions(keep_months=12) == [
+            partitions.partition_name(old)
+        ]
+        mock_execute.assert_called_once_with(
+            partitions.drop_partition_sql(partitions.partition_name(old))
+        )
+
+    @mock.patch("onfido.partitions._execute")
+    @mock.patch("onfido.partitions.list_partitions")
+    def test_create_partitions(self, mock_list, mock_execute):
+        current = partitions.month_start(datetime.date.today())
+        mock_list.return_value = [partitions.partition_name(current)]
+        created = partitions.create_partitions(months_ahead=2)
+        assert created == [
+            partitions.partition_name(partitions.add_months(current, 1)),
+            partitions.partition_name(partitions.add_months(current, 2)),
+        ]
+        mock_execute.assert_called_once_with(
+            [
+                partitions.create_partition_sql(partitions.add_months(current, 1)),
+                partitions.create_partition_sql(partitions.add_months(current, 2)),
+            ]
+        )
+
+    @mock.patch("onfido.partitions._execute")
+    @mock.patch("onfido.partitions.list_partitions")
+    def test_create_partitions__default(self, mock_list, mock_execute):
+        current = partitions.month_start(datetime.date.today())
+        mock_list.return_value = ["onfido_event_default"]
+        partitions.create_partitions(months_ahead=0)
+        mock_execute.assert_called_once_with(
+            partitions.create_partitions_sql([current], default=True)
+        )
+
+    def test_create_partitions_sql__default(self):
+        # rows already in the DEFAULT partition are moved into the new one
+        statements = partitions.create_partitions_sql(
+            [datetime.date(2022, 12, 1)], default=True
+        )
+        assert statements == [
+            "ALTER TABLE onfido_event DETACH PARTITION onfido_event_default",
+            partitions.create_partition_sql(datetime.date(2022, 12, 1)),
+            "WITH moved AS (DELETE FROM onfido_event_default "
+            "WHERE received_at >= '2022-12-01' AND received_at < '2023-01-01' "
+            "RETURNING *) INSERT INTO onfido_event SELECT * FROM moved",
+            "ALTER TABLE onfido_event ATTACH PARTITION onfido_event_default DEFAULT",
+        ]
+        assert partitions.create_partitions_sql([], default=True) == []
+
+
+@pytest.mark.django_db
+class TestEventPartitionsCommand:
+    def test_unsupported_database(self):
+        with pytest.raises(CommandError):
+            call_command("onfido_event_partitions", "create")
+
+    @mock.patch("onfido.management.commands.onfido_event_partitions.connection")
+    @mock.patch("onfido.partitions.is_partitioned", return_value=False)
+    def test_not_partitioned(self, mock_partitioned, mock_connection):
+        mock_connection.vendor = "postgresql"
+        with pytest.raises(CommandError):
+            call_command("onfido_event_partitions", "drop")
+
+    @mock.patch("onfido.management.commands.onfido_event_partitions.connection")
+    @mock.patch("onfido.partitions.is_partitioned", return_value=True)
+    @mock.patch("onfido.partitions.drop_partitions", return_value=["p1"])
+    def test_drop(self, mock_drop, mock_partitioned, mock_connection):
+        mock_connection.vendor = "postgresql"
+        call_command("onfido_event_partitions", "drop", "--keep-months", "6")
+        mock_drop.assert_called_once_with(keep_months=6)
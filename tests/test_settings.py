@@ -16,7 +16,6 @@ class SettingsTests(TestCase):
         self.assertEqual(settings.SYNC_DELETION, False)
         # These may have been set locally
         # self.assertEqual(settings.API_KEY, None)
-        # self.assertEqual(settings.WEBHOOK_TOKEN, None)
 
     def test_default_report_scrubber(self):
         """Test the report_scrubber default function."""
@@ -0,0 +1,82 @@
+from unittest import mock
+
+import pytest
+
+from onfido.api import ApiError, get, post
+from onfido.decorators import _hmac
+from onfido.helpers import create_applicant, create_check
+from onfido.stub import StubServer
+
+
+@pytest.fixture
+def stub():
+    with StubServer() as server:
+        with mock.patch("onfido.api.API_ROOT", server.url):
+            yield server
+
+
+class TestStubServer:
+    def test_applicants(self, stub):
+        applicant = post("applicants", {"first_name": "Fred"})
+        assert applicant["first_name"] == "Fred"
+        assert get(f"applicants/{applicant['id']}") == applicant
+        assert get("applicants?page=1&per_page=10") == {"applicants": [applicant]}
+        assert get("applicants?page=2&per_page=10") == {"applicants": []}
+
+    def test_checks(self, stub):
+        applicant = post("applicants", {"first_name": "Fred"})
+        check = post(
+            "checks",
+            {"applicant_id": applicant["id"], "report_names": ["document"]},
+        )
+        assert check["status"] == "in_progress"
+        assert get(f"checks?applicant_id={applicant['id']}") == {"checks": [check]}
+        reports = get(f"reports?check_id={check['id']}")["reports"]
+        assert [r["name"] for r in reports] == ["document"]
+        stub.complete_check(check["id"], result="consider")
+        assert get(f"checks/{check['id']}")["result"] == "consider"
+        assert get(f"reports/{reports[0]['id']}")["status"] == "complete"
+
+    def test_not_found(self, stub):
+        with pytest.raises(ApiError) as ex:
+            get("checks/foo")
+        assert ex.value.status_code == 404
+        assert ex.value.error_type == "resource_not_found"
+
+    def test_errors(self, stub):
+        stub.error_rate = 1
+        with pytest.raises(ApiError) as ex:
+            get("applicants")
+        assert ex.value.status_code == 500
+        stub.rate_limit_rate = 1
+        with pytest.raises(ApiError) as ex:
+            get("applicants")
+        assert ex.value.status_code == 429
+        assert stub.request_count == 2
+
+    def test_authorization(self, stub):
+        with mock.patch("onfido.api._headers", return_value={}):
+            with pytest.raises(ApiError) as ex:
+                get("applicants")
+        assert ex.value.status_code == 401
+
+    def test_webhook(self, stub):
+        webhook = post("webhooks", {"url": "https://example.com/onfido/webhook/"})
+        assert webhook["token"] == stub.webhook_token.decode()
+        applicant = post("applicants", {"first_name": "Fred"})
+        check = post("checks", {"applicant_id": applicant["id"], "report_names": []})
+        body, signature = stub.webhook("check", check["id"], "check.started")
+        assert signature == _hmac(stub.webhook_token, body)
+
+
+@pytest.mark.django_db
+class TestStubHelpers:
+    def test_create_applicant_and_check(self, stub, user):
+        applicant = create_applicant(user)
+        assert applicant.onfido_id in stub.applicants
+        check = create_check(applicant, report_names=["document", "right_to_work"])
+        assert check.onfido_id in stub.checks
+        assert check.reports.count() == 2
+        stub.complete_check(check.onfido_id)
+        check.pull()
+        assert check.is_clear
@@ -0,0 +1,69 @@
+from unittest import mock
+
+import pytest
+
+from onfido import tracing
+from onfido.api import get
+from onfido.models import Applicant, Check
+from onfido.tracing import span
+
+
+@pytest.fixture
+def tracer():
+    with mock.patch.object(tracing, "tracer") as tracer:
+        yield tracer
+
+
+def span_names(tracer):
+    return [c.args[0] for c in tracer.start_as_current_span.call_args_list]
+
+
+class TestSpan:
+    def test_no_tracer(self):
+        with mock.patch.object(tracing, "tracer", None):
+            with span("foo", bar="baz") as current:
+                current.set_attribute("qux", 1)
+
+    def test_span(self, tracer):
+        with span("foo", bar="baz", qux=None):
+            pass
+        tracer.start_as_current_span.assert_called_once_with(
+            "foo", attributes={"bar": "baz"}
+        )
+
+    @mock.patch("requests.get")
+    def test_api_span(self, mock_get, tracer):
+        mock_get.return_value.status_code = 200
+        get("checks/123")
+        tracer.start_as_current_span.assert_called_once_with(
+            "onfido.api.get",
+            attributes={"resource_type": "checks", "href": "checks/123"},
+        )
+        current = tracer.start_as_current_span.return_value.__enter__.return_value
+        current.set_attribute.assert_called_once_with("http.status_code", 200)
+
+
+@pytest.mark.django_db
+class TestTraced:
+    def test_parse(self, applicant, tracer):
+        check = Check(user=applicant.user, applicant=applicant)
+        check.parse(
+            {
+                "id": "123",
+                "created_at": "2017-03-05T12:00:00Z",
+                "status": "in_progress",
+                "result": None,
+                "href": "checks/123",
+            }
+        )
+        # nested super().parse() calls are not recorded as separate spans
+        assert span_names(tracer) == ["onfido.parse"]
+        tracer.start_as_current_span.assert_called_once_with(
+            "onfido.parse", attributes={"resource_type": "check"}
+        )
+        current = tracer.start_as_current_span.return_value.__enter__.return_value
+        current.set_attribute.assert_called_once_with("onfido_id", "123")
+
+    def test_save(self, user, tracer):
+        Applicant(user=user, onfido_id="foo").save()
+        assert span_names(tracer) == ["onfido.save"]
@@ -11,7 +11,7 @@ from onfido.views import status_update
 class ViewTests(TestCase):
     """onfido.views module tests."""
 
-    @mock.patch("onfido.decorators.WEBHOOK_TOKEN")
+    @mock.patch("onfido.decorators.webhook_keys")
     def test_status_update(self, *args):
         """Test the status_update view function."""
         data = {
@@ -28,7 +28,7 @@ class ViewTests(TestCase):
         }
         factory = RequestFactory()
 
-        @mock.patch("onfido.decorators._match", lambda x, y: True)
+        @mock.patch("onfido.decorators._match", lambda x: "token-id")
         def assert_update(data, message):
             request = factory.post(
                 "/",